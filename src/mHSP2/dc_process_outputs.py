@@ -45,6 +45,12 @@ PROJ_PERIODS = [ [ dt.datetime(2011, 1, 1), dt.datetime(2040, 12, 31) ],
 individual period.
 
 Index 0 of the sublist is start dt and Index 1 is end dt"""
+OUTPUT_TAGS = [ "H0_WBTotals", "H1_WBTotals", "WBDeltas", "H0_AET", "H1_AET",
+                "H0_RO", "H1_RO", "H0_Re", "H1_Re", "H0_Prec", "H1_Prec",
+                "H0_PET", "H1_PET" ]
+"""Tags of the output files written by procOuts for each realization"""
+CATALOG_FILE = "mHSP2_catalog.json"
+"""Output catalog file name in the model directory"""
 
 
 #-------------------------------------------------------------------------------
@@ -443,4 +449,49 @@ def procOuts( workDir, H0File, H1File, realNum ):
     return
 
 
+def outputFileName( realNum, Tag ):
+    """File name of a procOuts output
+
+    Args:
+        realNum (int): the realization number
+        Tag (str): output tag, one of OUTPUT_TAGS
+
+    Returns:
+        str: file name in the model directory
+    """
+    return "R%d_%s_DF.pickle" % ( realNum, Tag )
+
+def writeCatalog( workDir, realNums ):
+    """Write one catalog of the procOuts outputs present in the model
+    directory, whichever process or node wrote them. Realizations are 
+    listed when all of their outputs are present.
+
+    Args:
+        workDir (str): simulation directory
+        realNums (list): realization numbers
+
+    Returns:
+        str: catalog file path
+    """
+    # imports
+    import json
+    # start
+    RealDict = dict()
+    for iI in sorted( realNums ):
+        FileDict = { x : outputFileName( iI, x ) for x in OUTPUT_TAGS }
+        if all( [ os.path.isfile( os.path.join( workDir, x ) ) for x in 
+                  FileDict.values() ] ):
+            RealDict[str( iI )] = FileDict
+    # end for
+    CatDict = { "location" : ".", "num_real" : len( RealDict ),
+                "missing" : sorted( set( realNums ) - 
+                                    set( [ int( x ) for x in RealDict ] ) ),
+                "realizations" : RealDict, }
+    CatPath = os.path.normpath( os.path.join( workDir, CATALOG_FILE ) )
+    with open( CatPath, 'w' ) as OF:
+        json.dump( CatDict, OF, indent=1 )
+    # end with
+    return CatPath
+
+
 #EOF
\ No newline at end of file
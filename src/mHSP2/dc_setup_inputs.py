@@ -32,6 +32,9 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import os
 import pandas as pd 
 import datetime as dt
+# weather generator output formats, from wg_tm which needs to be on the 
+# Python path
+import WG_OutputStore as WGOS
 
 # parameters
 INPUT_HDF5 = r'DC_CalibmHSP2.h5'
@@ -212,6 +215,9 @@ Area-weighting for HRU precipitation. HRU precipitation applies to both
 pervious and impervious land areas.
 """
 
+HRU_WT_MATRIX = None
+"""Grid by HRU weight matrix from HRU_LOCA_GRID_WT, see hruWeightMatrix"""
+
 #-------------------------------------------------------------------------------------
 # functions
 def adjustETo( Ks, RRDay, ETo, Precip ):
@@ -235,6 +241,50 @@ def adjustETo( Ks, RRDay, ETo, Precip ):
     return PET
 
 
+def hruPrecipColumns():
+    """Weather generator precipitation columns used by any HRU
+
+    Returns:
+        list: column headers
+    """
+    AllGrids = set()
+    for weightD in HRU_LOCA_GRID_WT.values():
+        AllGrids.update( weightD.keys() )
+    # end for
+    return [ PRECIP_HDR % cG for cG in sorted( AllGrids ) ]
+
+
+def hruWeightMatrix():
+    """Dense grid by HRU weight matrix from HRU_LOCA_GRID_WT. Rows are in
+    hruPrecipColumns order and columns are in PERV_TARGS order. Built once
+    and cached in HRU_WT_MATRIX.
+
+    Returns:
+        tuple: ( list of precipitation column headers, 
+                 np.array of weights (grids, HRUs) )
+    """
+    # imports
+    import numpy as np
+    # globals
+    global HRU_WT_MATRIX
+    # start
+    preCols = hruPrecipColumns()
+    if HRU_WT_MATRIX is not None:
+        return preCols, HRU_WT_MATRIX
+    rowDict = { cHdr : iI for iI, cHdr in enumerate( preCols ) }
+    wtMat = np.zeros( ( len( preCols ), len( PERV_TARGS ) ), dtype=np.float64 )
+    for jJ, pTarg in enumerate( PERV_TARGS ):
+        cHRU = "HRU_%d" % int( pTarg.strip("P") )
+        for cG, cWt in HRU_LOCA_GRID_WT[cHRU].items():
+            wtMat[ rowDict[ PRECIP_HDR % cG ], jJ ] = cWt
+        # end for
+    # end for
+    wtMat.flags.writeable = False
+    HRU_WT_MATRIX = wtMat
+    # end
+    return preCols, HRU_WT_MATRIX
+
+
 def makeH0Input( workDir, H0File, realNum ):
     """Make the H0 pathway input HDF5 file
 
@@ -273,30 +323,25 @@ def makeH0Input( workDir, H0File, realNum ):
     # read in the existing wg output
     wgH0File = "H0_%s_R%d_DF.pickle" % ( WG_SIM_ROOT, realNum )
     wgH0FPath = os.path.normpath( os.path.join( workDir, wgH0File) )
-    if not os.path.isfile( wgH0FPath ):
+    if not WGOS.frameExists( wgH0FPath ):
         # this is an error
         errMsg = "WG realization file %s does not exist !!!" % wgH0FPath
         print("%s" % errMsg)
         return badReturn
     # end if
-    H0DF = pd.read_pickle( wgH0FPath, compression='zip' )
-    totLen = len( H0DF )
+    H0DF = WGOS.readFrame( wgH0FPath, Columns=hruPrecipColumns() )
     #
     # PRECIP - HRU
     # Go through all of our HRU precipitation time series
     #  calculate the HRU time series and update the HDF5 file.
+    preCols, wtMat = hruWeightMatrix()
+    # all HRUs from one matrix product, in inches
+    hruPreA = np.dot( H0DF[preCols].to_numpy( dtype=np.float64 ), 
+                      wtMat ) * (1.0/25.4)
     iCnt = 0
     for pTarg in PERV_TARGS:
         iTarg = IMP_TARGS[iCnt]
-        cHRU_id = int( pTarg.strip("P") )
-        cHRU = "HRU_%d" % cHRU_id
-        weightD = HRU_LOCA_GRID_WT[cHRU]
-        cPreA = np.zeros( totLen, dtype=np.float64 )
-        cGrids = sorted( weightD.keys() )
-        for cG in cGrids:
-            cHdr = PRECIP_HDR % cG
-            cPreA += ( H0DF[cHdr].to_numpy() * (1.0/25.4) * weightD[cG] )
-        # end for
+        cPreA = hruPreA[:, iCnt]
         scPreDF = pd.Series( cPreA, index=H0DF.index )
         ptsLabel = TS_DICT[ pTarg ][0][1]
         itsLabel = TS_DICT[ iTarg ][0][1]
@@ -315,14 +360,14 @@ def makeH0Input( workDir, H0File, realNum ):
     # For this we need the watershed, or WS, outputs
     wsH0File = "WS_H0_%s_R%d_DF.pickle" % ( WG_SIM_ROOT, realNum )
     wsH0FPath = os.path.normpath( os.path.join( workDir, wsH0File) )
-    if not os.path.isfile( wsH0FPath ):
+    if not WGOS.frameExists( wsH0FPath ):
         # this is an error
         errMsg = "Watershed realization file %s does not exist !!!" \
                     % wsH0FPath
         print("%s" % errMsg)
         return badReturn
     # end if
-    WSH0DF = pd.read_pickle( wsH0FPath, compression='zip' )
+    WSH0DF = WGOS.readFrame( wsH0FPath, Columns=[ "Precip_mm", "ETo_mm" ] )
     totLen = len( WSH0DF )
     # calculate PET from ETo and prepare WS precip
     WSH0DF["PET_mm"] = WSH0DF.apply( lambda row: adjustETo( K_c, 
@@ -404,30 +449,25 @@ def makeH1Input( workDir, H1File, realNum ):
     # read in the existing wg output
     wgH1File = "H1_%s_R%d_DF.pickle" % ( WG_SIM_ROOT, realNum )
     wgH1FPath = os.path.normpath( os.path.join( workDir, wgH1File) )
-    if not os.path.isfile( wgH1FPath ):
+    if not WGOS.frameExists( wgH1FPath ):
         # this is an error
         errMsg = "WG realization file %s does not exist !!!" % wgH1FPath
         print("%s" % errMsg)
         return badReturn
     # end if
-    H1DF = pd.read_pickle( wgH1FPath, compression='zip' )
-    totLen = len( H1DF )
+    H1DF = WGOS.readFrame( wgH1FPath, Columns=hruPrecipColumns() )
     #
     # PRECIP - HRU
     # Go through all of our HRU precipitation time series
     #  calculate the HRU time series and update the HDF5 file.
+    preCols, wtMat = hruWeightMatrix()
+    # all HRUs from one matrix product, in inches
+    hruPreA = np.dot( H1DF[preCols].to_numpy( dtype=np.float64 ), 
+                      wtMat ) * (1.0/25.4)
     iCnt = 0
     for pTarg in PERV_TARGS:
         iTarg = IMP_TARGS[iCnt]
-        cHRU_id = int( pTarg.strip("P") )
-        cHRU = "HRU_%d" % cHRU_id
-        weightD = HRU_LOCA_GRID_WT[cHRU]
-        cPreA = np.zeros( totLen, dtype=np.float64 )
-        cGrids = sorted( weightD.keys() )
-        for cG in cGrids:
-            cHdr = PRECIP_HDR % cG
-            cPreA += ( H1DF[cHdr].to_numpy() * (1.0/25.4) * weightD[cG] )
-        # end for
+        cPreA = hruPreA[:, iCnt]
         scPreDF = pd.Series( cPreA, index=H1DF.index )
         ptsLabel = TS_DICT[ pTarg ][0][1]
         itsLabel = TS_DICT[ iTarg ][0][1]
@@ -446,14 +486,14 @@ def makeH1Input( workDir, H1File, realNum ):
     # For this we need the watershed, or WS, outputs
     wsH1File = "WS_H1_%s_R%d_DF.pickle" % ( WG_SIM_ROOT, realNum )
     wsH1FPath = os.path.normpath( os.path.join( workDir, wsH1File) )
-    if not os.path.isfile( wsH1FPath ):
+    if not WGOS.frameExists( wsH1FPath ):
         # this is an error
         errMsg = "Watershed realization file %s does not exist !!!" \
                     % wsH1FPath
         print("%s" % errMsg)
         return badReturn
     # end if
-    WSH1DF = pd.read_pickle( wsH1FPath, compression='zip' )
+    WSH1DF = WGOS.readFrame( wsH1FPath, Columns=[ "Precip_mm", "ETo_mm" ] )
     totLen = len( WSH1DF )
     # calculate PET from ETo and prepare WS precip
     WSH1DF["PET_mm"] = WSH1DF.apply( lambda row: adjustETo( K_c, 
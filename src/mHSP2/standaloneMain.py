@@ -29,6 +29,23 @@ Typical usage examples
         python C:\Repositories\WeatherGenerator\mHSP2\standaloneMain.py
                 C:\\Working\\Test_Models\\WG_mHSP2 basin --i 10.0 --start_real 1 --num_real 2
 
+    **Multi-node run** ::
+
+        python standaloneMain.py /models/WG_mHSP2 climate --start_real 1 
+                --num_real 10000 --queue_dir /shared/hsp2_queue --role coordinator
+        python standaloneMain.py /models/WG_mHSP2 climate 
+                --queue_dir /shared/hsp2_queue
+
+    The coordinator queues ranges of realizations in a directory on a shared
+    file system and the second command, started on each node, claims ranges
+    until none are left. Ranges from a lost node are reassigned. When the
+    queue is finished, the coordinator writes one catalog of the outputs
+    from all nodes, see dc_process_outputs.writeCatalog. Uses 
+    WG_WorkQueue from wg_tm.
+
+The wg_tm directory needs to be on the Python path. Weather generator
+outputs are read with WG_OutputStore.
+
 """
 # Copyright and License
 """
@@ -63,6 +80,55 @@ import locaMain as HSP2
 import dc_setup_inputs as setIn
 import dc_process_outputs as procOut
 
+# parameters
+DEF_RANGE_SIZE = 10
+"""Default number of realizations in a range of the multi-node work queue"""
+PATHWAY_TIMEOUT = 35.0 * 60.0
+"""Seconds to wait for each pathway process"""
+
+
+def runRealization( Sim_Dir, realNum, Run_Type, IIncAmount ):
+    """Run both pathways and process the outputs for one realization
+
+    Args:
+        Sim_Dir (str): model directory
+        realNum (int): realization number
+        Run_Type (str): "climate" or "basin"
+        IIncAmount (float): impervious increment
+
+    Returns:
+        str: error message; None for success
+    """
+    retTuple = setIn.createHDF5Inputs( Sim_Dir, realNum, Run_Type )
+    if len(retTuple) != 2:
+        # this is an error
+        errMsg = "Issue creating HDF5 input files for realization " \
+                 "%d!!!" % realNum
+        return errMsg
+    # end if.
+    H0File = retTuple[0]
+    H1File = retTuple[1]
+    # now run both in separate processes
+    p0 = Process( target=HSP2.salocaMain, args=(Sim_Dir, H0File, 
+                  "climate", IIncAmount ) )
+    p0.start()
+    p1 = Process( target=HSP2.salocaMain, args=(Sim_Dir, H1File, 
+                  Run_Type, IIncAmount ) )
+    p1.start()
+    p0.join( PATHWAY_TIMEOUT )
+    p1.join( PATHWAY_TIMEOUT )
+    p0ECode = p0.exitcode
+    p1ECode = p1.exitcode
+    if ( (p0ECode != 0) or (p1ECode != 0) ):
+        # this means an error
+        errMsg = "There was an error or issue with one of the " \
+                 "pathway processes!!!"
+        return errMsg
+    # end if
+    # now need to do the output comparison stuff
+    procOut.procOuts( Sim_Dir, H0File, H1File, realNum )
+    return None
+
 
 #standalone execution block
 # assumes that this module is executed within the same current directory
@@ -88,11 +154,23 @@ if __name__ == "__main__":
     parser.add_argument( '-s', '--start_real', action='store', nargs=1, 
                          dest='startReal', type=int,
                          help='Realizations to start simulating',
-                         metavar="Starting realization", required=True )
+                         metavar="Starting realization", required=False )
     parser.add_argument( '-n', '--num_real', action='store', nargs=1, 
                          dest='numReal', type=int,
                          help='Number of realizations to simulate',
-                         metavar="Number of realizations", required=True )
+                         metavar="Number of realizations", required=False )
+    parser.add_argument( '-q', '--queue_dir', action='store', nargs=1,
+                         dest='queueDir', type=str,
+                         help='Shared directory for the multi-node work queue',
+                         metavar="Queue directory", required=False )
+    parser.add_argument( '-r', '--role', action='store', nargs=1,
+                         dest='role', type=str, choices=[ "coordinator", "worker" ],
+                         help='Coordinator creates the queue, worker runs ranges',
+                         metavar="Queue role", required=False )
+    parser.add_argument( '--range_size', action='store', nargs=1,
+                         dest='rangeSize', type=int,
+                         help='Realizations per work queue range',
+                         metavar="Range size", required=False )
     # parse the command line arguments received and set the simulation directory
     args = parser.parse_args()
     Sim_Dir = os.path.normpath( args.modelDir[0] )
@@ -121,47 +199,75 @@ if __name__ == "__main__":
     else:
         IIncAmount = args.incImpA[0]
     # end if
+    # work queue for a multi-node run
+    if args.queueDir is None:
+        queueDir = None
+        role = None
+    else:
+        queueDir = os.path.normpath( os.path.join( CWD, args.queueDir[0] ) )
+        role = "worker" if args.role is None else args.role[0]
+    # end if
+    if args.rangeSize is None:
+        rangeSize = DEF_RANGE_SIZE
+    else:
+        rangeSize = args.rangeSize[0]
     # get the realizations
-    numReal = args.numReal[0]
-    startReal = args.startReal[0]
-    # the preliminaries are done
-    print( "Simulate realizations %d through %d" % ( startReal, 
-            ( startReal + numReal ) - 1) )
-    # now start our realizations loop
-    for iI in range( startReal, ( startReal + numReal ), 1 ):
-        # outputs
-        if iI % 100 == 0:
-            print("Realization %d" % iI)
-        # end if
-        retTuple = setIn.createHDF5Inputs( Sim_Dir, iI, Run_Type )
-        if len(retTuple) != 2:
-            # this is an error
-            errMsg = "Issue creating HDF5 input files for realization " \
-                     "%d!!!" % iI
-            sys.exit( errMsg )
-        # end if.
-        H0File = retTuple[0]
-        H1File = retTuple[1]
-        # now run both in separate processes
-        p0 = Process( target=HSP2.salocaMain, args=(Sim_Dir, H0File, 
-                      "climate", IIncAmount ) )
-        p0.start()
-        p1 = Process( target=HSP2.salocaMain, args=(Sim_Dir, H1File, 
-                      Run_Type, IIncAmount ) )
-        p1.start()
-        p0.join( 35.0 * 60.0 )
-        p1.join( 35.0 * 60.0 )
-        p0ECode = p0.exitcode
-        p1ECode = p1.exitcode
-        if ( (p0ECode != 0) or (p1ECode != 0) ):
-            # this means an error
-            errMsg = "There was an error or issue with one of the " \
-                     "pathway processes!!!"
+    if role == "worker":
+        import WG_WorkQueue as WGWQ
+        # claim ranges until none are left
+        def runRange( realList, lostEvent ):
+            failList = list()
+            for iI in realList:
+                if lostEvent.is_set():
+                    # the range was reassigned to another worker
+                    break
+                errMsg = runRealization( Sim_Dir, iI, Run_Type, IIncAmount )
+                if errMsg is not None:
+                    print( errMsg )
+                    failList.append( iI )
+            # end for
+            return failList
+        # end of runRange
+        print( "Waiting for queue in %s" % queueDir )
+        WGWQ.waitForQueue( queueDir )
+        rangeIds = WGWQ.runWorker( queueDir, runRange )
+        print( "Worker finished %d ranges" % len( rangeIds ) )
+    else:
+        if ( args.numReal is None ) or ( args.startReal is None ):
+            errMsg = "Starting realization (-s) and number of " \
+                     "realizations (-n) are required!!!"
             sys.exit( errMsg )
+        numReal = args.numReal[0]
+        startReal = args.startReal[0]
+        # the preliminaries are done
+        print( "Simulate realizations %d through %d" % ( startReal, 
+                ( startReal + numReal ) - 1) )
+        if role == "coordinator":
+            import WG_WorkQueue as WGWQ
+            WGWQ.createQueue( queueDir, list( range( startReal, 
+                              ( startReal + numReal ), 1 ) ), rangeSize )
+            WGWQ.monitorQueue( queueDir )
+            # one catalog for the outputs from all nodes
+            catPath = procOut.writeCatalog( Sim_Dir, list( range( startReal, 
+                                            ( startReal + numReal ), 1 ) ) )
+            print( "Output catalog in %s" % catPath )
+            failList = WGWQ.failedRealizations( queueDir )
+            if len( failList ) > 0:
+                errMsg = "Failed realizations %s!!!" % failList
+                sys.exit( errMsg )
+        else:
+            # now start our realizations loop
+            for iI in range( startReal, ( startReal + numReal ), 1 ):
+                # outputs
+                if iI % 100 == 0:
+                    print("Realization %d" % iI)
+                # end if
+                errMsg = runRealization( Sim_Dir, iI, Run_Type, IIncAmount )
+                if errMsg is not None:
+                    sys.exit( errMsg )
+            # end realization for
         # end if
-        # now need to do the output comparison stuff
-        procOut.procOuts( Sim_Dir, H0File, H1File, iI )
-    # end realization for
+    # end if
     # return to the current directory
     if CWD != Sim_Dir:
         os.chdir( CWD )
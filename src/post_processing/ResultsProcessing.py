@@ -33,6 +33,7 @@ import numpy as np
 import datetime as dt
 import os
 import pickle
+import WG_OutputStore as WGOS
 
 # parameters
 #OUT_LABEL = "DC_WGMN1"
@@ -84,8 +85,7 @@ if __name__ == "__main__":
         # end if
         InFile = os.path.normpath( os.path.join( IN_DIR, 
                                    IN_NAME % ( OUT_LABEL, rInd ) ) )
-        InDF = pd.read_pickle(InFile, compression='zip' )
-        InDF = InDF[[PreCol]].copy()
+        InDF = WGOS.readFrame( InFile, Columns=[ PreCol ] )
         for iI in range(4):
             cPeriod = All_Periods[iI]
             cDF = InDF.loc[cPeriod[0]:cPeriod[1]].copy()
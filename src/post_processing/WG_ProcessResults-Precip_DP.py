@@ -33,6 +33,7 @@ import WG_Inputs as WGI
 import pandas as pd
 from WG_PrecipDepth import WD_THRESH
 from WG_HighRealResults import PRE_START_IND
+import WG_OutputStore as WGOS
 from os import path
 
 NUM_REAL = 10000
@@ -99,11 +100,11 @@ if __name__ == "__main__":
             # get filenames
             H0File, H1File = returnRealFileNames( iI )
             # now read in the dataframes
-            H0DF = pd.read_pickle( H0File, compression='zip' )
-            H1DF = pd.read_pickle( H1File, compression='zip' )
+            H0DF = WGOS.readFrame( H0File, Columns=[ OutColsList[jJ] ] )
+            H1DF = WGOS.readFrame( H1File, Columns=[ OutColsList[jJ] ] )
             # subset the data set
-            H0PreData = H0DF.loc[ DataStart:DataEnd, OutColsList[PRE_START_IND:] ].copy()
-            H1PreData = H1DF.loc[ DataStart:DataEnd, OutColsList[PRE_START_IND:] ].copy()
+            H0PreData = H0DF.loc[ DataStart:DataEnd, [ OutColsList[jJ] ] ].copy()
+            H1PreData = H1DF.loc[ DataStart:DataEnd, [ OutColsList[jJ] ] ].copy()
             # now split out our realization values
             if iI == 1:
                 # H0 data
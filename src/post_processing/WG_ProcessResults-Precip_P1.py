@@ -34,6 +34,7 @@ import WG_Inputs as WGI
 import pandas as pd
 from WG_PrecipDepth import WD_THRESH
 from WG_HighRealResults import PRE_START_IND
+import WG_OutputStore as WGOS
 from os import path
 
 NUM_REAL = 10000
@@ -100,12 +101,12 @@ if __name__ == "__main__":
             # get filenames
             H0File, H1File = returnRealFileNames( iI )
             # now read in the dataframes
-            H0DF = pd.read_pickle( H0File, compression='zip' )
-            H1DF = pd.read_pickle( H1File, compression='zip' )
+            H0DF = WGOS.readFrame( H0File, Columns=[ OutColsList[jJ] ] )
+            H1DF = WGOS.readFrame( H1File, Columns=[ OutColsList[jJ] ] )
             # now split up
             # start with H0 case
             #    statistics for H0 case should be the same for each period
-            H0PreProj1 = H0DF.loc[ ProjStart1:ProjEnd1, OutColsList[PRE_START_IND:] ].copy()
+            H0PreProj1 = H0DF.loc[ ProjStart1:ProjEnd1, [ OutColsList[jJ] ] ].copy()
             # now split out our realization values
             if iI == 1:
                 # H0 proj 1
@@ -123,7 +124,7 @@ if __name__ == "__main__":
                                                        right_index=True )
             # then H1 case
             #    statistics for H1 case should be the same for each period
-            H1PreProj1 = H1DF.loc[ ProjStart1:ProjEnd1, OutColsList[PRE_START_IND:] ].copy()
+            H1PreProj1 = H1DF.loc[ ProjStart1:ProjEnd1, [ OutColsList[jJ] ] ].copy()
             # now split out our realization values
             if iI == 1:
                 # H0 proj 1
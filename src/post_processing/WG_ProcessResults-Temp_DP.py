@@ -33,6 +33,7 @@ import WG_Inputs as WGI
 import pandas as pd
 from WG_PrecipDepth import WD_THRESH
 from WG_HighRealResults import PRE_START_IND
+import WG_OutputStore as WGOS
 from os import path
 
 NUM_REAL = 10000
@@ -94,8 +95,8 @@ if __name__ == "__main__":
         # get filenames
         H0File, H1File = returnRealFileNames( iI )
         # now read in the dataframes
-        H0DF = pd.read_pickle( H0File, compression='zip' )
-        H1DF = pd.read_pickle( H1File, compression='zip' )
+        H0DF = WGOS.readFrame( H0File, Columns=OutColsList[:PRE_START_IND] )
+        H1DF = WGOS.readFrame( H1File, Columns=OutColsList[:PRE_START_IND] )
         # now split up
         # start with H0 case
         #    statistics for H0 case should be the same for each period
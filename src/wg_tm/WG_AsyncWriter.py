@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_AsyncWriter
+   :platform: Windows, Linux
+   :synopsis: Background writer thread for realization outputs
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+Building the output DataFrames, the water balance, and the compressed
+files for a realization takes a good part of the realization time. With
+the writer started, completed realizations go into a bounded queue and a
+writer thread in the same process produces the outputs while the
+simulation continues with the next realization.
+
+The queue holds at most WRITE_QUEUE_SIZE realizations. When it is full,
+submitRealization blocks until the writer has taken one, so memory stays
+bounded when the writer is slower than the simulation.
+
+Call stopWriter before the process ends to write everything in the queue.
+Pool workers register stopWriter as a multiprocessing finalizer, which
+runs when the pool is closed and joined, but not when it is terminated.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+import queue
+import threading
+import traceback
+# project imports
+import WG_HighRealResults as WGHRR
+import WG_RunManifest as WGRM
+
+# parameters
+WRITE_QUEUE_SIZE = 2
+"""Default maximum number of completed realizations waiting for output"""
+# globals
+WRITE_QUEUE = None
+"""Queue of realizations waiting for output"""
+WRITER_THREAD = None
+"""The writer thread; None when outputs are written synchronously"""
+WRITE_FAILURES = list()
+"""Realization numbers whose output failed in the writer thread"""
+
+
+def writeRealization( RealNum, DT_INDEX, NumDays, H0Real, H1Real ):
+    """Write all outputs for one realization in this thread and record it
+    as done in the run manifest.
+
+    Args:
+        RealNum (int): realization number
+        DT_INDEX (pd.DateTimeIndex): index for all outputs
+        NumDays (int): number of simulation days
+        H0Real (np.array): H0 realization results
+        H1Real (np.array): H1 realization results
+
+    """
+    WGHRR.outputRealResults( RealNum, DT_INDEX, H0Real=H0Real, H1Real=H1Real )
+    WGHRR.outputWSResults( RealNum, DT_INDEX, NumDays, H0Real=H0Real,
+                           H1Real=H1Real )
+    WGRM.recordRealization( RealNum, WGRM.STATUS_DONE )
+
+def submitRealization( RealNum, DT_INDEX, NumDays, H0Real, H1Real ):
+    """Queue the outputs of one realization for the writer thread, or
+    write them now if the writer is not started. Blocks while the queue is
+    full. The arrays must not be changed after submission.
+
+    Args:
+        RealNum (int): realization number
+        DT_INDEX (pd.DateTimeIndex): index for all outputs
+        NumDays (int): number of simulation days
+        H0Real (np.array): H0 realization results
+        H1Real (np.array): H1 realization results
+
+    """
+    if WRITER_THREAD is None:
+        writeRealization( RealNum, DT_INDEX, NumDays, H0Real, H1Real )
+    else:
+        WRITE_QUEUE.put( ( RealNum, DT_INDEX, NumDays, H0Real, H1Real ) )
+    # end if
+    return
+
+def _writerLoop( cQueue ):
+    """Writer thread main. Writes queued realizations until it receives
+    None.
+
+    Args:
+        cQueue (queue.Queue): the write queue
+
+    """
+    while True:
+        Item = cQueue.get()
+        if Item is None:
+            cQueue.task_done()
+            break
+        try:
+            writeRealization( *Item )
+        except Exception:
+            WRITE_FAILURES.append( Item[0] )
+            WGRM.recordRealization( Item[0], WGRM.STATUS_FAILED )
+            print( "Output failed for realization %d !!!\n%s" %
+                   ( Item[0], traceback.format_exc() ) )
+        # end try
+        cQueue.task_done()
+    # end while
+    return
+
+def startWriter( QueueSize=WRITE_QUEUE_SIZE ):
+    """Start the writer thread for this process
+
+    KWargs:
+        QueueSize (int): maximum number of realizations waiting for output
+
+    """
+    # globals
+    global WRITE_QUEUE, WRITER_THREAD
+    # start
+    if WRITER_THREAD is not None:
+        return
+    WRITE_QUEUE = queue.Queue( maxsize=max( 1, int( QueueSize ) ) )
+    WRITER_THREAD = threading.Thread( target=_writerLoop,
+                                      args=( WRITE_QUEUE, ),
+                                      name="WG_AsyncWriter", daemon=True )
+    WRITER_THREAD.start()
+    # end
+    return
+
+def stopWriter():
+    """Write everything in the queue and stop the writer thread.
+
+    Returns:
+        list: realization numbers whose output failed
+    """
+    # globals
+    global WRITE_QUEUE, WRITER_THREAD
+    # start
+    if WRITER_THREAD is not None:
+        WRITE_QUEUE.put( None )
+        WRITER_THREAD.join()
+        WRITE_QUEUE = None
+        WRITER_THREAD = None
+    # end if
+    return list( WRITE_FAILURES )
+
+
+#EOF
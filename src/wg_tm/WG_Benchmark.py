@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_Benchmark
+   :platform: Windows, Linux
+   :synopsis: Throughput benchmark of the weather generator with synthetic inputs
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+The inputs in WG_Inputs are network paths for a 1980 to 2100 simulation,
+so the generator cannot be profiled without them. This benchmark writes
+synthetic smoothed average and standard deviation pickles and M0 and M1
+matrices to a local work directory, points WG_Inputs at them, and runs
+realizations with the engines in WG_Worker_Main.
+
+Each case, a combination of number of realizations, end year, and number
+of grids, runs in a new process so that the peak resident memory and the
+per-process caches belong to that case. For every case the report has
+
+* realizations per second and seconds per realization
+* set-up seconds for the tables, calendar, inputs, and the run set-up 
+  with the period matrices and daily temperature arrays, see
+  WG_Worker_Main.initWorker
+* seconds by stage, from timing wrappers around the functions in
+  STAGE_FUNCS: sampling, states, temperature, water_balance, and output.
+  Time in a nested stage counts only for that stage, and everything else
+  is other.
+* peak resident memory of the case process in MB
+
+Outputs are written synchronously, in the usual formats, to the work
+directory so that the output stage is timed in the simulation process.
+The stage wrappers cover the loop and block engines; the reference engine
+is timed in total only.
+
+python WG_Benchmark.py --num_real 4 16 --end_year 2040 2100 --num_grids 3 22
+                       --json bench.json
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+# imports
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import datetime as dt
+import functools
+import importlib
+import itertools
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+# project imports
+import WG_Inputs as WGI
+
+# parameters
+DEF_NUM_REAL = [ 4 ]
+"""Default numbers of realizations"""
+DEF_END_YEARS = [ 2040 ]
+"""Default simulation end years. Simulations start at WG_Inputs.START_DATE"""
+DEF_NUM_GRIDS = [ 3 ]
+"""Default numbers of grids, the first of WG_Inputs.LOCA_KEYS"""
+DEF_SEED = 20211
+"""Default seed for the synthetic inputs"""
+DEF_BLOCK_SIZE = 8
+"""Default realizations per block for a batched engine"""
+START_REAL = 1
+"""First realization number of every case"""
+STAGE_NAMES = [ "sampling", "states", "temperature", "water_balance",
+                "output" ]
+"""Timed stages in report order. Time outside of them is other"""
+STAGE_FUNCS = [
+    ( "sampling", "WG_Seeds", "realStreams" ),
+    ( "sampling", "WG_Dists_Samples", "drawDepthUniforms" ),
+    ( "sampling", "WG_Dists_Samples", "drawSpellDays" ),
+    ( "sampling", "WG_Dists_Samples", "sampleDepthDays" ),
+    ( "sampling", "WG_OtherWeather", "drawEpsilons" ),
+    ( "states", "WG_SpellLength", "spellStates" ),
+    ( "temperature", "WG_OtherWeather", "calcChiSeries" ),
+    ( "temperature", "WG_OtherWeather", "calcTempSeries" ),
+    ( "water_balance", "WG_HighRealResults", "calcAreaAverages" ),
+    ( "water_balance", "WG_HighRealResults", "calcPET_HS" ),
+    ( "water_balance", "WG_HighRealResults", "calcTMMonthlyWB" ),
+    ( "water_balance", "WG_HighRealResults", "calcDeltaDF" ),
+    ( "output", "WG_HighRealResults", "outputRealResults" ),
+    ( "output", "WG_HighRealResults", "outputWSResults" ),
+    ( "output", "WG_OutputStore", "writeFrame" ),
+    ( "output", "WG_OutputStore", "appendRealization" ),
+    ( "output", "WG_OutputStore", "appendFrames" ), ]
+""" ( stage, module, function ) for each timed function. Modules call each
+other through module attributes, so replacing the attribute times all calls"""
+SMOOTHED_FILES = [ "OW_%s_%s_%s" % ( cState, cStat, cPer )
+                   for cPer in [ "PRISM", "PROJ1", "PROJ2", "PROJ3" ]
+                   for cState in [ "WET", "DRY" ]
+                   for cStat in [ "AVE", "STD" ] ]
+"""WG_Inputs attributes for the smoothed average and standard deviation
+pickles"""
+PROJ_WARMING = 1.2
+"""Synthetic warming, deg C, for each projection period"""
+
+
+#--------------------------------------------------------------------------
+# synthetic inputs
+def synthesizeInputs( InputDir, Seed=DEF_SEED ):
+    """Write synthetic smoothed temperature inputs and M0 and M1 to a
+    directory. Averages follow an annual cycle, wet days are cooler, and
+    each projection period is warmer than the last.
+
+    Args:
+        InputDir (str): directory for the pickles; created if needed
+
+    KWargs:
+        Seed (int): seed for the day to day noise
+
+    Returns:
+        dict: file path for each WG_Inputs attribute
+    """
+    # start
+    os.makedirs( InputDir, exist_ok=True )
+    rng = np.random.default_rng( Seed )
+    DoY = np.arange( 1, 367, dtype=np.float64 )
+    Cycle = np.sin( 2.0 * np.pi * ( DoY - 105.0 ) / 365.25 )
+    Paths = dict()
+    for cName in SMOOTHED_FILES:
+        _, cState, cStat, cPer = cName.split( "_" )
+        PerInd = 0 if cPer == "PRISM" else int( cPer[-1] )
+        if cStat == "AVE":
+            Offset = PROJ_WARMING * PerInd - ( 2.0 if cState == "WET" else 0.0 )
+            TmaxA = 24.0 + 9.0 * Cycle + Offset
+            TminA = 10.0 + 8.0 * Cycle + Offset
+        else:
+            TmaxA = 3.5 - 0.8 * Cycle
+            TminA = 3.0 - 0.6 * Cycle
+        # end if
+        cDF = pd.DataFrame( index=pd.Index( DoY.astype( np.int64 ),
+                                            name="DoY" ),
+                            data={ "Tmax_C" : TmaxA + rng.normal( 0.0, 0.05, 366 ),
+                                   "Tmin_C" : TminA + rng.normal( 0.0, 0.05, 366 ) } )
+        Paths[cName] = os.path.join( InputDir, "%s.pickle" % cName )
+        cDF.to_pickle( Paths[cName] )
+    # end for
+    M0DF = pd.DataFrame( index=[ "rho_1X", "rho_2X" ],
+                         data={ "rho_X1" : [ 1.0, 0.62 ],
+                                "rho_X2" : [ 0.62, 1.0 ] } )
+    M1DF = pd.DataFrame( index=[ "rho_1X", "rho_2X" ],
+                         data={ "rho_X1_L1" : [ 0.66, 0.35 ],
+                                "rho_X2_L1" : [ 0.41, 0.64 ] } )
+    Paths["OW_M0_IN"] = os.path.join( InputDir, "M0.pickle" )
+    Paths["OW_M1_IN"] = os.path.join( InputDir, "M1.pickle" )
+    M0DF.to_pickle( Paths["OW_M0_IN"] )
+    M1DF.to_pickle( Paths["OW_M1_IN"] )
+    # end
+    return Paths
+
+def configureInputs( Paths, OutDir, NumGrids, EndYear, OutFormat ):
+    """Point WG_Inputs at the synthetic inputs and a local output directory.
+    Call before anything else reads WG_Inputs in this process.
+
+    Args:
+        Paths (dict): from synthesizeInputs
+        OutDir (str): output directory; OUT_SUB_DIR is created in it
+        NumGrids (int): use the first NumGrids of WG_Inputs.LOCA_KEYS
+        EndYear (int): simulate to December 31 of this year
+        OutFormat (str): WG_Inputs.OUT_FORMAT
+
+    """
+    for cName, cPath in Paths.items():
+        setattr( WGI, cName, cPath )
+    # end for
+    os.makedirs( os.path.join( OutDir, WGI.OUT_SUB_DIR ), exist_ok=True )
+    WGI.OUT_DIR = OutDir
+    WGI.OUT_FORMAT = OutFormat
+    WGI.TABLE_CACHE_DIR = OutDir
+    WGI.LOCA_KEYS = sorted( WGI.LOCA_GRID_MAP.keys() )[:NumGrids]
+    WGI.NUM_LOCA_GRID = len( WGI.LOCA_KEYS )
+    WGI.END_DATE = dt.datetime( EndYear, 12, 31 )
+    # end
+    return
+
+
+#--------------------------------------------------------------------------
+# stage timing
+class StageTimer(object):
+    """Wall clock seconds and calls by stage for wrapped functions. When a
+    wrapped function calls another, the time belongs to the inner stage
+    until it returns. Not thread safe, so outputs must be synchronous."""
+
+    def __init__( self ):
+        """Initialization method"""
+        super().__init__()
+        self.Secs = dict( [ ( x, 0.0 ) for x in STAGE_NAMES ] )
+        self.Calls = dict( [ ( x, 0 ) for x in STAGE_NAMES ] )
+        self.Stack = list()
+        self.Mark = 0.0
+
+    def _charge( self ):
+        """Add the time since the last mark to the current stage"""
+        Now = time.perf_counter()
+        if len( self.Stack ) > 0:
+            self.Secs[self.Stack[-1]] += Now - self.Mark
+        self.Mark = Now
+
+    def wrap( self, Stage, Func ):
+        """Timing wrapper for Func in Stage
+
+        Args:
+            Stage (str): stage name, one of STAGE_NAMES
+            Func (callable): function to time
+
+        Returns:
+            callable: the wrapper
+        """
+        @functools.wraps( Func )
+        def timedFunc( *args, **kwargs ):
+            self._charge()
+            self.Stack.append( Stage )
+            self.Calls[Stage] += 1
+            try:
+                return Func( *args, **kwargs )
+            finally:
+                self._charge()
+                self.Stack.pop()
+            # end try
+        # end of timedFunc
+        return timedFunc
+
+    def instrument( self ):
+        """Replace each function in STAGE_FUNCS with its timing wrapper"""
+        for cStage, cModule, cFunc in STAGE_FUNCS:
+            Module = importlib.import_module( cModule )
+            setattr( Module, cFunc, self.wrap( cStage,
+                                               getattr( Module, cFunc ) ) )
+        # end for
+
+
+def peakRSSMB():
+    """Peak resident memory of this process in MB; None where the resource
+    module is not available"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    MaxRSS = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+    # kilobytes on Linux and bytes on macOS
+    if sys.platform == "darwin":
+        return MaxRSS / ( 1024.0 * 1024.0 )
+    return MaxRSS / 1024.0
+
+
+#--------------------------------------------------------------------------
+# cases
+def benchCase( CaseArgs ):
+    """Run one benchmark case in this process. Use a new process for each
+    case.
+
+    Args:
+        CaseArgs (tuple): ( NumReal, EndYear, NumGrids, Engine, BlockSize,
+                          SeedMode, OutFormat, Paths, OutDir )
+
+    Returns:
+        dict: case results
+    """
+    NumReal, EndYear, NumGrids, Engine, BlockSize, SeedMode, OutFormat, \
+        Paths, OutDir = CaseArgs
+    configureInputs( Paths, OutDir, NumGrids, EndYear, OutFormat )
+    # imports after WG_Inputs is set
+    import WG_Worker_Main as WGWM
+    import WG_Calendar as WGCal
+    import WG_Scheduler as WGSC
+    # start
+    WGWM.checkEngine( Engine )
+    StartTime = time.perf_counter()
+    WGWM.initWorker( PreloadInputs=True )
+    InitSecs = time.perf_counter() - StartTime
+    NumDays = len( WGCal.getRunCalendar().MonthA )
+    Timer = StageTimer()
+    Timer.instrument()
+    if WGWM.isBatched( Engine ):
+        BlockSize = max( 1, BlockSize )
+        MaxChunk = BlockSize
+    else:
+        BlockSize = 0
+        MaxChunk = WGWM.CHUNK_SIZE
+    RealNums = list( range( START_REAL, START_REAL + NumReal ) )
+    Records = list()
+    StartTime = time.perf_counter()
+    for cChunk in WGSC.guidedChunks( RealNums, 1, MaxChunk ):
+        Records.extend( WGWM.WG_Task_Main( ( cChunk, WGWM.STD_NORM_DEF_SEED,
+                        WGWM.PDEPTH_DEF_SEED, WGWM.WET_STA_DEF_SEED,
+                        WGWM.DRY_STA_DEF_SEED, SeedMode, Engine ) ) )
+    # end for
+    RunSecs = time.perf_counter() - StartTime
+    StageSecs = dict( Timer.Secs )
+    StageSecs["other"] = max( 0.0, RunSecs - sum( Timer.Secs.values() ) )
+    ResDict = { "num_real" : int( NumReal ),
+                "end_year" : int( EndYear ),
+                "num_grids" : int( NumGrids ),
+                "num_days" : int( NumDays ),
+                "engine" : Engine,
+                "block_size" : int( BlockSize ),
+                "seed_mode" : SeedMode,
+                "out_format" : OutFormat,
+                "num_failed" : int( sum( [ 1 for x in Records if x[1] != 0 ] ) ),
+                "init_sec" : InitSecs,
+                "run_sec" : RunSecs,
+                "real_per_sec" : NumReal / RunSecs,
+                "sec_per_real" : RunSecs / NumReal,
+                "stage_sec" : StageSecs,
+                "stage_calls" : dict( Timer.Calls ),
+                "peak_rss_mb" : peakRSSMB(), }
+    return ResDict
+
+def benchCases( NumReals, EndYears, NumGrids, Engine="loop", 
+                BlockSize=DEF_BLOCK_SIZE,
+                SeedMode="legacy", OutFormat="pickle", WorkDir=None,
+                Seed=DEF_SEED, KeepFiles=False ):
+    """Run every combination of realization count, end year, and grid count,
+    each in a new process.
+
+    Args:
+        NumReals (list): numbers of realizations
+        EndYears (list): simulation end years
+        NumGrids (list): numbers of grids
+
+    KWargs:
+        Engine (str): engine, see WG_Worker_Main.ENGINES
+        BlockSize (int): realizations per block for a batched engine
+        SeedMode (str): seeding mode, see WG_Seeds
+        OutFormat (str): WG_Inputs.OUT_FORMAT for the outputs
+        WorkDir (str): directory for inputs and outputs; a temporary
+                       directory when None
+        Seed (int): seed for the synthetic inputs
+        KeepFiles (bool): keep the inputs and outputs after the run
+
+    Returns:
+        dict: benchmark results with a list of cases
+    """
+    # start
+    MaxGrids = len( WGI.LOCA_GRID_MAP )
+    for cNum in NumGrids:
+        if ( cNum < 1 ) or ( cNum > MaxGrids ):
+            ErrorMsg = "Number of grids must be 1 to %d not %d!!!" % (
+                       MaxGrids, cNum )
+            raise ValueError( ErrorMsg )
+    # end for
+    for cYear in EndYears:
+        if cYear < WGI.START_DATE.year:
+            ErrorMsg = "End year %d is before the start date %s!!!" % (
+                       cYear, WGI.START_DATE )
+            raise ValueError( ErrorMsg )
+    # end for
+    TempDir = WorkDir is None
+    if TempDir:
+        WorkDir = tempfile.mkdtemp( prefix="WG_Benchmark_" )
+    InputDir = os.path.join( WorkDir, "inputs" )
+    Paths = synthesizeInputs( InputDir, Seed=Seed )
+    # a new process for each case
+    Context = multiprocessing.get_context( "spawn" )
+    Cases = list()
+    try:
+        for iI, ( cReal, cYear, cGrids ) in enumerate( itertools.product(
+                                        NumReals, EndYears, NumGrids ) ):
+            OutDir = os.path.join( WorkDir, "case_%d" % iI )
+            CaseArgs = ( cReal, cYear, cGrids, Engine, BlockSize, SeedMode,
+                         OutFormat, Paths, OutDir )
+            with Context.Pool( processes=1 ) as pool:
+                Cases.append( pool.apply( benchCase, ( CaseArgs, ) ) )
+            # end with
+            if not KeepFiles:
+                shutil.rmtree( OutDir, ignore_errors=True )
+        # end for
+    finally:
+        if ( not KeepFiles ) and TempDir:
+            shutil.rmtree( WorkDir, ignore_errors=True )
+        elif not KeepFiles:
+            shutil.rmtree( InputDir, ignore_errors=True )
+    # end try
+    ResDict = { "python" : sys.version.split()[0],
+                "numpy" : np.__version__,
+                "cpu_count" : os.cpu_count(),
+                "cases" : Cases, }
+    return ResDict
+
+def printReport( ResDict ):
+    """Print benchmark results as a table"""
+    StageCols = STAGE_NAMES + [ "other" ]
+    print( "%5s %5s %5s %9s %9s %8s " % ( "reals", "end", "grids", "reals/sec",
+           "init sec", "peak MB" ) + " ".join( [ "%13s" % x
+                                                 for x in StageCols ] ) )
+    for cD in ResDict["cases"]:
+        PeakRSS = cD["peak_rss_mb"] if cD["peak_rss_mb"] is not None else np.nan
+        print( "%5d %5d %5d %9.3g %9.3g %8.1f " % ( cD["num_real"],
+               cD["end_year"], cD["num_grids"], cD["real_per_sec"],
+               cD["init_sec"], PeakRSS ) + " ".join( [ "%13.4g" %
+               cD["stage_sec"][x] for x in StageCols ] ) )
+        if cD["num_failed"] > 0:
+            print( "    %d realizations failed!!!" % cD["num_failed"] )
+    # end for
+
+
+if __name__ == "__main__":
+    import WG_Worker_Main as WGWM
+    parser = argparse.ArgumentParser(description='Weather generator benchmark'
+                                     ' with synthetic inputs')
+    parser.add_argument(
+        '--num_real',
+        type=int,
+        nargs='+',
+        default=DEF_NUM_REAL,
+        help='Numbers of realizations')
+    parser.add_argument(
+        '--end_year',
+        type=int,
+        nargs='+',
+        default=DEF_END_YEARS,
+        help='Simulation end years')
+    parser.add_argument(
+        '--num_grids',
+        type=int,
+        nargs='+',
+        default=DEF_NUM_GRIDS,
+        help='Numbers of grids')
+    parser.add_argument(
+        '--engine',
+        type=str,
+        default=WGWM.DEF_ENGINE,
+        choices=sorted( WGWM.ENGINES ),
+        help='Simulation engine, see WG_Worker_Main')
+    parser.add_argument(
+        '--block_size',
+        type=int,
+        default=DEF_BLOCK_SIZE,
+        help='Realizations per block for the block engine')
+    parser.add_argument(
+        '--seed_mode',
+        type=str,
+        default=WGWM.DEF_SEED_MODE,
+        choices=[ "legacy", "spawn" ],
+        help='legacy for the original seeds or spawn for SeedSequence streams')
+    parser.add_argument(
+        '--out_format',
+        type=str,
+        default=WGI.OUT_FORMAT,
+        choices=[ "pickle", "store", "npy" ],
+        help='Output format, see WG_OutputStore')
+    parser.add_argument(
+        '--work_dir',
+        type=str,
+        default="",
+        help='Directory for inputs and outputs; temporary when not given')
+    parser.add_argument(
+        '--keep_files',
+        type=int,
+        default=0,
+        help='1 to keep the inputs and outputs')
+    parser.add_argument(
+        '--json',
+        type=str,
+        default="",
+        help='Optional file for the results as JSON')
+    args = parser.parse_args()
+    Results = benchCases( args.num_real, args.end_year, args.num_grids,
+                          Engine=args.engine, BlockSize=args.block_size,
+                          SeedMode=args.seed_mode, OutFormat=args.out_format,
+                          WorkDir=( args.work_dir if len( args.work_dir ) > 0
+                                    else None ),
+                          KeepFiles=bool( args.keep_files ) )
+    printReport( Results )
+    if len( args.json ) > 0:
+        with open( args.json, 'w' ) as OF:
+            json.dump( Results, OF, indent=1 )
+        # end with
+    # end if
+
+
+#EOF
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_BlockEngine
+   :platform: Windows, Linux
+   :synopsis: Vectorized engine that simulates a block of realizations at once
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+Alternate to the day-by-day loop in WG_Worker_Main.WG_Reference_Main. A 
+block of R realizations is simulated together and the results are returned 
+as numpy arrays with shape (R, days, PRE_START_IND + NUM_LOCA_GRID) that use
+the same column layout as WG_HighRealResults.H0_REAL and H1_REAL.
+
+The time loop is replaced by the following steps.
+
+    1. Month, day of year, and H0 and H1 period indexes come from the run
+       calendar, see WG_Calendar.
+    2. The random values for each realization are drawn in bulk, one call
+       per random stream.
+    3. Wet and dry state sequences are generated spell by spell for each
+       realization and then expanded to days, see 
+       WG_SpellLength.spellStates.
+    4. Precipitation depths are sampled for every day and grid with one
+       batched inverse CDF lookup, see WG_Dists_Samples.sampleDepthDays,
+       and dry days are then set to zero. Sampling the dry days too keeps
+       the use of the random values the same as in the legacy loop, which
+       is needed to stay bit for bit identical with it.
+    5. The temperature residual recurrence is advanced one day at a time for
+       all realizations at once and Tmax and Tmin are calculated for all days
+       in one expression.
+
+Seeding mode
+
+WG_Seeds.SEED_MODE_LEGACY reproduces the reference engine realization
+bit for bit.
+It relies on the way the legacy samplers are seeded: every sampler of a type
+receives the same seed, PDSeed + 2*RealNum for instance, and draws exactly one
+value per day plus one value during set-up. Consequently, the value a legacy
+sampler produces on day j is element j + 1 of one bulk draw from a new
+RandomState with the same seed. Spell length distributions with the same
+negative binomial parameters produce the same stream and so are drawn once.
+Any change to the legacy seeding or to the number of draws per day in
+WG_Dists_Samples.sampleAll breaks this equivalence. WG_Seeds.SEED_MODE_SPAWN
+uses the same bulk draws from independent SeedSequence spawned streams.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+import numpy as np
+import WG_Inputs as WGI
+import WG_Dists_Samples as WGDS
+import WG_OtherWeather as WGOW
+import WG_HighRealResults as WGHRR
+import WG_Seeds as WGSD
+import WG_Calendar as WGCal
+import WG_DistTables as WGDT
+import WG_SpellLength as WGSL
+
+# globals
+RUN_SETUP = None
+"""Set-up for the current process, see getRunSetup"""
+
+
+#--------------------------------------------------------------------------
+# per run set-up
+class BlockSetup(object):
+    """Holds everything that is the same for every realization in a run:
+    the calendar, the bulk sampling set-up, and the smoothed temperature 
+    arrays by day. Use getRunSetup to build it once per process.
+    """
+
+    def __init__( self ):
+        """Initialization method"""
+        super().__init__()
+        Cal = WGCal.getRunCalendar()
+        self.Calendar = Cal
+        self.DT_INDEX = Cal.DT_INDEX
+        self.NumDays = Cal.NumDays
+        self.MonthA = Cal.MonthA
+        self.DoYA = Cal.DoYA
+        self.H0PerA = Cal.H0PerA
+        self.H1IsProjA = Cal.H1IsProjA
+        self.H1PerA = Cal.H1PerA
+        self.Samples = WGDS.BulkSampleSetup( self.MonthA, self.H0PerA,
+                                             self.H1IsProjA, self.H1PerA,
+                                             Cal.InitH1IsProj, Cal.InitH1Per )
+        self.InputArrays = WGOW.INPUT_ARRAYS
+        self._setTemps()
+
+    def _setTemps( self ):
+        """Arrange the smoothed temperature inputs and the A and B matrices
+        by day."""
+        Inputs = WGOW.getInputArrays()
+        self.AStack, self.BStack, self.H0MatA, self.H1MatA = \
+                    WGOW.periodMatrices( Inputs, self.H0PerA, self.H1IsProjA,
+                                         self.H1PerA )
+        for tName, tArray in WGOW.dayTempArrays( Inputs, self.DoYA, 
+                        self.H0PerA, self.H1IsProjA, self.H1PerA ).items():
+            setattr( self, tName, tArray )
+        # end for
+
+
+def getRunSetup():
+    """Get the set-up for this process, building it on first use or when
+    the run calendar, the distribution tables, or the loaded input arrays
+    have changed.
+
+    Returns:
+        BlockSetup: the run set-up
+
+    """
+    # globals
+    global RUN_SETUP
+    # start
+    if ( RUN_SETUP is None ) or \
+            ( RUN_SETUP.Calendar is not WGCal.getRunCalendar() ) or \
+            ( RUN_SETUP.Samples.Tables is not WGDT.getRunTables() ) or \
+            ( RUN_SETUP.InputArrays is not WGOW.INPUT_ARRAYS ):
+        RUN_SETUP = BlockSetup()
+    # end if
+    return RUN_SETUP
+
+def cleanRunSetup():
+    """Release the set-up for this process"""
+    global RUN_SETUP
+    RUN_SETUP = None
+    # end
+    return
+
+#--------------------------------------------------------------------------
+# main block simulation
+def simulateBlock( Setup, RealNums, SNSeed, PDSeed, WSLSeed, DSLSeed,
+                   SeedMode=WGSD.SEED_MODE_LEGACY ):
+    """Simulate a block of realizations.
+
+    Args:
+        Setup (BlockSetup): run level set-up
+        RealNums (list): realization numbers in this block
+        SNSeed (int): base seed for the standard normal sampler
+        PDSeed (int): the precipitation depth sampler seed
+        WSLSeed (int): wet state spell length sampling seed
+        DSLSeed (int): dry state spell length sampling seed
+        SeedMode (str): seeding mode, see WG_Seeds
+
+    Returns:
+        tuple: ( H0Block, H1Block ) float32 arrays with shape
+        (R, days, PRE_START_IND + NUM_LOCA_GRID)
+
+    """
+    # start
+    WGSD.checkSeedMode( SeedMode )
+    NumReal = len( RealNums )
+    NumDays = Setup.NumDays
+    Samples = Setup.Samples
+    TotNum = WGHRR.PRE_START_IND + WGI.NUM_LOCA_GRID
+    # draw the random values in bulk for each realization
+    PUnif = np.zeros( (NumReal, NumDays + 1), dtype=np.float64 )
+    Eps = np.zeros( (NumReal, NumDays), dtype=np.float64 )
+    H0WetDur = np.zeros( (NumReal, NumDays), dtype=np.int64 )
+    H0DryDur = np.zeros( (NumReal, NumDays), dtype=np.int64 )
+    H1WetDur = np.zeros( (NumReal, NumDays), dtype=np.int64 )
+    H1DryDur = np.zeros( (NumReal, NumDays), dtype=np.int64 )
+    H0InitDur = np.zeros( NumReal, dtype=np.int64 )
+    H1InitDur = np.zeros( NumReal, dtype=np.int64 )
+    for iI, RealNum in enumerate( RealNums ):
+        Streams = WGSD.realStreams( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed,
+                                    SeedMode=SeedMode )
+        PUnif[iI, :] = WGDS.drawDepthUniforms( Streams[WGSD.PDEPTH_STREAM],
+                                               NumDays )
+        Eps[iI, :] = WGOW.drawEpsilons( Streams[WGSD.STD_NORM_STREAM], 
+                                        NumDays )[1:]
+        WetVals, WetInit = WGDS.drawSpellDays( Streams[WGSD.WET_SPELL_STREAM],
+                                    Samples.WetStreams,
+                                    [ Samples.H0WetIds, Samples.H1WetIds ],
+                                    [ Samples.H0WetInit, Samples.H1WetInit ] )
+        DryVals, DryInit = WGDS.drawSpellDays( Streams[WGSD.DRY_SPELL_STREAM],
+                                    Samples.DryStreams,
+                                    [ Samples.H0DryIds, Samples.H1DryIds ],
+                                    [ Samples.H0DryInit, Samples.H1DryInit ] )
+        H0WetDur[iI, :] = WetVals[0]
+        H1WetDur[iI, :] = WetVals[1]
+        H0DryDur[iI, :] = DryVals[0]
+        H1DryDur[iI, :] = DryVals[1]
+        if PUnif[iI, 0] > 0.5:
+            H0InitDur[iI] = WetInit[0]
+            H1InitDur[iI] = WetInit[1]
+        else:
+            H0InitDur[iI] = DryInit[0]
+            H1InitDur[iI] = DryInit[1]
+    # end of realization for
+    InitWet = PUnif[:, 0] > 0.5
+    # states
+    H0Wet = WGSL.spellStates( InitWet, H0InitDur, H0WetDur, H0DryDur )
+    H1Wet = WGSL.spellStates( InitWet, H1InitDur, H1WetDur, H1DryDur )
+    # precipitation depth, only wet days keep the sampled depth
+    H0Block = np.zeros( (NumReal, NumDays, TotNum), dtype=np.float32 )
+    H1Block = np.zeros( (NumReal, NumDays, TotNum), dtype=np.float32 )
+    DayUnif = PUnif[:, 1:]
+    for tBlock, tWet, tRowA in [ ( H0Block, H0Wet, Samples.H0DepRowA ),
+                                 ( H1Block, H1Wet, Samples.H1DepRowA ) ]:
+        cDep = WGDS.sampleDepthDays( Samples.Tables, tRowA, Samples.MonthA,
+                                     DayUnif )
+        tBlock[:, :, WGHRR.PRE_START_IND:] = np.where( tWet[:, :, None], cDep,
+                                                       np.float32( 0.0 ) )
+    # end of pathway for
+    # temperature
+    Chi0, Chi1 = WGOW.calcChiSeries( Setup.AStack, Setup.BStack, Setup.H0MatA,
+                                     Setup.H1MatA, Eps )
+    H0Block[:, :, WGHRR.TMAX_IND] = WGOW.calcTempSeries( Chi0[:, :, 0], H0Wet,
+                    Setup.H0TmaxAve, Setup.H0TmaxStd, Setup.TmaxFallback )
+    H0Block[:, :, WGHRR.TMIN_IND] = WGOW.calcTempSeries( Chi0[:, :, 1], H0Wet,
+                    Setup.H0TminAve, Setup.H0TminStd, Setup.TminFallback )
+    H1Block[:, :, WGHRR.TMAX_IND] = WGOW.calcTempSeries( Chi1[:, :, 0], H1Wet,
+                    Setup.H1TmaxAve, Setup.H1TmaxStd, Setup.TmaxFallback )
+    H1Block[:, :, WGHRR.TMIN_IND] = WGOW.calcTempSeries( Chi1[:, :, 1], H1Wet,
+                    Setup.H1TminAve, Setup.H1TminStd, Setup.TminFallback )
+    # end
+    return ( H0Block, H1Block )
+
+# EOF
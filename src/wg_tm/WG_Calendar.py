@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_Calendar
+   :platform: Windows, Linux
+   :synopsis: Per-day calendar and period index table for a run
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+Month, day of year, year, and the H0 and H1 period of each simulation day
+are the same for every realization. RunCalendar calculates them once for 
+WG_Inputs.START_DATE to WG_Inputs.END_DATE as read-only int arrays, 
+replacing the per-day datetime comparisons of WG_Worker_Main.detH0Period 
+and WG_Worker_Main.detH1Period. Sampling, the temperature recurrence, PET, 
+and the monthly water balance all read these arrays.
+
+getRunCalendar builds the calendar once per process. Pool workers either
+build their own, in WG_Worker_Main.initWorker, or attach to the copy 
+published in shared memory by WG_SharedInputs.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+import numpy as np
+import pandas as pd
+# project imports
+import WG_Inputs as WGI
+
+# parameters
+H1_TYPE_DATA = 0
+"""H1 period type value for data period days"""
+H1_TYPE_PROJ = 1
+"""H1 period type value for climate projection period days"""
+CALENDAR_ARRAY_NAMES = [ "MonthA", "DoYA", "YearA", "H0PerA", "H1TypeA", 
+                         "H1PerA" ]
+"""Names of the RunCalendar arrays by day"""
+# globals
+RUN_CALENDAR = None
+"""Calendar for the current process, see getRunCalendar"""
+
+
+#--------------------------------------------------------------------------
+# period indexes
+def calcH0Periods( DT_INDEX ):
+    """Vectorized equivalent of WG_Worker_Main.detH0Period for a full time index.
+
+    Args:
+        DT_INDEX (pd.DatetimeIndex): simulation time index
+
+    Returns:
+        np.array: int32 data period index for each day
+
+    """
+    # start
+    Days = DT_INDEX.to_numpy()
+    NumDays = len( Days )
+    NumDataPeriods = len( WGI.DATA_PERIODS )
+    H0PerA = np.full( NumDays, -1, dtype=np.int32 )
+    if NumDataPeriods <= 0:
+        return H0PerA
+    if NumDataPeriods == 1:
+        H0PerA[:] = 0
+        return H0PerA
+    # go in reverse order so that the first matching period is kept
+    for iI in range( NumDataPeriods - 1, -1, -1 ):
+        tPer = WGI.DATA_PERIODS[iI]
+        InMask = ( ( Days >= np.datetime64( tPer[0] ) ) &
+                   ( Days <= np.datetime64( tPer[1] ) ) )
+        H0PerA[InMask] = iI
+    # end of for
+    H0PerA[Days > np.datetime64( WGI.DATA_PERIODS[NumDataPeriods-1][1] )] = \
+                                                        NumDataPeriods - 1
+    H0PerA[Days < np.datetime64( WGI.DATA_PERIODS[0][0] )] = 0
+    # end
+    return H0PerA
+
+def calcH1Periods( DT_INDEX ):
+    """Vectorized equivalent of WG_Worker_Main.detH1Period for a full time index.
+
+    Args:
+        DT_INDEX (pd.DatetimeIndex): simulation time index
+
+    Returns:
+        tuple: (H1IsProjA, H1PerA) where H1IsProjA is a bool array that is
+        True for climate projection period days and H1PerA is the int32
+        period index within the period type
+
+    """
+    # start
+    Days = DT_INDEX.to_numpy()
+    NumDays = len( Days )
+    H1IsProjA = np.zeros( NumDays, dtype=bool )
+    H1PerA = np.full( NumDays, -1, dtype=np.int32 )
+    NumDataPeriods = len( WGI.DATA_PERIODS )
+    if NumDataPeriods <= 0:
+        return ( H1IsProjA, H1PerA )
+    InData = np.zeros( NumDays, dtype=bool )
+    for iI in range( NumDataPeriods - 1, -1, -1 ):
+        tPer = WGI.DATA_PERIODS[iI]
+        InMask = ( ( Days >= np.datetime64( tPer[0] ) ) &
+                   ( Days <= np.datetime64( tPer[1] ) ) )
+        H1PerA[InMask] = iI
+        InData |= InMask
+    # end of for
+    H1IsProjA[~InData] = True
+    NumProjPeriods = len( WGI.PROJ_PERIODS )
+    if NumProjPeriods <= 0:
+        return ( H1IsProjA, H1PerA )
+    ProjPerA = np.full( NumDays, -1, dtype=np.int32 )
+    if NumProjPeriods == 1:
+        ProjPerA[:] = 0
+    else:
+        for iI in range( NumProjPeriods - 1, -1, -1 ):
+            tPer = WGI.PROJ_PERIODS[iI]
+            InMask = ( ( Days >= np.datetime64( tPer[0] ) ) &
+                       ( Days <= np.datetime64( tPer[1] ) ) )
+            ProjPerA[InMask] = iI
+        # end of for
+        ProjPerA[Days > np.datetime64( WGI.PROJ_PERIODS[NumProjPeriods-1][1] )] = \
+                                                        NumProjPeriods - 1
+        ProjPerA[Days < np.datetime64( WGI.PROJ_PERIODS[0][0] )] = 0
+    # end if
+    H1PerA[~InData] = ProjPerA[~InData]
+    # end
+    return ( H1IsProjA, H1PerA )
+
+#--------------------------------------------------------------------------
+# calendar
+class RunCalendar(object):
+    """Per-day calendar and period indexes over the simulation time index
+    """
+
+    def __init__( self, DT_INDEX=None, Arrays=None ):
+        """Initialization method
+
+        KWargs:
+            DT_INDEX (pd.DatetimeIndex): daily time index; defaults to 
+                                         START_DATE to END_DATE
+            Arrays (dict): existing arrays by name, see 
+                           CALENDAR_ARRAY_NAMES, for example shared memory
+                           views; calculated when None
+
+        """
+        super().__init__()
+        if DT_INDEX is None:
+            DT_INDEX = pd.date_range( start=WGI.START_DATE, end=WGI.END_DATE,
+                                      freq='D' )
+        self.DT_INDEX = DT_INDEX
+        self.NumDays = len( DT_INDEX )
+        if Arrays is None:
+            Arrays = dict()
+            Arrays["MonthA"] = DT_INDEX.month.to_numpy().astype( np.int32 )
+            Arrays["DoYA"] = DT_INDEX.dayofyear.to_numpy().astype( np.int32 )
+            Arrays["YearA"] = DT_INDEX.year.to_numpy().astype( np.int32 )
+            Arrays["H0PerA"] = calcH0Periods( DT_INDEX )
+            H1IsProjA, Arrays["H1PerA"] = calcH1Periods( DT_INDEX )
+            Arrays["H1TypeA"] = np.where( H1IsProjA, H1_TYPE_PROJ, 
+                                          H1_TYPE_DATA ).astype( np.int32 )
+        # end if
+        for tName in CALENDAR_ARRAY_NAMES:
+            cArray = Arrays[tName]
+            cArray.flags.writeable = False
+            setattr( self, tName, cArray )
+        # end for
+        self.H1IsProjA = self.H1TypeA == H1_TYPE_PROJ
+        self.H1IsProjA.flags.writeable = False
+        # the starting state uses the end date period for H1, as in
+        # the reference engine, WG_Worker_Main.WG_Reference_Main
+        EndIsProj, EndPer = calcH1Periods( DT_INDEX[-1:] )
+        self.InitH1IsProj = bool( EndIsProj[0] )
+        self.InitH1Per = int( EndPer[0] )
+
+    def matches( self, DT_INDEX ):
+        """True if this calendar is for DT_INDEX"""
+        return ( ( len( DT_INDEX ) == self.NumDays ) and 
+                 ( DT_INDEX[0] == self.DT_INDEX[0] ) and
+                 ( DT_INDEX[-1] == self.DT_INDEX[-1] ) )
+
+    def arrays( self ):
+        """Arrays by name for WG_SharedInputs"""
+        return { x : getattr( self, x ) for x in CALENDAR_ARRAY_NAMES }
+
+
+def getRunCalendar():
+    """Get the calendar for this process, building it on first use or when
+    START_DATE or END_DATE has changed.
+
+    Returns:
+        RunCalendar: the run calendar
+
+    """
+    # globals
+    global RUN_CALENDAR
+    # start
+    if ( RUN_CALENDAR is None ) or ( RUN_CALENDAR.DT_INDEX[0] != 
+            pd.Timestamp( WGI.START_DATE ) ) or ( RUN_CALENDAR.DT_INDEX[-1] != 
+            pd.Timestamp( WGI.END_DATE ) ):
+        RUN_CALENDAR = RunCalendar()
+    # end if
+    return RUN_CALENDAR
+
+def calendarFor( DT_INDEX ):
+    """The run calendar when it is for DT_INDEX and otherwise a new
+    calendar for DT_INDEX.
+
+    Args:
+        DT_INDEX (pd.DatetimeIndex): daily time index
+
+    Returns:
+        RunCalendar: calendar for DT_INDEX
+
+    """
+    Cal = getRunCalendar()
+    if Cal.matches( DT_INDEX ):
+        return Cal
+    return RunCalendar( DT_INDEX=DT_INDEX )
+
+def setRunCalendar( Cal ):
+    """Use Cal as the calendar for this process"""
+    global RUN_CALENDAR
+    RUN_CALENDAR = Cal
+    # end
+    return
+
+def cleanRunCalendar():
+    """Release the calendar for this process"""
+    global RUN_CALENDAR
+    RUN_CALENDAR = None
+    # end
+    return
+
+
+#EOF
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_DepthBenchmark
+   :platform: Windows, Linux
+   :synopsis: Accuracy and throughput of the precipitation depth samplers
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+Compares the two depth samplers for the distributions of the current
+WG_Inputs:
+
+* knots: interpolation of the 101 CDF_PROBS knots from 
+  WG_PrecipDepth.calcCDFKnots, WG_DistTables.interpKnots
+* analytic: inversion of the truncated mixed exponential CDF, 
+  WG_PrecipDepth.mixedExpQuantile
+
+Accuracy is the error in probability, | F( sample( u ) ) - u |, with F the
+analytic truncated CDF, over all probabilities and in the upper tail. 
+Throughput is samples per second for batched draws over randomly chosen 
+distributions. Table construction time is also reported.
+
+python WG_DepthBenchmark.py --num_samples 1000000
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+# imports
+import time
+import json
+import argparse
+import numpy as np
+# project imports
+import WG_PrecipDepth as WGPD
+import WG_DistTables as WGDT
+
+# parameters
+DEF_NUM_SAMPLES = 1000000
+"""Default number of samples for each sampler"""
+DEF_SEED = 20210
+"""Default seed for the benchmark probabilities"""
+TAIL_PROB = 0.99
+"""Probabilities above this are the upper tail"""
+
+
+def _errorStats( ProbErr ):
+    """Max and mean absolute error. Both are NaN for no samples, for 
+    example no probabilities above TAIL_PROB."""
+    if ProbErr.size == 0:
+        return { "max" : float( "nan" ), "mean" : float( "nan" ) }
+    return { "max" : float( np.max( ProbErr ) ), 
+             "mean" : float( np.mean( ProbErr ) ) }
+
+def benchDepthSamplers( NumSamples=DEF_NUM_SAMPLES, Seed=DEF_SEED, 
+                        Tables=None ):
+    """Accuracy and throughput of the knots and analytic depth samplers
+
+    KWargs:
+        NumSamples (int): number of samples for each sampler
+        Seed (int): seed for the probabilities and distribution choice
+        Tables (WG_DistTables.DistTables): tables to use; built from 
+                                           WG_Inputs when None
+
+    Returns:
+        dict: benchmark results
+    """
+    # start
+    StartTime = time.perf_counter()
+    if Tables is None:
+        Tables = WGDT.DistTables()
+    BuildSecs = time.perf_counter() - StartTime
+    KnotRows = Tables.DepthKnots.reshape( -1, WGPD.NUM_CDF_KNOTS )
+    Params = Tables.DepthParams.reshape( -1, 4 )
+    rng = np.random.default_rng( Seed )
+    RowIds = rng.integers( 0, len( Params ), NumSamples )
+    Unif = rng.random( NumSamples )
+    # only the knots need construction
+    StartTime = time.perf_counter()
+    for cP in Params[:min( 200, len( Params ) )]:
+        WGPD.calcCDFKnots( cP[0], cP[1], cP[2], MaxDepth=cP[3] )
+    KnotSecs = ( time.perf_counter() - StartTime ) / min( 200, len( Params ) )
+    # throughput
+    StartTime = time.perf_counter()
+    KnotDepths = WGDT.interpKnots( Unif, KnotRows, RowIds )
+    KnotRate = NumSamples / ( time.perf_counter() - StartTime )
+    cP = Params[RowIds]
+    StartTime = time.perf_counter()
+    ExactDepths = WGPD.mixedExpQuantile( Unif, cP[:, 0], cP[:, 1], cP[:, 2],
+                                         Upper=cP[:, 3] )
+    ExactRate = NumSamples / ( time.perf_counter() - StartTime )
+    # accuracy against the analytic CDF
+    TailMask = Unif > TAIL_PROB
+    ResDict = { "num_samples" : int( NumSamples ),
+                "num_dists" : int( len( Params ) ),
+                "table_build_sec" : BuildSecs, }
+    for tName, tDepths, tRate in [ ( "knots", KnotDepths, KnotRate ),
+                                   ( "analytic", ExactDepths, ExactRate ) ]:
+        ProbErr = np.abs( WGPD.truncMixedExpCDF( tDepths, cP[:, 0], cP[:, 1], 
+                                                 cP[:, 2], Upper=cP[:, 3] ) - Unif )
+        ResDict[tName] = { "samples_per_sec" : tRate,
+                           "prob_error" : _errorStats( ProbErr ),
+                           "tail_prob_error" : _errorStats( ProbErr[TailMask] ), }
+    # end for
+    ResDict["knots"]["construct_sec_per_dist"] = KnotSecs
+    ResDict["analytic"]["construct_sec_per_dist"] = 0.0
+    DepthDiff = np.abs( KnotDepths - ExactDepths )
+    ResDict["depth_diff_mm"] = { "all" : _errorStats( DepthDiff ),
+                                 "tail" : _errorStats( DepthDiff[TailMask] ) }
+    return ResDict
+
+def printReport( ResDict ):
+    """Print benchmark results as a table"""
+    print( "%d samples over %d distributions" % ( ResDict["num_samples"], 
+                                                  ResDict["num_dists"] ) )
+    print( "%-9s %14s %14s %14s %14s" % ( "sampler", "samples/sec", 
+           "max P error", "tail max P err", "construct sec" ) )
+    for tName in [ "knots", "analytic" ]:
+        cD = ResDict[tName]
+        print( "%-9s %14.4g %14.4g %14.4g %14.4g" % ( tName, 
+               cD["samples_per_sec"], cD["prob_error"]["max"],
+               cD["tail_prob_error"]["max"], cD["construct_sec_per_dist"] ) )
+    # end for
+    print( "Depth difference, mm: max %.4g, mean %.4g, tail max %.4g" % (
+           ResDict["depth_diff_mm"]["all"]["max"], 
+           ResDict["depth_diff_mm"]["all"]["mean"],
+           ResDict["depth_diff_mm"]["tail"]["max"] ) )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Depth sampler benchmark')
+    parser.add_argument(
+        '--num_samples',
+        type=int,
+        default=DEF_NUM_SAMPLES,
+        help='Number of samples for each sampler')
+    parser.add_argument(
+        '--json',
+        type=str,
+        default="",
+        help='Optional file for the results as JSON')
+    args = parser.parse_args()
+    Results = benchDepthSamplers( NumSamples=args.num_samples )
+    printReport( Results )
+    if len( args.json ) > 0:
+        with open( args.json, 'w' ) as OF:
+            json.dump( Results, OF, indent=1 )
+        # end with
+    # end if
+
+
+#EOF
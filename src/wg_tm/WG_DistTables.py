@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_DistTables
+   :platform: Windows, Linux
+   :synopsis: Array-backed tables of the spell and precipitation depth distributions
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+Holds every spell length and precipitation depth distribution used in a
+run as numpy arrays rather than as nested dictionaries of
+WG_SpellLength.NegBinomial and WG_PrecipDepth.MixedExp objects.
+
+* Precipitation depth CDFs are stored as one (row, grid, month,
+  NUM_CDF_KNOTS) array of depths at the WG_PrecipDepth.CDF_PROBS
+  probability knots. Rows stack the data period, H0 projection period, and
+  H1 projection period distribution sets.
+* Spell lengths are stored as (period, month, 2) arrays of the negative
+  binomial ( N, P ) parameters for data periods and projection periods.
+
+Both tables support batched sampling over arbitrary, broadcastable index
+arrays so that one lookup serves every grid and day. The knots and
+parameters are identical to those of the distribution objects so that
+sampled values are the same.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+import os
+import json
+import hashlib
+import numpy as np
+# project imports
+import WG_PrecipDepth as WGPD
+import WG_SpellLength as WGSL
+import WG_Inputs as WGI
+
+# depth distribution sets
+DATA_DEPTH_SET = 0
+"""Depth distribution set index for data periods, both pathways"""
+H0_DEPTH_SET = 1
+"""Depth distribution set index for projection periods, H0 pathway"""
+PROJ_DEPTH_SET = 2
+"""Depth distribution set index for projection periods, H1 pathway"""
+# table cache
+DEPTH_SAMPLER_KNOTS = "knots"
+"""Depth sampling by interpolation of the CDF_PROBS knots"""
+DEPTH_SAMPLER_ANALYTIC = "analytic"
+"""Depth sampling by inversion of the analytic truncated CDF"""
+TABLE_ARRAY_NAMES = [ "SetOffsets", "DepthKnots", "DepthParams", "DataWetNB",
+                      "DataDryNB", "ProjWetNB", "ProjDryNB" ]
+"""Names of the DistTables arrays written to the cache file"""
+TABLE_CACHE_PREFIX = "DistTables"
+"""File name prefix for the cached tables; the content hash is appended"""
+TABLE_CACHE_VERSION = 2
+"""Version of the cached table layout. Included in the content hash so 
+that a layout change does not read stale files."""
+RUN_TABLES = None
+"""Distribution tables for the current process, see setRunTables"""
+
+
+class DistTables(object):
+    """Spell length and precipitation depth distribution tables for a run
+    """
+
+    def __init__( self, Arrays=None ):
+        """Build the tables from the parameters in WG_Inputs. Uses the same
+        parameters, truncation options, and checks as
+        WG_Dists_Samples.setDistributions.
+
+        KWargs:
+            Arrays (dict): previously built arrays by TABLE_ARRAY_NAMES, 
+                           for example from a cache file. Nothing is 
+                           calculated when provided.
+
+        """
+        super().__init__()
+        self.NumGrids = WGI.NUM_LOCA_GRID
+        if Arrays is not None:
+            for tName in TABLE_ARRAY_NAMES:
+                setattr( self, tName, np.asarray( Arrays[tName] ) )
+            self.NumRows = self.DepthKnots.shape[0]
+            return
+        # end if
+        # first row of each depth set in the stacked table
+        self.SetOffsets = np.array( [ 0, WGI.NUM_DATA_PERIODS,
+                                      WGI.NUM_DATA_PERIODS + WGI.NUM_PROJ_PERIODS ],
+                                    dtype=np.int32 )
+        self.NumRows = WGI.NUM_DATA_PERIODS + ( 2 * WGI.NUM_PROJ_PERIODS )
+        self.DepthKnots = np.zeros( ( self.NumRows, self.NumGrids, 12,
+                                      WGPD.NUM_CDF_KNOTS ), dtype=np.float64 )
+        # last axis is ( alpha, mu1, mu2, truncation depth )
+        self.DepthParams = np.zeros( ( self.NumRows, self.NumGrids, 12, 4 ),
+                                     dtype=np.float64 )
+        for iI in range( WGI.NUM_DATA_PERIODS ):
+            self._setDepthRow( DATA_DEPTH_SET, iI )
+        for iI in range( WGI.NUM_PROJ_PERIODS ):
+            self._setDepthRow( H0_DEPTH_SET, iI )
+            self._setDepthRow( PROJ_DEPTH_SET, iI )
+        # end for
+        # spell tables, last axis is ( N, P )
+        self.DataWetNB = self._spellTable( WGI.DATA_WET_SPELL,
+                                           WGI.NUM_DATA_PERIODS )
+        self.DataDryNB = self._spellTable( WGI.DATA_DRY_SPELL,
+                                           WGI.NUM_DATA_PERIODS )
+        if ( WGI.SCEN_WET_SPELL_SWITCH <= 1 ):
+            self.ProjWetNB = self._spellTable( WGI.PROJ_WET_SPELL,
+                                               WGI.NUM_PROJ_PERIODS )
+            self.ProjDryNB = self._spellTable( WGI.PROJ_DRY_SPELL,
+                                               WGI.NUM_PROJ_PERIODS )
+        else:
+            self.ProjWetNB = np.repeat( self.DataWetNB[:1],
+                                        WGI.NUM_PROJ_PERIODS, axis=0 )
+            self.ProjDryNB = np.repeat( self.DataDryNB[:1],
+                                        WGI.NUM_PROJ_PERIODS, axis=0 )
+        # end if
+
+    def _setDepthRow( self, cSet, iI ):
+        """Calculate the CDF knots for every grid and month of one period
+        in one depth distribution set.
+
+        Args:
+            cSet (int): depth distribution set index
+            iI (int): period index within the set
+
+        """
+        # imports
+        from WG_Inputs import DATAP_TRUNC_OPTION, PROJP_TRUNC_OPTION
+        from WG_Inputs import H0_TRUNC_OPTION
+        # start
+        cRow = self.depthRows( cSet, iI )
+        for gG, jJ in enumerate( WGI.LOCA_KEYS ):
+            for kK in range( 1, 13, 1 ):
+                cRegionID = WGI.LOCA_GRID_MAP[jJ][kK]
+                if cSet == DATA_DEPTH_SET:
+                    cParams = WGI.DATA_PDEPTH[iI][cRegionID][kK]
+                    cMaxDepth = WGPD.getMaxDepth( jJ, kK, DATAP_TRUNC_OPTION, 1 )
+                elif cSet == H0_DEPTH_SET:
+                    # H0 projection periods use the first data period
+                    cParams = WGI.DATA_PDEPTH[0][cRegionID][kK]
+                    cMaxDepth = WGPD.getMaxDepth( jJ, kK, H0_TRUNC_OPTION, iI + 1 )
+                else:
+                    cParams = WGI.PROJ_PDEPTH[iI][jJ][kK]
+                    cMaxDepth = WGPD.getMaxDepth( jJ, kK, PROJP_TRUNC_OPTION, iI + 1 )
+                # end if
+                WGPD.checkMixedExpParams( cParams[0], cParams[1], cParams[2] )
+                self.DepthParams[cRow, gG, kK - 1, :] = [ float( cParams[0] ),
+                                    float( cParams[1] ), float( cParams[2] ),
+                                    float( cMaxDepth ) ]
+                self.DepthKnots[cRow, gG, kK - 1, :] = WGPD.calcCDFKnots(
+                                    float( cParams[0] ), float( cParams[1] ),
+                                    float( cParams[2] ), MaxDepth=cMaxDepth )
+            # end of month for
+        # end of grid for
+
+    def _spellTable( self, SpellParams, NumPeriods ):
+        """Convert a list by period of month dictionaries of negative
+        binomial parameters to a checked (period, month, 2) array"""
+        NBTable = np.zeros( ( NumPeriods, 12, 2 ), dtype=np.float64 )
+        for iI in range( NumPeriods ):
+            for kK in range( 1, 13, 1 ):
+                cN = float( SpellParams[iI][kK][0] )
+                cP = float( SpellParams[iI][kK][1] )
+                WGSL.checkNegBinomParams( cN, cP )
+                NBTable[iI, kK - 1, :] = [ cN, cP ]
+            # end of month for
+        # end of period for
+        return NBTable
+
+    def depthRows( self, SetIdx, PerIdx ):
+        """Get the stacked table row for depth distribution set and period
+        indexes. Works with scalars or arrays.
+
+        Args:
+            SetIdx (int or np.array): depth distribution set index
+            PerIdx (int or np.array): period index within the set
+
+        Returns:
+            int or np.array: row index in DepthKnots
+
+        """
+        return self.SetOffsets[SetIdx] + PerIdx
+
+    def spellParams( self, IsProj, PerIdx, Month, WetSpell ):
+        """Look up negative binomial parameters. Works with scalars or
+        broadcastable arrays.
+
+        Args:
+            IsProj (bool or np.array): True for a climate projection period
+            PerIdx (int or np.array): period index within the period type
+            Month (int or np.array): month from 1-12
+            WetSpell (bool): True for wet spells, False for dry spells
+
+        Returns:
+            tuple: ( N, P ) float or np.array negative binomial parameters
+
+        """
+        # start
+        if WetSpell:
+            DataNB = self.DataWetNB
+            ProjNB = self.ProjWetNB
+        else:
+            DataNB = self.DataDryNB
+            ProjNB = self.ProjDryNB
+        # end if
+        IsProj = np.asarray( IsProj, dtype=bool )
+        PerIdx = np.asarray( PerIdx )
+        MonIdx = np.asarray( Month ) - 1
+        # index each table only with periods valid for it
+        DPer = np.where( IsProj, 0, PerIdx )
+        PPer = np.where( IsProj, PerIdx, 0 )
+        NBVals = np.where( IsProj[..., None], ProjNB[PPer, MonIdx],
+                           DataNB[DPer, MonIdx] )
+        if NBVals.ndim == 1:
+            return ( float( NBVals[0] ), float( NBVals[1] ) )
+        return ( NBVals[..., 0], NBVals[..., 1] )
+
+    def sampleDepths( self, Unif, Rows, Grids, Months ):
+        """Inverse CDF sampling of precipitation depth. The index arrays are
+        broadcast together and Unif may add leading batch dimensions, for
+        example realizations, in front of the broadcast index shape. All
+        distributions share the CDF_PROBS knots, so all values are 
+        interpolated together with interpKnots and match 
+        WG_PrecipDepth.MixedExp.ranArray. With WG_Inputs.DEPTH_SAMPLER
+        "analytic", the analytic truncated CDF is inverted instead, see
+        WG_PrecipDepth.mixedExpQuantile.
+
+        Args:
+            Unif (np.array): probabilities between 0.0 and 1.0 with shape
+                             (..., *index shape)
+            Rows (int or np.array): DepthKnots row, see depthRows
+            Grids (int or np.array): grid index in LOCA_KEYS order
+            Months (int or np.array): month from 1-12
+
+        Returns:
+            np.array: depths with the shape of Unif
+
+        """
+        # start
+        Rows, Grids, Months = np.broadcast_arrays( Rows, Grids, Months )
+        Unif = np.asarray( Unif, dtype=np.float64 )
+        Unif = np.broadcast_to( Unif, np.broadcast_shapes( Unif.shape, 
+                                                           Rows.shape ) )
+        FlatId = np.ravel_multi_index( ( Rows, Grids, Months - 1 ),
+                                       self.DepthKnots.shape[:3] )
+        if WGI.DEPTH_SAMPLER == DEPTH_SAMPLER_ANALYTIC:
+            Params = self.DepthParams.reshape( -1, 4 )[FlatId]
+            return WGPD.mixedExpQuantile( Unif, Params[..., 0], Params[..., 1],
+                                          Params[..., 2], Upper=Params[..., 3] )
+        # end if
+        KnotRows = self.DepthKnots.reshape( -1, WGPD.NUM_CDF_KNOTS )
+        return interpKnots( Unif, KnotRows, FlatId )
+
+#-----------------------------------------------------------------------
+# batched interpolation
+def knotIndex( Unif ):
+    """Index jJ of the CDF_PROBS interval for each probability, with
+    CDF_PROBS[jJ] <= Unif < CDF_PROBS[jJ + 1], limited to the first and
+    last interval. Same as np.searchsorted( CDF_PROBS, Unif, side="right" )
+    - 1. CDF_PROBS are evenly spaced, so the index is calculated and then
+    moved by one where rounding put it in the neighbouring interval, which
+    avoids the binary search.
+
+    Args:
+        Unif (np.array): probabilities
+
+    Returns:
+        np.array: interval index for each probability
+
+    """
+    XP = WGPD.CDF_PROBS
+    LastK = len( XP ) - 1
+    with np.errstate( invalid="ignore" ):
+        jJ = ( ( Unif - XP[0] ) * ( LastK / ( XP[LastK] - XP[0] ) ) ).astype( np.intp )
+    np.clip( jJ, 0, LastK - 1, out=jJ )
+    jJ -= ( XP[jJ] > Unif ) & ( jJ > 0 )
+    jJ += ( XP[jJ + 1] <= Unif ) & ( jJ < LastK - 1 )
+    return jJ
+
+def interpKnots( Unif, KnotRows, RowIds ):
+    """Linear interpolation of depth knots at probabilities Unif for all 
+    values at once. Each value can use a different row of knots. Uses the
+    same arithmetic as np.interp, so results are identical to 
+    np.interp( Unif, CDF_PROBS, KnotRows[Row] ).
+
+    Args:
+        Unif (np.array): probabilities
+        KnotRows (np.array): depth knots with shape (rows, NUM_CDF_KNOTS)
+        RowIds (np.array): KnotRows row for each value, broadcast with Unif
+
+    Returns:
+        np.array: float64 depths with the shape of Unif
+
+    """
+    # start
+    XP = WGPD.CDF_PROBS
+    LastK = len( XP ) - 1
+    Unif = np.asarray( Unif, dtype=np.float64 )
+    jJ = knotIndex( Unif )
+    # flat positions of the interval start in the knot table
+    KnotFlat = np.ascontiguousarray( KnotRows ).ravel()
+    FlatInd = np.broadcast_to( RowIds, Unif.shape ) * len( XP ) + jJ
+    X0 = XP[jJ]
+    X1 = XP[jJ + 1]
+    Y0 = KnotFlat.take( FlatInd )
+    Y1 = KnotFlat.take( FlatInd + 1 )
+    Slope = ( Y1 - Y0 ) / ( X1 - X0 )
+    Depths = Slope * ( Unif - X0 ) + Y0
+    # same special cases as np.interp
+    BadMask = np.isnan( Depths )
+    if BadMask.any():
+        Depths[BadMask] = Slope[BadMask] * ( Unif[BadMask] - X1[BadMask] ) + \
+                          Y1[BadMask]
+        BadMask = np.isnan( Depths ) & ( Y0 == Y1 )
+        Depths[BadMask] = Y0[BadMask]
+    # end if
+    np.copyto( Depths, Y0, where=( Unif == X0 ) )
+    EdgeMask = ( Unif < XP[0] ) | ( Unif >= XP[LastK] ) | np.isnan( Unif )
+    if EdgeMask.any():
+        Depths[Unif < XP[0]] = Y0[Unif < XP[0]]
+        Depths[Unif >= XP[LastK]] = Y1[Unif >= XP[LastK]]
+        NanMask = np.isnan( Unif )
+        Depths[NanMask] = Unif[NanMask]
+    # end if
+    return Depths
+
+#-----------------------------------------------------------------------
+# table cache and run level tables
+def tablesHash():
+    """Content hash of everything in WG_Inputs that goes into the tables.
+
+    Returns:
+        str: hexadecimal SHA-256 digest
+
+    """
+    HashDict = { "version" : TABLE_CACHE_VERSION,
+                 "num_cdf_knots" : WGPD.NUM_CDF_KNOTS,
+                 "wd_thresh" : WGPD.WD_THRESH,
+                 "num_data_periods" : WGI.NUM_DATA_PERIODS,
+                 "num_proj_periods" : WGI.NUM_PROJ_PERIODS,
+                 "loca_keys" : list( WGI.LOCA_KEYS ),
+                 "loca_grid_map" : WGI.LOCA_GRID_MAP,
+                 "datap_trunc" : WGI.DATAP_TRUNC_OPTION,
+                 "projp_trunc" : WGI.PROJP_TRUNC_OPTION,
+                 "h0_trunc" : WGI.H0_TRUNC_OPTION,
+                 "scen_wet_spell" : WGI.SCEN_WET_SPELL_SWITCH,
+                 "data_pdepth" : WGI.DATA_PDEPTH,
+                 "proj_pdepth" : WGI.PROJ_PDEPTH,
+                 "data_wet_spell" : WGI.DATA_WET_SPELL,
+                 "data_dry_spell" : WGI.DATA_DRY_SPELL,
+                 "proj_wet_spell" : WGI.PROJ_WET_SPELL,
+                 "proj_dry_spell" : WGI.PROJ_DRY_SPELL,
+                 "mon_max_by_region" : WGI.MON_MAX_BY_REGION,
+                 "mon_max_by_pp" : WGI.MON_MAX_BY_PP,
+                 "mon_max_by_pp_prism" : WGI.MON_MAX_BY_PP_PRISM,
+                 "h0_max_by_pp" : WGI.H0_MAX_BY_PP,
+                 "h1_max_by_pp" : WGI.H1_MAX_BY_PP, }
+    HashStr = json.dumps( HashDict, sort_keys=True, default=repr )
+    return hashlib.sha256( HashStr.encode( "utf-8" ) ).hexdigest()
+
+def tablesCachePath( CacheDir=None ):
+    """Path of the cache file for the current WG_Inputs parameters.
+
+    KWargs:
+        CacheDir (str): cache directory; defaults to WG_Inputs.TABLE_CACHE_DIR
+                        and then to WG_Inputs.OUT_DIR
+
+    Returns:
+        str: cache file path
+
+    """
+    if CacheDir is None:
+        CacheDir = WGI.TABLE_CACHE_DIR
+    if CacheDir is None:
+        CacheDir = WGI.OUT_DIR
+    return os.path.normpath( os.path.join( CacheDir, "%s_%s.npz" % 
+                             ( TABLE_CACHE_PREFIX, tablesHash()[:32] ) ) )
+
+def saveTables( Tables, FilePath ):
+    """Write the tables to FilePath. The file is written under a temporary
+    name and then moved so that other processes never read a partial file.
+
+    Args:
+        Tables (DistTables): tables to save
+        FilePath (str): cache file path
+
+    """
+    TmpPath = "%s.%d.tmp" % ( FilePath, os.getpid() )
+    with open( TmpPath, 'wb' ) as OF:
+        np.savez( OF, **{ x : getattr( Tables, x ) for x in TABLE_ARRAY_NAMES } )
+    # end with
+    os.replace( TmpPath, FilePath )
+
+def loadTables( CacheDir=None ):
+    """Load the tables from the cache file for the current WG_Inputs 
+    parameters. The tables are built and the cache file written if it does
+    not exist yet.
+
+    KWargs:
+        CacheDir (str): cache directory, see tablesCachePath
+
+    Returns:
+        DistTables: the distribution tables
+
+    """
+    # start
+    FilePath = tablesCachePath( CacheDir )
+    if os.path.isfile( FilePath ):
+        with np.load( FilePath ) as NPZ:
+            Arrays = { x : NPZ[x] for x in TABLE_ARRAY_NAMES }
+        # end with
+        return DistTables( Arrays=Arrays )
+    # end if
+    Tables = DistTables()
+    CacheDir = os.path.dirname( FilePath )
+    if os.path.isdir( CacheDir ):
+        saveTables( Tables, FilePath )
+    # end if
+    return Tables
+
+def setRunTables( CacheDir=None ):
+    """Load the tables once for this process. Use as, or from, a pool
+    worker initializer.
+
+    KWargs:
+        CacheDir (str): cache directory, see tablesCachePath
+
+    """
+    global RUN_TABLES
+    RUN_TABLES = loadTables( CacheDir )
+    # end
+    return
+
+def getRunTables():
+    """Get the tables for this process, loading them on first use.
+
+    Returns:
+        DistTables: the distribution tables
+
+    """
+    if RUN_TABLES is None:
+        setRunTables()
+    return RUN_TABLES
+
+def cleanRunTables():
+    """Release the tables for this process"""
+    global RUN_TABLES
+    RUN_TABLES = None
+    # end
+    return
+
+
+#EOF
@@ -31,10 +31,13 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+# imports
+import numpy as np
 # project imports
 import WG_PrecipDepth as WGPD
 import WG_SpellLength as WGSL
 import WG_Inputs as WGI
+import WG_DistTables as WGDT
 
 # Distribution dictionaries
 # spell distribution dictionaries
@@ -386,6 +389,176 @@ def sampleAll():
     # end
     return
 
+#-----------------------------------------------------------------------
+# bulk sampling
+#
+# The legacy samplers all receive the same seed for a type and each one 
+# draws exactly one value per day plus one value in setTrackers. The value
+# that a legacy sampler produces on day j is then element j + 1 of a single
+# bulk draw from a new RandomState with that seed. Spell distributions with
+# the same parameters produce identical streams and are drawn once. The
+# bulk functions below use this to replace sampleAll with one call per
+# stream while reproducing the legacy values exactly.
+class BulkSampleSetup(object):
+    """Everything needed for bulk sampling that is the same for every 
+    realization: the distribution tables, the spell stream used on each day
+    by each pathway, and the depth table row used on each day by each 
+    pathway.
+    """
+
+    def __init__( self, MonthA, H0PerA, H1IsProjA, H1PerA, InitH1IsProj,
+                  InitH1Per, Tables=None ):
+        """Initialization method
+
+        Args:
+            MonthA (np.array): month by day
+            H0PerA (np.array): H0 data period index by day
+            H1IsProjA (np.array): bool, True for H1 projection period days
+            H1PerA (np.array): H1 period index by day
+            InitH1IsProj (bool): H1 projection flag for the starting state
+            InitH1Per (int): H1 period index for the starting state
+
+        KWargs:
+            Tables (WG_DistTables.DistTables): distribution tables to use;
+                                    defaults to WG_DistTables.getRunTables
+
+        """
+        super().__init__()
+        if Tables is None:
+            Tables = WGDT.getRunTables()
+        self.Tables = Tables
+        self.NumDays = len( MonthA )
+        self.MonthA = MonthA
+        StartMonth = int( MonthA[0] )
+        NoProj = np.zeros( self.NumDays, dtype=bool )
+        # spell streams are identified by the negative binomial parameters
+        self.WetStreams = list()
+        self.DryStreams = list()
+        self.H0WetIds, self.H0WetInit = self._spellIds( NoProj, H0PerA,
+                                False, int( H0PerA[0] ), StartMonth, True )
+        self.H0DryIds, self.H0DryInit = self._spellIds( NoProj, H0PerA,
+                                False, int( H0PerA[0] ), StartMonth, False )
+        self.H1WetIds, self.H1WetInit = self._spellIds( H1IsProjA, H1PerA,
+                                InitH1IsProj, InitH1Per, StartMonth, True )
+        self.H1DryIds, self.H1DryInit = self._spellIds( H1IsProjA, H1PerA,
+                                InitH1IsProj, InitH1Per, StartMonth, False )
+        # depth table row by day. The H0 pathway uses the H1 period type
+        # and index as in WG_Worker_Main.WG_Reference_Main
+        self.H0DepRowA = Tables.depthRows( np.where( H1IsProjA,
+                            WGDT.H0_DEPTH_SET, WGDT.DATA_DEPTH_SET ), H1PerA )
+        self.H1DepRowA = Tables.depthRows( np.where( H1IsProjA,
+                            WGDT.PROJ_DEPTH_SET, WGDT.DATA_DEPTH_SET ), H1PerA )
+
+    def _spellIds( self, IsProjA, PerA, InitIsProj, InitPer, InitMonth,
+                   WetSpell ):
+        """Map each day, and the starting state, to a spell stream.
+
+        Returns:
+            tuple: (StreamIdA, InitId) int32 stream index by day and the
+            stream index for the starting state
+
+        """
+        # start
+        if WetSpell:
+            StreamList = self.WetStreams
+        else:
+            StreamList = self.DryStreams
+        Combos, Inverse = np.unique( np.stack( [ IsProjA.astype( np.int32 ),
+                                                 PerA, self.MonthA ], axis=1 ),
+                                     axis=0, return_inverse=True )
+        ComboIds = np.zeros( len( Combos ), dtype=np.int32 )
+        for iI, tRow in enumerate( Combos ):
+            ComboIds[iI] = self._streamId( StreamList, self.Tables.spellParams(
+                        bool( tRow[0] ), int( tRow[1] ), int( tRow[2] ), WetSpell ) )
+        # end for
+        InitId = self._streamId( StreamList, self.Tables.spellParams(
+                        InitIsProj, InitPer, InitMonth, WetSpell ) )
+        return ( ComboIds[Inverse.ravel()], InitId )
+
+    def _streamId( self, StreamList, Params ):
+        """Get the index of Params in StreamList, adding it if needed"""
+        if Params not in StreamList:
+            StreamList.append( Params )
+        return StreamList.index( Params )
+
+
+def drawSpellDays( Stream, StreamList, IdArrays, InitIds ):
+    """Draw the spell lengths for one realization. Each stream is drawn with
+    one call, only up to the last day that uses it.
+
+    Args:
+        Stream (WG_Seeds.StreamSource): spell stream for this realization
+        StreamList (list): negative binomial ( N, P ) by stream index
+        IdArrays (list): stream index by day arrays, one per pathway
+        InitIds (list): starting state stream index, one per pathway
+
+    Returns:
+        tuple: ( list of spell length by day arrays, list of starting spell
+        lengths ) in the same order as IdArrays
+
+    """
+    # start
+    NumDays = len( IdArrays[0] )
+    # find the number of draws required for each stream
+    NumDraws = np.ones( len( StreamList ), dtype=np.int64 )
+    DayInds = np.arange( NumDays, dtype=np.int64 )
+    for tIds in IdArrays:
+        np.maximum.at( NumDraws, tIds, DayInds + 2 )
+    # end for
+    Draws = list()
+    for iI, tParams in enumerate( StreamList ):
+        rState = Stream.generator()
+        Draws.append( rState.negative_binomial( tParams[0], tParams[1],
+                                                size=int( NumDraws[iI] ) ) )
+    # end for
+    DayVals = list()
+    InitVals = list()
+    for tIds, tInit in zip( IdArrays, InitIds ):
+        cVals = np.zeros( NumDays, dtype=np.int64 )
+        for iI in np.unique( tIds ):
+            cDays = np.nonzero( tIds == iI )[0]
+            cVals[cDays] = Draws[iI][cDays + 1]
+        # end for
+        DayVals.append( cVals )
+        InitVals.append( int( Draws[tInit][0] ) )
+    # end for
+    return ( DayVals, InitVals )
+
+def drawDepthUniforms( Stream, NumDays ):
+    """Draw the uniform precipitation depth probabilities for one 
+    realization with one call.
+
+    Args:
+        Stream (WG_Seeds.StreamSource): precipitation depth stream
+        NumDays (int): number of simulation days
+
+    Returns:
+        np.array: NumDays + 1 values; index 0 is the starting state value
+
+    """
+    rState = Stream.generator()
+    return rState.uniform( low=0.0, high=1.0, size=( NumDays + 1 ) )
+
+def sampleDepthDays( Tables, DepRowA, MonthA, DayUnif ):
+    """Sample precipitation depth for every day and grid with one batched
+    table lookup.
+
+    Args:
+        Tables (WG_DistTables.DistTables): distribution tables
+        DepRowA (np.array): depth table row by day
+        MonthA (np.array): month by day
+        DayUnif (np.array): uniform probabilities by day with shape 
+                            (..., days)
+
+    Returns:
+        np.array: float32 depths with shape (..., days, grids)
+
+    """
+    GridA = np.arange( Tables.NumGrids )
+    PDepth = Tables.sampleDepths( DayUnif[..., None], DepRowA[:, None], 
+                                  GridA[None, :], MonthA[:, None] )
+    return PDepth.astype( np.float32 )
+
 def cleanAllEnd():
     """Convenience method to clean/delete all samplers at end
 
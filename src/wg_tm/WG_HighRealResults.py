@@ -37,18 +37,36 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import pandas as pd
 import numpy as np
 import WG_Inputs as WGI
+import WG_OutputStore as WGOS
+import WG_Calendar as WGCal
 
 
 #------------------------------------------------------------------------
 TMAX_IND = 0
 TMIN_IND = 1
 PRE_START_IND = 2
+WB_MON_COLUMNS = [ "Precip_mm", "ETo_mm", "PET_mm", "P-PET_mm", "APWL_mm", 
+                   "SM_mm", "DelSM_mm", "AET_mm", "Def_mm", "Surp_mm", 
+                   "TotAvail_mm", "RO_mm", "Detent_mm", "Re_mm" ]
+"""Monthly water balance columns from calcTMMonthlyWB"""
 
 # Program, global data structures
 H0_REAL = None
 """Single realization output for H0 case"""
 H1_REAL = None
 """Single realization output for H1 case"""
+PET_COEF = None
+"""Daily Hargreaves-Samani coefficients for the run, see getPETCoefficients"""
+PET_COEF_KEY = None
+"""Length, first, and last date of the index PET_COEF was calculated for"""
+WB_MONTHS = None
+"""Water balance day window and months for the run, see getWBMonths"""
+WB_MONTHS_KEY = None
+"""Length, first, and last date of the index WB_MONTHS was calculated for"""
+AREA_WT = None
+"""Watershed area weight for each grid, in LOCA_KEYS order, see getAreaWeights"""
+AREA_WT_KEY = None
+"""LOCA_KEYS that AREA_WT was built for"""
 
 #--------------------------------------------------------------------------
 # python functions
@@ -204,13 +222,18 @@ def assignTempCProj( tIndex, MaxT, MinT ):
     H1_REAL[tIndex, TMIN_IND] = MinT
     # end
 
-def outputRealResults(RealNum, DT_INDEX):
+def outputRealResults(RealNum, DT_INDEX, H0Real=None, H1Real=None):
     """Output the results for the current realization. Use Pandas DataFrames
-    and pickles.
+    and pickles, or the WG_Inputs.OUT_FORMAT alternative from 
+    WG_OutputStore.
     
     Args:
         RealNum (int): current realization number.
         DT_INDEX (pd.DateTimeIndex): index for all outputs
+
+    KWargs:
+        H0Real (np.array): H0 realization results; defaults to H0_REAL
+        H1Real (np.array): H1 realization results; defaults to H1_REAL
     """
     # imports
     import pandas as pd
@@ -218,6 +241,14 @@ def outputRealResults(RealNum, DT_INDEX):
     # globals
     global H0_REAL, H1_REAL, PRE_START_IND, TMAX_IND, TMIN_IND
     # start
+    if H0Real is None:
+        H0Real = H0_REAL
+    if H1Real is None:
+        H1Real = H1_REAL
+    if WGI.OUT_FORMAT == WGOS.OUT_FORMAT_STORE:
+        WGOS.appendRealization( RealNum, DT_INDEX, H0Real, H1Real, 
+                                PRE_START_IND )
+        return
     # file names
     H0FileName = "H0_%s_R%d_DF.pickle" % (WGI.OUT_LABEL, RealNum)
     H1FileName = "H1_%s_R%d_DF.pickle" % (WGI.OUT_LABEL, RealNum)
@@ -227,35 +258,40 @@ def outputRealResults(RealNum, DT_INDEX):
                                         H1FileName ) )
     # make our DataFrames
     TotNum = PRE_START_IND + WGI.NUM_LOCA_GRID
-    H0DDict = { "Tmax_C" : H0_REAL[:,TMAX_IND],
-                "Tmin_C" : H0_REAL[:,TMIN_IND],
+    H0DDict = { "Tmax_C" : H0Real[:,TMAX_IND],
+                "Tmin_C" : H0Real[:,TMIN_IND],
               }
     for iI in range( PRE_START_IND, TotNum, 1):
         cGID = WGI.LOCA_KEYS[iI - PRE_START_IND]
-        H0DDict[ "Precip_mm_%d" % cGID] = H0_REAL[:,iI]
+        H0DDict[ "Precip_mm_%d" % cGID] = H0Real[:,iI]
     # end of for
     H0DF = pd.DataFrame( index=DT_INDEX, data=H0DDict )
-    H1DDict = { "Tmax_C" : H1_REAL[:,TMAX_IND],
-                "Tmin_C" : H1_REAL[:,TMIN_IND],
+    H1DDict = { "Tmax_C" : H1Real[:,TMAX_IND],
+                "Tmin_C" : H1Real[:,TMIN_IND],
               }
     for iI in range( PRE_START_IND, TotNum, 1):
         cGID = WGI.LOCA_KEYS[iI - PRE_START_IND]
-        H1DDict[ "Precip_mm_%d" % cGID] = H1_REAL[:,iI]
+        H1DDict[ "Precip_mm_%d" % cGID] = H1Real[:,iI]
     # end of for
     H1DF = pd.DataFrame( index=DT_INDEX, data=H1DDict )
-    H0DF.to_pickle( H0OutFP, compression='zip' )
-    H1DF.to_pickle( H1OutFP, compression='zip' )
+    WGOS.writeFrame( H0DF, H0OutFP )
+    WGOS.writeFrame( H1DF, H1OutFP )
     # end
     return
 
-def outputWSResults(RealNum, DT_INDEX, TotDays):
+def outputWSResults(RealNum, DT_INDEX, TotDays, H0Real=None, H1Real=None):
     """Output the watershed results for the current realizationn. Use Pandas DataFrames
-    and pickles. Uses area average of precipitation grid cells to calc the WS precip.
+    and pickles, or the WG_Inputs.OUT_FORMAT alternative from WG_OutputStore. Uses 
+    area average of precipitation grid cells to calc the WS precip.
     
     Args:
         RealNum (int): current realization number.
         DT_INDEX (pd.DateTimeIndex): index for all outputs
         TotDays (int): total number of days in realization
+
+    KWargs:
+        H0Real (np.array): H0 realization results; defaults to H0_REAL
+        H1Real (np.array): H1 realization results; defaults to H1_REAL
     """
     # imports
     import pandas as pd
@@ -263,6 +299,10 @@ def outputWSResults(RealNum, DT_INDEX, TotDays):
     # globals
     global H0_REAL, H1_REAL, PRE_START_IND, TMAX_IND, TMIN_IND
     # start
+    if H0Real is None:
+        H0Real = H0_REAL
+    if H1Real is None:
+        H1Real = H1_REAL
     # file names
     H0FileName = "WS_H0_%s_R%d_DF.pickle" % (WGI.OUT_LABEL, RealNum)
     H1FileName = "WS_H1_%s_R%d_DF.pickle" % (WGI.OUT_LABEL, RealNum)
@@ -272,40 +312,38 @@ def outputWSResults(RealNum, DT_INDEX, TotDays):
                                         H1FileName ) )
     # make our DataFrames
     TotNum = PRE_START_IND + WGI.NUM_LOCA_GRID
-    H0DDict = { "Tmax_C" : H0_REAL[:,TMAX_IND],
-                "Tmin_C" : H0_REAL[:,TMIN_IND],
+    H0DDict = { "Tmax_C" : H0Real[:,TMAX_IND],
+                "Tmin_C" : H0Real[:,TMIN_IND],
               }
-    TAve = 0.5 * ( H0_REAL[:,TMAX_IND] + H0_REAL[:,TMIN_IND] )
+    TAve = 0.5 * ( H0Real[:,TMAX_IND] + H0Real[:,TMIN_IND] )
     H0DDict["Tave_C"] = TAve
-    PrecipAve = np.zeros( TotDays, dtype=np.float64 )
-    for iI in range( PRE_START_IND, TotNum, 1):
-        cGID = WGI.LOCA_KEYS[iI - PRE_START_IND]
-        PrecipAve = PrecipAve + ( H0_REAL[:,iI] * WGI.GRID_AREA_WT[cGID] )
-    # end of for
-    H0DDict[ "Precip_mm"] = PrecipAve
+    # both pathways from one matrix product
+    PrecipAve = calcAreaAverages( np.stack( ( H0Real[:,PRE_START_IND:TotNum],
+                                              H1Real[:,PRE_START_IND:TotNum] ) ) )
+    H0DDict[ "Precip_mm"] = PrecipAve[0]
     H0DDict[ "ETo_mm" ] = calcPET_HS( DT_INDEX, TAve )
     H0DF = pd.DataFrame( index=DT_INDEX, data=H0DDict )
     # now H1
-    H1DDict = { "Tmax_C" : H1_REAL[:,TMAX_IND],
-                "Tmin_C" : H1_REAL[:,TMIN_IND],
+    H1DDict = { "Tmax_C" : H1Real[:,TMAX_IND],
+                "Tmin_C" : H1Real[:,TMIN_IND],
               }
-    TAve = 0.5 * ( H1_REAL[:,TMAX_IND] + H1_REAL[:,TMIN_IND] )
+    TAve = 0.5 * ( H1Real[:,TMAX_IND] + H1Real[:,TMIN_IND] )
     H1DDict["Tave_C"] = TAve
-    PrecipAve = np.zeros( TotDays, dtype=np.float64 )
-    for iI in range( PRE_START_IND, TotNum, 1):
-        cGID = WGI.LOCA_KEYS[iI - PRE_START_IND]
-        PrecipAve = PrecipAve + ( H1_REAL[:,iI] * WGI.GRID_AREA_WT[cGID] )
-    # end of for
-    H1DDict[ "Precip_mm" ] = PrecipAve
+    H1DDict[ "Precip_mm" ] = PrecipAve[1]
     H1DDict[ "ETo_mm" ] = calcPET_HS( DT_INDEX, TAve )
     H1DF = pd.DataFrame( index=DT_INDEX, data=H1DDict )
     # calculate the monthly water balance
     H0DFMon, H1DFMon = calcTMMonthlyWB( H0DF, H1DF )
     # calculate the differences
     DeltaDF = calcDeltaDF( H0DFMon, H1DFMon )
+    if WGI.OUT_FORMAT == WGOS.OUT_FORMAT_STORE:
+        WGOS.appendFrames( RealNum, { "WS_H0" : H0DF, "WS_H1" : H1DF,
+                                      "WB_H0" : H0DFMon, "WB_H1" : H1DFMon,
+                                      "Delta" : DeltaDF } )
+        return
     # write out all of our waterbalance related DataFrames
-    H0DF.to_pickle( H0OutFP, compression='zip' )
-    H1DF.to_pickle( H1OutFP, compression='zip' )
+    WGOS.writeFrame( H0DF, H0OutFP )
+    WGOS.writeFrame( H1DF, H1OutFP )
     # get some new filenames
     H0FileName = "WB_H0_%s_R%d_DF.pickle" % (WGI.OUT_LABEL, RealNum)
     H1FileName = "WB_H1_%s_R%d_DF.pickle" % (WGI.OUT_LABEL, RealNum)
@@ -313,206 +351,286 @@ def outputWSResults(RealNum, DT_INDEX, TotDays):
                                         H0FileName ) )
     H1OutFP = path.normpath( path.join( WGI.OUT_DIR, WGI.OUT_SUB_DIR, 
                                         H1FileName ) )
-    H0DFMon.to_pickle( H0OutFP, compression='zip' )
-    H1DFMon.to_pickle( H1OutFP, compression='zip' )
+    WGOS.writeFrame( H0DFMon, H0OutFP )
+    WGOS.writeFrame( H1DFMon, H1OutFP )
     # delta filename
     DelFileName = "Delta_%s_R%d_DF.pickle" % (WGI.OUT_LABEL, RealNum)
     DelOutFP = path.normpath( path.join( WGI.OUT_DIR, WGI.OUT_SUB_DIR, 
                                          DelFileName ) )
-    DeltaDF.to_pickle( DelOutFP, compression='zip' )
+    WGOS.writeFrame( DeltaDF, DelOutFP )
     # end
     return
 
 def calcPET_HS( DT_INDEX, TAve ):
-    """Calculate PET in mm using Hargreaves-Samani
+    """Calculate PET in mm using Hargreaves-Samani. Only TAve changes between
+    realizations so the rest of the equation comes from the run level 
+    cache in getPETCoefficients.
 
     Args:
         DT_INDEX (pd.DateTimeIndex): index for all outputs
-        TAve (np.array): simulated daily average temperature
+        TAve (np.array): simulated daily average temperature, shape 
+                         (..., days) for a batch of realizations
     
     Returns:
         ETo_mmd (np.array): PET depths per day in mm
     """
+    ETo_mmd = getPETCoefficients( DT_INDEX ) * ( TAve + 17.8 )
+    # return
+    return ETo_mmd
+
+def getAreaWeights():
+    """Watershed area weight for each grid in WG_Inputs.LOCA_KEYS order. 
+    Built once and cached in AREA_WT.
+
+    Returns:
+        np.array: read-only weights, shape (NUM_LOCA_GRID,)
+    """
+    # globals
+    global AREA_WT, AREA_WT_KEY
+    # start
+    cKey = tuple( WGI.LOCA_KEYS )
+    if ( AREA_WT is not None ) and ( AREA_WT_KEY == cKey ):
+        return AREA_WT
+    AREA_WT = np.array( [ WGI.GRID_AREA_WT[x] for x in WGI.LOCA_KEYS ], 
+                        dtype=np.float64 )
+    AREA_WT.flags.writeable = False
+    AREA_WT_KEY = cKey
+    # end
+    return AREA_WT
+
+def calcAreaAverages( GridBlock ):
+    """Watershed area weighted precipitation with one matrix product for
+    any number of pathways and realizations.
+
+    Args:
+        GridBlock (np.array): precipitation with the grids, in LOCA_KEYS 
+                              order, in the last axis, for example 
+                              (2, days, grids) for both pathways or 
+                              (reals, 2, days, grids)
+
+    Returns:
+        np.array: float64 area weighted precipitation, shape 
+                  GridBlock.shape[:-1]
+    """
+    Weights = getAreaWeights()
+    FlatBlock = GridBlock.reshape( -1, len( Weights ) )
+    return np.dot( FlatBlock, Weights ).reshape( GridBlock.shape[:-1] )
+
+def getPETCoefficients( DT_INDEX ):
+    """Daily Hargreaves-Samani coefficients, 0.0023 * So * Delta_T, for 
+    DT_INDEX. Calculated once and cached in PET_COEF for the run.
+
+    Args:
+        DT_INDEX (pd.DateTimeIndex): index for all outputs
+
+    Returns:
+        np.array: read-only coefficient for each day
+    """
+    # globals
+    global PET_COEF, PET_COEF_KEY
+    # start
+    cKey = ( len( DT_INDEX ), DT_INDEX[0], DT_INDEX[-1] )
+    if ( PET_COEF is not None ) and ( PET_COEF_KEY == cKey ):
+        return PET_COEF
+    Cal = WGCal.calendarFor( DT_INDEX )
+    DayOYr = Cal.DoYA
+    MonthA = Cal.MonthA
+    MonNorms = np.array( [ WGI.PET_MON_NORMS[x] for x in range( 1, 13, 1 ) ], 
+                         dtype=np.float64 )
+    Delta_T = MonNorms[MonthA - 1]
+    S_o_mmd = calcSoDOY()[DayOYr - 1]
+    PET_COEF = 0.0023 * S_o_mmd * Delta_T
+    PET_COEF.flags.writeable = False
+    PET_COEF_KEY = cKey
+    # return
+    return PET_COEF
+
+def calcSoDOY():
+    """Extraterrestrial radiation, as evaporation depth, for each day of 
+    the year
+
+    Returns:
+        S_o_mmd (np.array): radiation in mm/d for day of the year 1 to 366
+    """
     # imports
     import math
     # parameters
     LAT_DEG = 30.0  # degrees latitute
     # start of function
     # solar rad calcs
-    DayOYr = DT_INDEX.dayofyear.to_numpy()
+    DayOYr = np.arange( 1, 367, 1 )
     SDec_rad = 0.4093 * np.sin( ( ( ( 2.0 * math.pi ) / 365.0 ) * DayOYr ) - 1.405 )
     SunS_rad = np.arccos( -1.0 * math.tan(math.radians(LAT_DEG)) * np.tan(SDec_rad) )
     RelDEtoS = 1.0 + 0.033 * np.cos( ( ( 2.0 * math.pi ) / 365.0 ) *DayOYr )
     #MaxDayHrs = (24.0/math.pi) * SunS_rad
     S_o_mmd = 15.392 * RelDEtoS * ( ( SunS_rad * math.sin( math.radians(LAT_DEG) ) * np.sin( SDec_rad ) ) + 
                 ( math.cos( math.radians(LAT_DEG) ) * np.cos( SDec_rad ) * np.sin( SunS_rad ) ) ) 
-    # now for the PET calc
-    MonthA = DT_INDEX.month.tolist()
-    Delta_T = np.array( [ WGI.PET_MON_NORMS[x] for x in MonthA ], dtype=np.float64 )
-    ETo_mmd = 0.0023 * S_o_mmd * Delta_T * ( TAve + 17.8 )
     # return
-    return ETo_mmd
+    return S_o_mmd
 
 def calcTMMonthlyWB( H0Daily, H1Daily ):
     """ Calculate Thornthwaite-Mather monthly water balance using ETo and Precip as simulated 
     from the weather generators.
 
+    Both pathways are calculated together with calcTMMonthlyArrays.
+
     Args:
         H0Daily (pd.DataFrame): pandas DataFrame with daily precip and ETo for path 0
         H1Daily (pd.DataFrame): pandas DataFrame with daily precip and ETo for path 1
+
+    Returns:
+        tuple: ( H0DFMon, H1DFMon ) monthly water balance DataFrames with
+        the columns in WB_MON_COLUMNS
+    """
+    # start
+    Precip = np.stack( [ H0Daily["Precip_mm"].to_numpy( dtype=np.float64 ),
+                         H1Daily["Precip_mm"].to_numpy( dtype=np.float64 ) ] )
+    ETo = np.stack( [ H0Daily["ETo_mm"].to_numpy( dtype=np.float64 ),
+                      H1Daily["ETo_mm"].to_numpy( dtype=np.float64 ) ] )
+    MonIndex, MonDict = calcTMMonthlyArrays( H0Daily.index, Precip, ETo )
+    H0DFMon = pd.DataFrame( index=MonIndex, 
+                    data={ x : MonDict[x][0] for x in WB_MON_COLUMNS } )
+    H1DFMon = pd.DataFrame( index=MonIndex, 
+                    data={ x : MonDict[x][1] for x in WB_MON_COLUMNS } )
+    # now have the complete monthly water balance calculated for this realization and both
+    # pathways
+    return ( H0DFMon, H1DFMon )
+
+def calcTMMonthlyArrays( DT_INDEX, Precip, ETo ):
+    """ Thornthwaite-Mather monthly water balance on arrays. Any number of
+    leading dimensions, pathway and realization for example, are 
+    calculated together.
+
+    Args:
+        DT_INDEX (pd.DateTimeIndex): daily index for the last axis of Precip
+                                     and ETo
+        Precip (np.array): daily precipitation in mm, shape (..., days)
+        ETo (np.array): daily ETo in mm, shape (..., days)
+
+    Returns:
+        tuple: ( pd.DatetimeIndex of month starts, dict of monthly arrays 
+        with shape (..., months) for each name in WB_MON_COLUMNS )
     """
     # imports
     import math
     from WG_Inputs import K_c, RDAY_ET, RTM_EXP_TERM, RTM_SLOPE, AVAIL_WS
     from WG_Inputs import MON_DETENTION_RE, MON_SURPLUS_RO
+    # start
+    DayMask, MonStarts, MonIndex = getWBMonths( DT_INDEX )
+    cPrecip = np.asarray( Precip, dtype=np.float64 )[..., DayMask]
+    cETo = np.asarray( ETo, dtype=np.float64 )[..., DayMask]
+    # calculate PET, reduced on days with precipitation
+    cPET = cETo * K_c
+    cPET = np.where( cPrecip > 0.0, cPET * RDAY_ET, cPET )
+    # sum to monthly
+    MonP = np.add.reduceat( cPrecip, MonStarts, axis=-1 )
+    MonETo = np.add.reduceat( cETo, MonStarts, axis=-1 )
+    MonPET = np.add.reduceat( cPET, MonStarts, axis=-1 )
+    # calculate excess precipitation
+    EP = MonP - MonPET
+    # Accumulated potential water loss (APWL) refers to the previous month
+    APWL = _monthScan( lambda prev, ep: np.where( ep <= 0.0, ep + prev, 0.0 ),
+                       EP )
+    # soil moisture also refers to the previous month when EP is positive
+    DrySM = ( np.power( 10.0, ( math.log10( AVAIL_WS / 25.4 ) - ( 
+                ( np.abs( APWL ) / 25.4 ) * RTM_SLOPE * 
+                ( ( AVAIL_WS / 25.4 )**( RTM_EXP_TERM ) ) ) ) ) * 25.4 )
+    SM = _monthScan( lambda prev, ep, dsm: np.where( ep > 0, 
+                            np.minimum( AVAIL_WS, ( ep + prev ) ), dsm ),
+                     EP, DrySM )
+    PrevSM = np.concatenate( [ np.zeros_like( SM[..., :1] ), SM[..., :-1] ],
+                             axis=-1 )
+    DelSM = SM - PrevSM
+    AET = np.where( EP >= 0.0, MonPET, MonP - DelSM )
+    Def = MonPET - AET
+    Surp = np.where( SM >= AVAIL_WS, MonP - AET, 0.0 )
+    # detention carries forward to the next month
+    def detStep( prev, surp ):
+        TotA = surp + prev
+        RO = TotA * MON_SURPLUS_RO
+        Re = ( TotA - RO ) * MON_DETENTION_RE
+        return TotA - ( RO + Re )
+    Detent = _monthScan( detStep, Surp )
+    PrevDet = np.concatenate( [ np.zeros_like( Detent[..., :1] ), 
+                                Detent[..., :-1] ], axis=-1 )
+    TotAvail = Surp + PrevDet
+    RO = TotAvail * MON_SURPLUS_RO
+    Re = ( TotAvail - RO ) * MON_DETENTION_RE
+    MonDict = { "Precip_mm" : MonP,
+                "ETo_mm" : MonETo,
+                "PET_mm" : MonPET,
+                "P-PET_mm" : EP,
+                "APWL_mm" : APWL,
+                "SM_mm" : SM,
+                "DelSM_mm" : DelSM,
+                "AET_mm" : AET,
+                "Def_mm" : Def,
+                "Surp_mm" : Surp,
+                "TotAvail_mm" : TotAvail,
+                "RO_mm" : RO,
+                "Detent_mm" : Detent,
+                "Re_mm" : Re,
+              }
+    # return
+    return MonIndex, MonDict
+
+def getWBMonths( DT_INDEX ):
+    """Day window and month boundaries for the monthly water balance. 
+    Calculated once from the run calendar and cached in WB_MONTHS.
+
+    Args:
+        DT_INDEX (pd.DateTimeIndex): daily index for the water balance
+
+    Returns:
+        tuple: ( bool mask of the days in the water balance window, index 
+        of the first window day of each month, pd.DatetimeIndex of month 
+        starts )
+    """
     # globals
-    # parameters
-    # locals
+    global WB_MONTHS, WB_MONTHS_KEY
     # start
-    # make copies of the argument DataFrames for modifications.
-    cH0DF = H0Daily[['Precip_mm', 'ETo_mm']].copy()
-    cH1DF = H1Daily[['Precip_mm', 'ETo_mm']].copy()
+    cKey = ( len( DT_INDEX ), DT_INDEX[0], DT_INDEX[-1] )
+    if ( WB_MONTHS is not None ) and ( WB_MONTHS_KEY == cKey ):
+        return WB_MONTHS
+    Cal = WGCal.calendarFor( DT_INDEX )
     # adjust our output dates slightly for the water balance calcs
     Start_DT = pd.Timestamp( 1981, 1, 1, 0 )
-    End_DT = cH1DF.index[ len(cH1DF) - 2 ]
-    cH0DF = cH0DF.loc[Start_DT:End_DT].copy()
-    cH1DF = cH1DF.loc[Start_DT:End_DT].copy()
-    # calculate PET
-    cH0DF["PET_mm"] = cH0DF.apply( lambda row: adjustETo( K_c, RDAY_ET, row['ETo_mm'], 
-                                                          row['Precip_mm'] ), axis= 1 )
-    cH1DF["PET_mm"] = cH1DF.apply( lambda row: adjustETo( K_c, RDAY_ET, row['ETo_mm'], 
-                                                          row['Precip_mm'] ), axis= 1 )
-    # resample to monthly
-    H0DFMon = cH0DF.resample( 'MS', closed='left', label='left' ).sum()
-    H1DFMon = cH1DF.resample( 'MS', closed='left', label='left' ).sum()
-    # calculate excess precipitation
-    H0DFMon["P-PET_mm"] = H0DFMon["Precip_mm"] - H0DFMon["PET_mm"]
-    H1DFMon["P-PET_mm"] = H1DFMon["Precip_mm"] - H1DFMon["PET_mm"]
-    # get the total number of months in our DataFrames
-    TotMon = len( H0DFMon )
-    # Accumulated potential water loss (APWL) needs to refer to previous month's values
-    # Use a for loop for this now - could be vectorized later
-    H0DFMon["APWL_mm"] = 0.0
-    H1DFMon["APWL_mm"] = 0.0
-    for iI in range(TotMon):
-        cInd = H0DFMon.index[iI]
-        if iI == 0:
-            prevH0 = 0.0
-            prevH1 = 0.0
-        # now do the calculation
-        cH0EP = H0DFMon.at[cInd, "P-PET_mm"]
-        cH1EP = H1DFMon.at[cInd, "P-PET_mm"]
-        if cH0EP <= 0.0:
-            cH0APWL = cH0EP + prevH0
-        else:
-            cH0APWL = 0.0
-        if cH1EP <= 0.0:
-            cH1APWL = cH1EP + prevH1
-        else:
-            cH1APWL = 0.0
-        # set the values
-        H0DFMon.at[cInd, "APWL_mm"] = cH0APWL
-        H1DFMon.at[cInd, "APWL_mm"] = cH1APWL
-        # archive the previous
-        prevH0 = cH0APWL
-        prevH1 = cH1APWL
-    # end for
-    # Soil moisture also requires previous month's values. Calculate delta SM
-    # at the same time
-    H0DFMon["SM_mm"] = 0.0
-    H1DFMon["SM_mm"] = 0.0
-    H0DFMon["DelSM_mm"] = 0.0
-    H1DFMon["DelSM_mm"] = 0.0
-    for iI in range(TotMon):
-        cInd = H0DFMon.index[iI]
-        if iI == 0:
-            prevH0 = 0.0
-            prevH1 = 0.0
-        # now do the calculation
-        cH0EP = H0DFMon.at[cInd, "P-PET_mm"]
-        cH0APWL = H0DFMon.at[cInd, "APWL_mm"]
-        cH1EP = H1DFMon.at[cInd, "P-PET_mm"]
-        cH1APWL = H1DFMon.at[cInd, "APWL_mm"]
-        if cH0EP > 0:
-            H0SM = min( AVAIL_WS, ( cH0EP + prevH0 ) )
-        else:
-            H0SM = ( math.pow( 10.0, ( math.log10( AVAIL_WS / 25.4 ) - ( 
-                    ( abs( cH0APWL ) / 25.4 ) * RTM_SLOPE * 
-                    ( ( AVAIL_WS / 25.4 )**( RTM_EXP_TERM ) ) ) ) ) * 25.4 )
-        if cH1EP > 0:
-            H1SM = min( AVAIL_WS, ( cH1EP + prevH1 ) )
-        else:
-            H1SM = ( math.pow( 10.0, ( math.log10( AVAIL_WS / 25.4 ) - ( 
-                    ( abs( cH1APWL ) / 25.4 ) * RTM_SLOPE * 
-                    ( ( AVAIL_WS / 25.4 )**( RTM_EXP_TERM ) ) ) ) ) * 25.4 )
-        # now update
-        # set the values
-        H0DFMon.at[cInd, "SM_mm"] = H0SM
-        H1DFMon.at[cInd, "SM_mm"] = H1SM
-        H0DFMon.at[cInd, "DelSM_mm"] = H0SM - prevH0
-        H1DFMon.at[cInd, "DelSM_mm"] = H1SM - prevH1
-        # archive the previous
-        prevH0 = H0SM
-        prevH1 = H1SM
+    End_DT = DT_INDEX[ len(DT_INDEX) - 2 ]
+    DayMask = ( DT_INDEX >= Start_DT ) & ( DT_INDEX <= End_DT )
+    MonKey = ( Cal.YearA[DayMask] * 12 ) + Cal.MonthA[DayMask]
+    MonStarts = np.flatnonzero( np.concatenate( [ [ True ], 
+                                        MonKey[1:] != MonKey[:-1] ] ) )
+    WinIndex = DT_INDEX[DayMask]
+    MonIndex = pd.DatetimeIndex( WinIndex[MonStarts].normalize() - 
+                    pd.to_timedelta( WinIndex[MonStarts].day - 1, unit="D" ),
+                    freq="MS" )
+    DayMask.flags.writeable = False
+    WB_MONTHS = ( DayMask, MonStarts, MonIndex )
+    WB_MONTHS_KEY = cKey
+    # end
+    return WB_MONTHS
+
+def _monthScan( StepFunc, *Terms ):
+    """Scan over the last, month, axis. The value for each month is
+    StepFunc( previous value, term values for the month ) and the value
+    before the first month is zero. All leading dimensions are calculated
+    together in each step.
+
+    Args:
+        StepFunc (function): recurrence for one month
+        Terms (np.array): monthly terms with shape (..., months)
+
+    Returns:
+        np.array: scanned values with the shape of Terms[0]
+    """
+    # start
+    OutA = np.zeros_like( Terms[0], dtype=np.float64 )
+    Prev = np.zeros_like( OutA[..., 0] )
+    for iI in range( OutA.shape[-1] ):
+        Prev = StepFunc( Prev, *[ x[..., iI] for x in Terms ] )
+        OutA[..., iI] = Prev
     # end for
-    # AET can be calculated with a lambda
-    H0DFMon["AET_mm"] = H0DFMon.apply( lambda row: calcAET( row["P-PET_mm"], row["PET_mm"], 
-                                                        row["Precip_mm"], row["DelSM_mm"] ), 
-                                       axis=1 )
-    H1DFMon["AET_mm"] = H1DFMon.apply( lambda row: calcAET( row["P-PET_mm"], row["PET_mm"], 
-                                                            row["Precip_mm"], row["DelSM_mm"] ), 
-                                       axis=1 )
-    # calculate the monthly deficit
-    H0DFMon["Def_mm"] = H0DFMon["PET_mm"] - H0DFMon["AET_mm"]
-    H1DFMon["Def_mm"] = H1DFMon["PET_mm"] - H1DFMon["AET_mm"]
-    # for surplus calculation can use a lambda
-    H0DFMon["Surp_mm"] = H0DFMon.apply( lambda row: calcSurplus( row["SM_mm"], AVAIL_WS, 
-                                                             row["Precip_mm"], row["AET_mm"] ), 
-                                        axis=1 )
-    H1DFMon["Surp_mm"] = H1DFMon.apply( lambda row: calcSurplus( row["SM_mm"], AVAIL_WS, 
-                                                                row["Precip_mm"], row["AET_mm"] ), 
-                                        axis=1 )
-    # because need multiple values from multiple months use a loop to calculate the remaining
-    H0DFMon["TotAvail_mm"] = 0.0
-    H1DFMon["TotAvail_mm"] = 0.0
-    H0DFMon["RO_mm"] = 0.0
-    H1DFMon["RO_mm"] = 0.0
-    H0DFMon["Detent_mm"] = 0.0
-    H1DFMon["Detent_mm"] = 0.0
-    H0DFMon["Re_mm"] = 0.0
-    H1DFMon["Re_mm"] = 0.0
-    for iI in range(TotMon):
-        cInd = H0DFMon.index[iI]
-        if iI == 0:
-            prevH0 = 0.0
-            prevH1 = 0.0
-        # now do the calculation
-        cH0Surp = H0DFMon.at[cInd, "Surp_mm"]
-        cH1Surp = H1DFMon.at[cInd, "Surp_mm"]
-        cH0TotA = cH0Surp + prevH0
-        cH1TotA = cH1Surp + prevH1
-        cH0RO = cH0TotA * MON_SURPLUS_RO
-        cH1RO = cH1TotA * MON_SURPLUS_RO
-        cH0Re = ( cH0TotA - cH0RO ) * MON_DETENTION_RE
-        cH1Re = ( cH1TotA - cH1RO ) * MON_DETENTION_RE
-        cH0Det =  cH0TotA - ( cH0RO + cH0Re )
-        cH1Det =  cH1TotA - ( cH1RO + cH1Re )
-        # assign
-        H0DFMon.at[cInd, "TotAvail_mm"] = cH0TotA
-        H1DFMon.at[cInd, "TotAvail_mm"] = cH1TotA
-        H0DFMon.at[cInd, "RO_mm"] = cH0RO
-        H1DFMon.at[cInd, "RO_mm"] = cH1RO
-        H0DFMon.at[cInd, "Detent_mm"] = cH0Det
-        H1DFMon.at[cInd, "Detent_mm"] = cH1Det
-        H0DFMon.at[cInd, "Re_mm"] = cH0Re
-        H1DFMon.at[cInd, "Re_mm"] = cH1Re
-        # now carry forward
-        prevH0 = cH0Det
-        prevH1 = cH1Det
-    # end of for
-    # now have the complete monthly water balance calculated for this realization and both
-    # pathways
-    return ( H0DFMon, H1DFMon )
+    return OutA
 
 def adjustETo( Ks, RRDay, ETo, Precip ):
     """ Function to adjust ETo using a crop coefficient and if there was precipitation.
@@ -63,6 +63,21 @@ OUT_LABEL = r'DC_WGMN4'
 """Label to use for outputting files to OUT_DIR"""
 OUT_SUB_DIR = "Final"
 """Output subdirectory"""
+OUT_FORMAT = "pickle"
+"""Realization output format. "pickle" writes zip compressed pickles for
+each realization. "store" appends to the chunked, columnar store in 
+OUT_DIR/OUT_SUB_DIR/OUT_LABEL_store. "npy" writes memory mappable .npy 
+files with a JSON header in place of each pickle. See WG_OutputStore."""
+OUT_STORE_COMPRESSION = "lzf"
+"""Compressor for OUT_FORMAT "store": "lzf", "gzip", "blosc-lz4", "zstd", 
+or "none". blosc-lz4 and zstd require hdf5plugin."""
+DEPTH_SAMPLER = "knots"
+"""Precipitation depth sampler. "knots" interpolates the 101 CDF knots and
+reproduces earlier results. "analytic" inverts the truncated mixed 
+exponential CDF, see WG_PrecipDepth.mixedExpQuantile."""
+TABLE_CACHE_DIR = None
+"""Location for the cached distribution tables from WG_DistTables. None
+uses OUT_DIR"""
 START_DATE = dt.datetime(1980, 1, 1)
 """Starting time for production of the stochastic synthetic time series"""
 END_DATE = dt.datetime( 2100, 12, 31)
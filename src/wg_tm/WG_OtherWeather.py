@@ -33,6 +33,7 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
 # imports
+import math
 import pandas as pd
 import numpy as np
 import pickle
@@ -129,6 +130,20 @@ CHI0M1 = np.ones( (1, NUM_OTHER), dtype=np.float64 )
 """Current day Chi matrix for H1"""
 CHIL1M1 = np.ones( (1, NUM_OTHER), dtype=np.float64 )
 """Previous day Chi matrix for H1"""
+INPUT_ARRAY_NAMES = [ "A_DATA", "B_DATA", "A_PROJ", "B_PROJ", "M0", "M1",
+                      "DATA_WET_TMAX_AVE", "DATA_WET_TMAX_STD",
+                      "DATA_WET_TMIN_AVE", "DATA_WET_TMIN_STD",
+                      "DATA_DRY_TMAX_AVE", "DATA_DRY_TMAX_STD",
+                      "DATA_DRY_TMIN_AVE", "DATA_DRY_TMIN_STD",
+                      "PROJ_WET_TMAX_AVE", "PROJ_WET_TMAX_STD",
+                      "PROJ_WET_TMIN_AVE", "PROJ_WET_TMIN_STD",
+                      "PROJ_DRY_TMAX_AVE", "PROJ_DRY_TMAX_STD",
+                      "PROJ_DRY_TMIN_AVE", "PROJ_DRY_TMIN_STD" ]
+"""Names of the module arrays that are read from the input files and do not
+change during a run"""
+INPUT_ARRAYS = None
+"""Read-only input arrays by name, loaded once per process by 
+loadInputArrays. None when not loaded."""
 
 #--------------------------------------------------------------------------
 # functions
@@ -259,6 +274,78 @@ def constructCProjPeriodArrays():
     # end of function
     return
 
+def readInputArrays():
+    """Read the smoothed temperature inputs and the M0 and M1 matrices.
+    Reading goes through the module arrays, so this is not thread safe.
+
+    Returns:
+        dict: input arrays by name, see INPUT_ARRAY_NAMES
+
+    """
+    # start of function
+    setAllBegin()
+    populateMmats()
+    constructDataPeriodArrays()
+    constructCProjPeriodArrays()
+    InDict = dict()
+    for tName in INPUT_ARRAY_NAMES:
+        InDict[tName] = globals()[tName]
+    # end for
+    # end of function
+    return InDict
+
+def loadInputArrays():
+    """Read the smoothed temperature inputs and the M0 and M1 matrices once
+    for this process. Use as, or from, a pool worker initializer. The 
+    arrays are kept read-only in INPUT_ARRAYS and setInputArrays then
+    assigns them for each realization without any file I/O.
+    """
+    # globals
+    global INPUT_ARRAYS
+    # start of function
+    InDict = readInputArrays()
+    for cArray in InDict.values():
+        cArray.flags.writeable = False
+    # end for
+    INPUT_ARRAYS = InDict
+    # end of function
+    return
+
+def getInputArrays():
+    """Get the input arrays for a realization without changing module
+    state when they have been loaded for this process. Otherwise the input
+    files are read.
+
+    Returns:
+        dict: input arrays by name, see INPUT_ARRAY_NAMES
+
+    """
+    if INPUT_ARRAYS is None:
+        return readInputArrays()
+    return INPUT_ARRAYS
+
+def setInputArrays():
+    """Set the input arrays for a realization. Uses the arrays from 
+    loadInputArrays when they have been loaded for this process and 
+    otherwise reads the input files.
+    """
+    # start of function
+    if INPUT_ARRAYS is None:
+        constructDataPeriodArrays()
+        constructCProjPeriodArrays()
+    else:
+        globals().update( INPUT_ARRAYS )
+    # end if
+    # end of function
+    return
+
+def cleanInputArrays():
+    """Release the input arrays loaded for this process"""
+    global INPUT_ARRAYS
+    INPUT_ARRAYS = None
+    # end
+    return
+
 def setupDistsSamples(seed_std_norm=None):
     """Setup the distributions and samplers for the white noise term.
 
@@ -292,6 +379,29 @@ def updateTracker():
     # end of function
     return
 
+def drawEpsilons( Stream, NumDays ):
+    """Draw the standard normal error variates for a whole realization
+    with one call.
+
+    Both legacy error samplers receive the same seed so both epsilon values
+    are the same on each day. Index 0 corresponds to the set-up draw and
+    index j + 1 is used on day j.
+
+    Args:
+        Stream (WG_Seeds.StreamSource): standard normal stream
+        NumDays (int): number of simulation days
+
+    Returns:
+        np.array: NumDays + 1 error variates
+
+    """
+    # start of function
+    rState = Stream.generator()
+    EpsA = rState.standard_normal( size=( NumDays + 1 ) )
+    EpsA = np.where( np.isfinite( EpsA ), EpsA, 0.25 )
+    # end of function
+    return EpsA
+
 def calculateUpdate( curIndex, DayOYear, h0state, h0pindex, h1state, 
                      h1ptype, h1pindex ):
     """Calculate the current day and update
@@ -309,110 +419,87 @@ def calculateUpdate( curIndex, DayOYear, h0state, h0pindex, h1state,
     # imports
     import WG_HighRealResults as WGHRR
     # globals
-    global DATA_WET_TMAX_AVE, DATA_WET_TMAX_STD, DATA_WET_TMIN_AVE
-    global DATA_WET_TMIN_STD, DATA_DRY_TMAX_AVE, DATA_DRY_TMAX_STD
-    global DATA_DRY_TMIN_AVE, DATA_DRY_TMIN_STD
-    global PROJ_WET_TMAX_STD, PROJ_WET_TMIN_AVE, PROJ_WET_TMIN_STD
-    global PROJ_DRY_TMAX_AVE, PROJ_DRY_TMAX_STD, PROJ_DRY_TMIN_AVE
-    global PROJ_DRY_TMIN_STD, CHI0M0, CHI0M1
+    global CHI0M0, CHI0M1
+    # start of function
+    cMaxT0, cMinT0, cMaxT1, cMinT1 = calcDayTemps( globals(), CHI0M0, CHI0M1,
+                                        DayOYear, h0state, h0pindex, h1state,
+                                        h1ptype, h1pindex )
+    # now are ready to update
+    WGHRR.assignTempData( curIndex, cMaxT0, cMinT0 )
+    WGHRR.assignTempCProj( curIndex, cMaxT1, cMinT1 )
+    # end of function
+    return
+
+def _dayTemp( Chi, StdArray, AveArray, StdIndex, AveIndex, DayIndex ):
+    """Temperature from the Chi value, standard deviation, and mean. Falls
+    back to the mean when the calculation raises a floating point error."""
+    try:
+        cTemp = ( ( Chi * StdArray[StdIndex, DayIndex] ) + 
+                  AveArray[AveIndex, DayIndex] )
+    except:
+        cTemp = AveArray[AveIndex, DayIndex]
+    return cTemp
+
+def calcDayTemps( Inputs, Chi0M0, Chi0M1, DayOYear, h0state, h0pindex, 
+                  h1state, h1ptype, h1pindex ):
+    """Calculate the maximum and minimum temperatures for both pathways on
+    one day. Does not use or change module state.
+
+    Args:
+        Inputs (dict): input arrays by name, see INPUT_ARRAY_NAMES
+        Chi0M0 (np.array): current day Chi matrix for H0
+        Chi0M1 (np.array): current day Chi matrix for H1
+        DayOYear (int): day of the year
+        h0state (string): wet or dry state for data path
+        h0pindex(int): index for data period array
+        h1state (str): wet or dry state for projecton path
+        h1ptype (str): type of projection period
+        h1pindex (int): index for projection period
+
+    Returns:
+        tuple: ( H0 Tmax, H0 Tmin, H1 Tmax, H1 Tmin ) floats
+
+    """
     # start of function
-    np.seterr(all='raise')
+    DInd = DayOYear - 1
     if h0state == WGI.WET_STATE:
-        try:
-            cMaxT0 = ( (CHI0M0[0,0] * DATA_WET_TMAX_STD[h0pindex, (DayOYear - 1)]) + 
-                         DATA_WET_TMAX_AVE[h0pindex, (DayOYear - 1)] )
-        except:
-            cMaxT0 = DATA_WET_TMAX_AVE[h0pindex, (DayOYear - 1)]
-        try:
-            cMinT0 = ( (CHI0M0[0,1] * DATA_WET_TMIN_STD[h0pindex, (DayOYear - 1)]) + 
-                          DATA_WET_TMIN_AVE[h0pindex, (DayOYear - 1)] )
-        except:
-            cMinT0 = DATA_WET_TMIN_AVE[h0pindex, (DayOYear - 1)]
+        H0Pre = "DATA_WET_"
     else:
-        try:
-            cMaxT0 = ( (CHI0M0[0,0] * DATA_DRY_TMAX_STD[h0pindex, (DayOYear - 1)]) + 
-                      DATA_DRY_TMAX_AVE[h0pindex, (DayOYear - 1)] )
-        except:
-            cMaxT0 = DATA_DRY_TMAX_AVE[h0pindex, (DayOYear - 1)]
-        try:
-            cMinT0 = ( (CHI0M0[0,1] * DATA_DRY_TMIN_STD[h0pindex, (DayOYear - 1)]) + 
-                        DATA_DRY_TMIN_AVE[h0pindex, (DayOYear - 1)] )
-        except:
-            cMinT0 = DATA_DRY_TMIN_AVE[h0pindex, (DayOYear - 1)]
-    # next do the proj side
+        H0Pre = "DATA_DRY_"
     if h1state == WGI.WET_STATE:
-        if h1ptype == WGI.DATA_KEYW:
-            try:
-                cMaxT1 = ( (CHI0M1[0,0] * DATA_WET_TMAX_STD[h1pindex, (DayOYear - 1)]) + 
-                          DATA_WET_TMAX_AVE[h0pindex, (DayOYear - 1)] )
-            except:
-                cMaxT1 = DATA_WET_TMAX_AVE[h0pindex, (DayOYear - 1)]
-            try:
-                cMinT1 = ( (CHI0M1[0,1] * DATA_WET_TMIN_STD[h1pindex, (DayOYear - 1)]) + 
-                            DATA_WET_TMIN_AVE[h0pindex, (DayOYear - 1)] )
-            except:
-                cMinT1 = DATA_WET_TMIN_AVE[h0pindex, (DayOYear - 1)]
-        else:
-            try:
-                cMaxT1 = ( (CHI0M1[0,0] * PROJ_WET_TMAX_STD[h1pindex, (DayOYear - 1)]) + 
-                            PROJ_WET_TMAX_AVE[h1pindex, (DayOYear - 1)] )
-            except:
-                cMaxT1 = PROJ_WET_TMAX_AVE[h1pindex, (DayOYear - 1)]
-            try:
-                cMinT1 = ( (CHI0M1[0,1] * PROJ_WET_TMIN_STD[h1pindex, (DayOYear - 1)]) + 
-                            PROJ_WET_TMIN_AVE[h1pindex, (DayOYear - 1)] )
-            except:
-                cMinT1 = PROJ_WET_TMIN_AVE[h1pindex, (DayOYear - 1)]
+        H1State = "WET_"
     else:
+        H1State = "DRY_"
+    with np.errstate( all='raise' ):
+        cMaxT0 = _dayTemp( Chi0M0[0,0], Inputs[H0Pre + "TMAX_STD"],
+                           Inputs[H0Pre + "TMAX_AVE"], h0pindex, h0pindex, DInd )
+        cMinT0 = _dayTemp( Chi0M0[0,1], Inputs[H0Pre + "TMIN_STD"],
+                           Inputs[H0Pre + "TMIN_AVE"], h0pindex, h0pindex, DInd )
+        # the H1 data period mean uses the H0 period index
         if h1ptype == WGI.DATA_KEYW:
-            try:
-                cMaxT1 = ( (CHI0M1[0,0] * DATA_DRY_TMAX_STD[h1pindex, (DayOYear - 1)]) + 
-                            DATA_DRY_TMAX_AVE[h0pindex, (DayOYear - 1)] )
-            except:
-                cMaxT1 = DATA_DRY_TMAX_AVE[h0pindex, (DayOYear - 1)]
-            try:
-                cMinT1 = ( (CHI0M1[0,1] * DATA_DRY_TMIN_STD[h1pindex, (DayOYear - 1)]) + 
-                            DATA_DRY_TMIN_AVE[h0pindex, (DayOYear - 1)] )
-            except:
-                cMinT1 = DATA_DRY_TMIN_AVE[h0pindex, (DayOYear - 1)]
+            H1Pre = "DATA_" + H1State
+            AveIndex = h0pindex
         else:
-            try:
-                cMaxT1 = ( (CHI0M1[0,0] * PROJ_DRY_TMAX_STD[h1pindex, (DayOYear - 1)]) + 
-                            PROJ_DRY_TMAX_AVE[h1pindex, (DayOYear - 1)] )
-            except:
-                cMaxT1 = PROJ_DRY_TMAX_AVE[h1pindex, (DayOYear - 1)]
-            try:
-                cMinT1 = ( (CHI0M1[0,1] * PROJ_DRY_TMIN_STD[h1pindex, (DayOYear - 1)]) + 
-                            PROJ_DRY_TMIN_AVE[h1pindex, (DayOYear - 1)] )
-            except:
-                cMinT1 = PROJ_DRY_TMIN_AVE[h1pindex, (DayOYear - 1)]
-    # toggle back
-    np.seterr(all='warn')
-    acMaxT0 = np.array( cMaxT0, dtype=np.float64 )
-    acMaxT0 = np.where( np.isnan( acMaxT0 ), 
-                        DATA_DRY_TMAX_AVE[0, (DayOYear - 1)], acMaxT0 )
-    acMaxT0 = np.where( np.isinf( acMaxT0 ), 
-                        DATA_DRY_TMAX_AVE[0, (DayOYear - 1)], acMaxT0 )
-    acMinT0 = np.array( cMinT0, dtype=np.float64 )
-    acMinT0 = np.where( np.isnan( acMinT0 ), 
-                        DATA_DRY_TMIN_AVE[0, (DayOYear - 1)], acMinT0 )
-    acMinT0 = np.where( np.isinf( acMinT0 ), 
-                        DATA_DRY_TMIN_AVE[0, (DayOYear - 1)], acMinT0 )
-    acMaxT1 = np.array( cMaxT1, dtype=np.float64 )
-    acMaxT1 = np.where( np.isnan( acMaxT1 ), 
-                        DATA_DRY_TMAX_AVE[0, (DayOYear - 1)], acMaxT1 )
-    acMaxT1 = np.where( np.isinf( acMaxT1 ), 
-                        DATA_DRY_TMAX_AVE[0, (DayOYear - 1)], acMaxT1 )
-    acMinT1 = np.array( cMinT1, dtype=np.float64 )
-    acMinT1 = np.where( np.isnan( acMinT1 ), 
-                        DATA_DRY_TMIN_AVE[0, (DayOYear - 1)], acMinT1 )
-    acMinT1 = np.where( np.isinf( acMinT1 ), 
-                        DATA_DRY_TMIN_AVE[0, (DayOYear - 1)], acMinT1 )
-    # now are ready to update
-    WGHRR.assignTempData( curIndex, float(acMaxT0), float(acMinT0) )
-    WGHRR.assignTempCProj( curIndex, float(acMaxT1), float(acMinT1) )
+            H1Pre = "PROJ_" + H1State
+            AveIndex = h1pindex
+        cMaxT1 = _dayTemp( Chi0M1[0,0], Inputs[H1Pre + "TMAX_STD"],
+                           Inputs[H1Pre + "TMAX_AVE"], h1pindex, AveIndex, DInd )
+        cMinT1 = _dayTemp( Chi0M1[0,1], Inputs[H1Pre + "TMIN_STD"],
+                           Inputs[H1Pre + "TMIN_AVE"], h1pindex, AveIndex, DInd )
+    # end with
+    # replace anything not finite with the dry data period mean
+    MaxFallback = Inputs["DATA_DRY_TMAX_AVE"][0, DInd]
+    MinFallback = Inputs["DATA_DRY_TMIN_AVE"][0, DInd]
+    TempList = list()
+    for tTemp, tFallback in [ ( cMaxT0, MaxFallback ), ( cMinT0, MinFallback ),
+                              ( cMaxT1, MaxFallback ), ( cMinT1, MinFallback ) ]:
+        if np.isfinite( tTemp ):
+            TempList.append( float( tTemp ) )
+        else:
+            TempList.append( float( tFallback ) )
+    # end for
     # end of function
-    return
+    return tuple( TempList )
 
 def rollOverChis():
     """Convenience function to roll over the Chi squared values
@@ -438,44 +525,267 @@ def calcCHI0( h0pindex, h1ptype, h1pindex ):
         h1pindex (int): index for projection period
     """
     # globals
-    global CHI0M0, CHIL1M0, CHI0M1, CHIL1M1, EPSI_2, A_DATA, B_DATA
-    global SIGMA_THRESH, A_PROJ, B_PROJ
+    global CHI0M0, CHIL1M0, CHI0M1, CHIL1M1, EPSI_2
     # calculations
+    CHI0M0, CHI0M1 = calcChiPair( globals(), CHIL1M0, CHIL1M1, EPSI_2, 
+                                  h0pindex, h1ptype, h1pindex )
+    # end of function
+    return
+
+def calcChiPair( Inputs, ChiL1M0, ChiL1M1, Epsi2, h0pindex, h1ptype, 
+                 h1pindex ):
+    """Calculate the current Chi no lag for both pathways. Does not use or
+    change module state.
+
+    Args:
+        Inputs (dict): input arrays by name, see INPUT_ARRAY_NAMES
+        ChiL1M0 (np.array): previous day Chi matrix for H0
+        ChiL1M1 (np.array): previous day Chi matrix for H1
+        Epsi2 (np.array): current error values
+        h0pindex(int): index for data period array
+        h1ptype (str): type of projection period
+        h1pindex (int): index for projection period
+
+    Returns:
+        tuple: ( Chi0M0, Chi0M1 ) new (1, NUM_OTHER) arrays
+
+    """
     # first set our A and B
-    A_0 = A_DATA[h0pindex, :, :].copy()
-    B_0 = B_DATA[h0pindex, :, :].copy()
+    A_0 = Inputs["A_DATA"][h0pindex, :, :]
+    B_0 = Inputs["B_DATA"][h0pindex, :, :]
     if h1ptype == WGI.DATA_KEYW:
-        A_1 = A_DATA[h1pindex, :, :].copy()
-        B_1 = B_DATA[h1pindex, :, :].copy()
+        A_1 = Inputs["A_DATA"][h1pindex, :, :]
+        B_1 = Inputs["B_DATA"][h1pindex, :, :]
     else:
-        A_1 = A_PROJ[h1pindex, :, :].copy()
-        B_1 = B_PROJ[h1pindex, :, :].copy()
+        A_1 = Inputs["A_PROJ"][h1pindex, :, :]
+        B_1 = Inputs["B_PROJ"][h1pindex, :, :]
     # 
-    np.seterr(all='raise')
-    try:
-        CHI0M0[:,:] = (np.matmul(CHIL1M0, A_0) + np.matmul( EPSI_2, B_0 ))[:,:]
-    except:
-        CHI0M0[:,:] = 1.0
-    try:
-        CHI0M1[:,:] = (np.matmul(CHIL1M1, A_1) + np.matmul( EPSI_2, B_1 ))[:,:]
-    except:
-        CHI0M1[:,:] = 1.0
-    # do some checks
-    np.seterr(all='warn')
+    Chi0M0 = np.ones( (1, NUM_OTHER), dtype=np.float64 )
+    Chi0M1 = np.ones( (1, NUM_OTHER), dtype=np.float64 )
+    with np.errstate( all='raise' ):
+        try:
+            Chi0M0[:,:] = (np.matmul(ChiL1M0, A_0) + np.matmul( Epsi2, B_0 ))[:,:]
+        except:
+            Chi0M0[:,:] = 1.0
+        try:
+            Chi0M1[:,:] = (np.matmul(ChiL1M1, A_1) + np.matmul( Epsi2, B_1 ))[:,:]
+        except:
+            Chi0M1[:,:] = 1.0
+    # end with
     # first check to make sure that we actually got the calculation done
-    CHI0M0 = np.where( np.isnan( CHI0M0 ), 1.0, CHI0M0 )
-    CHI0M0 = np.where( np.isinf( CHI0M0 ), 1.0, CHI0M0 )
-    CHI0M1 = np.where( np.isnan( CHI0M1 ), 1.0, CHI0M1 )
-    CHI0M1 = np.where( np.isinf( CHI0M1 ), 1.0, CHI0M1 )
-    # next we need to provide a sigma threshold
-    CHI0M0 = np.where( CHI0M0 > SIGMA_THRESH, SIGMA_THRESH, CHI0M0 )
-    CHI0M0 = np.where( CHI0M0 < (-1.0*SIGMA_THRESH), (-1.0*SIGMA_THRESH), 
-                       CHI0M0 )
-    CHI0M1 = np.where( CHI0M1 > SIGMA_THRESH, SIGMA_THRESH, CHI0M0 )
-    CHI0M1 = np.where( CHI0M1 < (-1.0*SIGMA_THRESH), (-1.0*SIGMA_THRESH), 
-                       CHI0M1 )
+    Chi0M0 = np.where( np.isfinite( Chi0M0 ), Chi0M0, 1.0 )
+    Chi0M1 = np.where( np.isfinite( Chi0M1 ), Chi0M1, 1.0 )
+    # next we need to provide a sigma threshold. The H1 upper check keeps
+    # the H0 value where not above the threshold, as it always has.
+    Chi0M0 = np.where( Chi0M0 > SIGMA_THRESH, SIGMA_THRESH, Chi0M0 )
+    Chi0M0 = np.where( Chi0M0 < (-1.0*SIGMA_THRESH), (-1.0*SIGMA_THRESH), 
+                       Chi0M0 )
+    Chi0M1 = np.where( Chi0M1 > SIGMA_THRESH, SIGMA_THRESH, Chi0M0 )
+    Chi0M1 = np.where( Chi0M1 < (-1.0*SIGMA_THRESH), (-1.0*SIGMA_THRESH), 
+                       Chi0M1 )
     # end of function
-    return
+    return ( Chi0M0, Chi0M1 )
+
+def periodMatrices( Inputs, H0PerA, H1IsProjA, H1PerA ):
+    """Stack the A and B matrices of all periods and index them by day for
+    both pathways. Data periods come first in the stacks.
+
+    Args:
+        Inputs (dict): input arrays by name, see INPUT_ARRAY_NAMES
+        H0PerA (np.array): H0 data period index by day
+        H1IsProjA (np.array): bool, True for H1 projection period days
+        H1PerA (np.array): H1 period index by day
+
+    Returns:
+        tuple: ( AStack, BStack, H0MatA, H1MatA ) A and B matrices with
+        shape (periods, NUM_OTHER, NUM_OTHER) and the int index into the 
+        stacks by day for H0 and H1
+
+    """
+    # start of function
+    NumData = Inputs["A_DATA"].shape[0]
+    AStack = np.concatenate( [ Inputs["A_DATA"], Inputs["A_PROJ"] ], axis=0 )
+    BStack = np.concatenate( [ Inputs["B_DATA"], Inputs["B_PROJ"] ], axis=0 )
+    H0MatA = np.asarray( H0PerA, dtype=np.intp )
+    H1MatA = np.where( H1IsProjA, NumData + H1PerA, H1PerA ).astype( np.intp )
+    # end of function
+    return ( AStack, BStack, H0MatA, H1MatA )
+
+def calcChiSeries( AStack, BStack, H0MatA, H1MatA, Eps ):
+    """Calculate the Chi series for both pathways for a whole realization,
+    or for a block of realizations, starting from Chi values of one. Same
+    recurrence, non-finite replacement, and SIGMA_THRESH treatment as 
+    calcChiPair.
+
+    Args:
+        AStack (np.array): A matrices, see periodMatrices
+        BStack (np.array): B matrices, see periodMatrices
+        H0MatA (np.array): H0 matrix index by day
+        H1MatA (np.array): H1 matrix index by day
+        Eps (np.array): error variate by day, shape (days,) for one 
+                        realization or (R, days) for a block
+
+    Returns:
+        tuple: ( Chi0, Chi1 ) each with shape Eps.shape + (NUM_OTHER,)
+
+    """
+    # start of function
+    if Eps.ndim == 1:
+        return _chiKernel( AStack, BStack, H0MatA, H1MatA, Eps )
+    NumReal, NumDays = Eps.shape
+    Thresh = SIGMA_THRESH
+    Chi0 = np.zeros( (NumReal, NumDays, NUM_OTHER), dtype=np.float64 )
+    Chi1 = np.zeros( (NumReal, NumDays, NUM_OTHER), dtype=np.float64 )
+    PrevChi0 = np.ones( (NumReal, NUM_OTHER), dtype=np.float64 )
+    PrevChi1 = np.ones( (NumReal, NUM_OTHER), dtype=np.float64 )
+    Eps2 = np.zeros( (NumReal, NUM_OTHER), dtype=np.float64 )
+    with np.errstate( all='ignore' ):
+        for jJ in range( NumDays ):
+            Eps2[:, 0] = Eps[:, jJ]
+            Eps2[:, 1] = Eps[:, jJ]
+            cChi0 = ( np.matmul( PrevChi0, AStack[H0MatA[jJ]] ) +
+                      np.matmul( Eps2, BStack[H0MatA[jJ]] ) )
+            cChi1 = ( np.matmul( PrevChi1, AStack[H1MatA[jJ]] ) +
+                      np.matmul( Eps2, BStack[H1MatA[jJ]] ) )
+            # a failed product sets both values of the row to one
+            cChi0[~np.all( np.isfinite( cChi0 ), axis=1 )] = 1.0
+            cChi1[~np.all( np.isfinite( cChi1 ), axis=1 )] = 1.0
+            cChi0 = np.clip( cChi0, -Thresh, Thresh )
+            cChi1 = np.where( cChi1 > Thresh, Thresh, cChi0 )
+            cChi1 = np.where( cChi1 < -Thresh, -Thresh, cChi1 )
+            Chi0[:, jJ, :] = cChi0
+            Chi1[:, jJ, :] = cChi1
+            PrevChi0 = cChi0
+            PrevChi1 = cChi1
+        # end of day for
+    # end with
+    # end of function
+    return ( Chi0, Chi1 )
+
+def _chiKernel( AStack, BStack, H0MatA, H1MatA, Eps ):
+    """Chi recurrence for one realization on Python floats. The 1 x 2 by
+    2 x 2 products are written out, which is much faster than np.matmul
+    on arrays this small and gives the same values."""
+    # start of function
+    NumDays = len( Eps )
+    Thresh = float( SIGMA_THRESH )
+    NegThresh = -1.0 * Thresh
+    AList = [ tuple( x ) for x in AStack.reshape( -1, 4 ).tolist() ]
+    BList = [ tuple( x ) for x in BStack.reshape( -1, 4 ).tolist() ]
+    EpsL = np.asarray( Eps, dtype=np.float64 ).tolist()
+    H0L = np.asarray( H0MatA ).tolist()
+    H1L = np.asarray( H1MatA ).tolist()
+    Out0 = [ 0.0 ] * ( 2 * NumDays )
+    Out1 = [ 0.0 ] * ( 2 * NumDays )
+    p00 = p01 = p10 = p11 = 1.0
+    for jJ in range( NumDays ):
+        e = EpsL[jJ]
+        a00, a01, a10, a11 = AList[H0L[jJ]]
+        b00, b01, b10, b11 = BList[H0L[jJ]]
+        c00 = ( p00 * a00 + p01 * a10 ) + ( e * b00 + e * b10 )
+        c01 = ( p00 * a01 + p01 * a11 ) + ( e * b01 + e * b11 )
+        a00, a01, a10, a11 = AList[H1L[jJ]]
+        b00, b01, b10, b11 = BList[H1L[jJ]]
+        c10 = ( p10 * a00 + p11 * a10 ) + ( e * b00 + e * b10 )
+        c11 = ( p10 * a01 + p11 * a11 ) + ( e * b01 + e * b11 )
+        # a failed product sets both values to one
+        if not ( math.isfinite( c00 ) and math.isfinite( c01 ) ):
+            c00 = c01 = 1.0
+        if not ( math.isfinite( c10 ) and math.isfinite( c11 ) ):
+            c10 = c11 = 1.0
+        # threshold; H1 keeps the H0 value where not above the threshold
+        c00 = Thresh if c00 > Thresh else ( NegThresh if c00 < NegThresh else c00 )
+        c01 = Thresh if c01 > Thresh else ( NegThresh if c01 < NegThresh else c01 )
+        c10 = Thresh if c10 > Thresh else c00
+        c11 = Thresh if c11 > Thresh else c01
+        Out0[2*jJ] = p00 = c00
+        Out0[2*jJ + 1] = p01 = c01
+        Out1[2*jJ] = p10 = c10
+        Out1[2*jJ + 1] = p11 = c11
+    # end of day for
+    Chi0 = np.array( Out0, dtype=np.float64 ).reshape( NumDays, NUM_OTHER )
+    Chi1 = np.array( Out1, dtype=np.float64 ).reshape( NumDays, NUM_OTHER )
+    # end of function
+    return ( Chi0, Chi1 )
+
+def dayTempArrays( Inputs, DoYA, H0PerA, H1IsProjA, H1PerA ):
+    """Gather the smoothed temperature mean and standard deviation for 
+    every day and both states with fancy indexing. Uses the same period
+    indexes as calcDayTemps, including the H0 period index for the H1 data
+    period mean.
+
+    Args:
+        Inputs (dict): input arrays by name, see INPUT_ARRAY_NAMES
+        DoYA (np.array): day of year by day
+        H0PerA (np.array): H0 data period index by day
+        H1IsProjA (np.array): bool, True for H1 projection period days
+        H1PerA (np.array): H1 period index by day
+
+    Returns:
+        dict: arrays with shape (2, days), [dry, wet] along axis 0, for
+        H0TmaxAve, H0TmaxStd, H0TminAve, H0TminStd, and the H1 equivalents,
+        and the TmaxFallback and TminFallback arrays by day used for 
+        results that are not finite
+
+    """
+    # start of function
+    DoYI = np.asarray( DoYA ) - 1
+    # both branches of np.where are evaluated, so use a valid index for
+    # the period type that is not active on a day
+    DPerA = np.where( H1IsProjA, 0, H1PerA )
+    PerA = np.where( H1IsProjA, H1PerA, 0 )
+    TempDict = dict()
+    for tTemp, tKey in [ ( "Tmax", "TMAX" ), ( "Tmin", "TMIN" ) ]:
+        for tStat, tSuffix in [ ( "Ave", "_AVE" ), ( "Std", "_STD" ) ]:
+            H0List = list()
+            H1List = list()
+            for tState in [ "DRY_", "WET_" ]:
+                cData = Inputs["DATA_" + tState + tKey + tSuffix]
+                cProj = Inputs["PROJ_" + tState + tKey + tSuffix]
+                H0List.append( cData[H0PerA, DoYI] )
+                if tStat == "Ave":
+                    H1Data = cData[H0PerA, DoYI]
+                else:
+                    H1Data = cData[DPerA, DoYI]
+                H1List.append( np.where( H1IsProjA, cProj[PerA, DoYI], 
+                                         H1Data ) )
+            # end for
+            TempDict["H0" + tTemp + tStat] = np.stack( H0List )
+            TempDict["H1" + tTemp + tStat] = np.stack( H1List )
+        # end for
+        TempDict[tTemp + "Fallback"] = \
+                        Inputs["DATA_DRY_" + tKey + "_AVE"][0, DoYI].copy()
+    # end for
+    # end of function
+    return TempDict
+
+def calcTempSeries( Chi, WetState, TAve, TStd, Fallback ):
+    """Calculate daily temperature for all days of one realization, or a
+    block of realizations, in one expression. Results that are not finite
+    take the Fallback value for the day.
+
+    Args:
+        Chi (np.array): residual for this temperature, shape (days,) or 
+                        (R, days)
+        WetState (np.array): bool wet state with the shape of Chi
+        TAve (np.array): mean by day, [dry, wet] along axis 0, shape 
+                         (2, days), see dayTempArrays
+        TStd (np.array): standard deviation by day, shape (2, days)
+        Fallback (np.array): value to use for NaN or Inf results by day
+
+    Returns:
+        np.array: float32 temperature with the shape of Chi
+
+    """
+    # start of function
+    StateI = WetState.astype( np.intp )
+    DayI = np.arange( WetState.shape[-1] )
+    with np.errstate( all='ignore' ):
+        Temps = ( Chi * TStd[StateI, DayI] ) + TAve[StateI, DayI]
+    # end with
+    Temps = np.where( np.isfinite( Temps ), Temps, Fallback )
+    # end of function
+    return Temps.astype( np.float32 )
 
 def cleanAllEnd():
     """Convenience method to clean or delete all trackers at the end """
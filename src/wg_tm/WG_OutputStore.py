@@ -0,0 +1,645 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_OutputStore
+   :platform: Windows, Linux
+   :synopsis: Chunked, compressed, columnar store for realization outputs
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+Alternative to the zip compressed pickles written by WG_HighRealResults.
+Selected with WG_Inputs.OUT_FORMAT = OUT_FORMAT_STORE.
+
+Each output kind, H0, H1, WS_H0, WS_H1, WB_H0, WB_H1, and Delta, is an HDF5
+group. The groups use the same names as the pickle file prefixes. Each
+column is one float32 dataset whose first axis is the realization. Grid
+precipitation for H0 and H1 is a single (realization, day, grid) dataset.
+Other columns are (realization, day) or (realization, month) datasets.
+Datasets are chunked by one realization and CHUNK_DAYS along time and
+compressed with WG_Inputs.OUT_STORE_COMPRESSION. A read of one
+realization, grid, or date range only decompresses the chunks that it
+touches.
+
+HDF5 files take one writer at a time, so every process appends to its own
+shard file in the store directory. The file is opened and closed for each
+append so that a worker that is stopped does not leave a damaged shard.
+OutputStore reads all shards in the directory as a single store.
+
+Pickle and npy files are written to a temporary name and renamed into 
+place, so a reader never sees a partial file, and a worker whose range 
+was reassigned and that is still writing never truncates the file of the
+new owner.
+
+OUT_FORMAT_NPY keeps one output per kind and realization, like the pickles,
+but writes an uncompressed, Fortran ordered .npy array with a small JSON 
+header for the columns and the date index. readFrame and readNpyFrame 
+memory map the array and read only the requested columns. readFrame falls
+back to the pickle when there is no .npy file, and to the store when there
+is neither, so readers that work with output file names, like mHSP2, 
+work with every output format.
+
+h5py is required. The blosc-lz4 and zstd compressors also require
+hdf5plugin.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+import os
+import re
+import glob
+import json
+import socket
+import numpy as np
+import pandas as pd
+# project imports
+import WG_Inputs as WGI
+
+# parameters
+OUT_FORMAT_PICKLE = "pickle"
+"""Output format keyword for zip compressed pickles, one file per output
+kind and realization"""
+OUT_FORMAT_STORE = "store"
+"""Output format keyword for the chunked, columnar store in this module"""
+OUT_FORMAT_NPY = "npy"
+"""Output format keyword for uncompressed, memory mappable .npy files with a
+JSON header, one per output kind and realization"""
+PICKLE_EXT = ".pickle"
+"""Pickle file extension"""
+NPY_EXT = ".npy"
+"""Array file extension for the npy format"""
+HEADER_EXT = ".json"
+"""Header file extension for the npy format"""
+NPY_VERSION = 1
+"""Version of the npy format header"""
+STORE_SUFFIX = "_store"
+"""Store directory name suffix; the directory is OUT_LABEL + STORE_SUFFIX"""
+SHARD_EXT = ".h5"
+"""Shard file extension"""
+CHUNK_DAYS = 1461
+"""Chunk length along the time axis, four years of days"""
+REAL_KEY = "RealNum"
+"""Dataset name for the realization number of each row in a group"""
+INDEX_KEY = "Index"
+"""Dataset name for the time index of a group, as int64 nanoseconds"""
+GRID_KEY = "Precip_mm"
+"""Dataset name for grid precipitation in the H0 and H1 groups"""
+GRID_HDR = "Precip_mm_%d"
+"""Column name format for grid precipitation in the H0 and H1 DataFrames"""
+COLUMNS_ATTR = "columns"
+"""Group attribute with the column names in DataFrame order"""
+GRIDS_ATTR = "grid_ids"
+"""Group attribute with the LOCA grid ids for the grid axis"""
+GROUP_NAMES = [ "H0", "H1", "WS_H0", "WS_H1", "WB_H0", "WB_H1", "Delta" ]
+"""Store group names, which are also the output file name prefixes"""
+FRAME_NAME_RE = re.compile( r"^(.+)_R(\d+)_DF$" )
+"""Output file name without extension; prefix and label, and realization"""
+# globals
+STORE_CACHE = dict()
+"""OutputStore by store directory for frameExists and readFrame"""
+
+
+#--------------------------------------------------------------------------
+# python functions
+def storeDir( OutDir=None ):
+    """Store directory for the current WG_Inputs output settings
+
+    KWargs:
+        OutDir (str): output directory; defaults to WG_Inputs.OUT_DIR and
+                      WG_Inputs.OUT_SUB_DIR
+
+    Returns:
+        str: store directory path
+    """
+    if OutDir is None:
+        OutDir = os.path.join( WGI.OUT_DIR, WGI.OUT_SUB_DIR )
+    return os.path.normpath( os.path.join( OutDir, "%s%s" %
+                                           ( WGI.OUT_LABEL, STORE_SUFFIX ) ) )
+
+def shardPath( OutDir=None ):
+    """Shard file for this process. Host name and process id keep the
+    writers separate.
+
+    KWargs:
+        OutDir (str): see storeDir
+
+    Returns:
+        str: shard file path
+    """
+    ShardName = "%s_%d%s" % ( socket.gethostname(), os.getpid(), SHARD_EXT )
+    return os.path.normpath( os.path.join( storeDir( OutDir ), ShardName ) )
+
+def compressionArgs( Name=None ):
+    """Keyword arguments for h5py create_dataset for a compressor name
+
+    KWargs:
+        Name (str): "lzf", "gzip", "blosc-lz4", "zstd", or "none"; defaults
+                    to WG_Inputs.OUT_STORE_COMPRESSION
+
+    Returns:
+        dict: create_dataset keyword arguments
+    """
+    # start
+    if Name is None:
+        Name = WGI.OUT_STORE_COMPRESSION
+    if ( Name is None ) or ( Name == "none" ):
+        return dict()
+    if Name in [ "lzf", "gzip" ]:
+        return { "compression" : Name, "shuffle" : True }
+    # the fast compressors are HDF5 plugins
+    import hdf5plugin
+    if Name == "blosc-lz4":
+        return dict( **hdf5plugin.Blosc( cname='lz4', clevel=5,
+                                         shuffle=hdf5plugin.Blosc.SHUFFLE ) )
+    if Name == "zstd":
+        return dict( **hdf5plugin.Zstd( clevel=3 ) )
+    ErrorMsg = "Unknown output store compression %s!!!" % Name
+    raise ValueError( ErrorMsg )
+
+def _appendRows( H5File, GroupName, RealNum, Index, ColDict, Attrs ):
+    """Append one realization to a group, creating the group and its
+    datasets on first use.
+
+    Args:
+        H5File (h5py.File): open shard file
+        GroupName (str): output kind
+        RealNum (int): realization number
+        Index (pd.DatetimeIndex): time index for the columns
+        ColDict (dict): column name to array with shape (time,) or
+                        (time, grid); in DataFrame order
+        Attrs (dict): group attributes to set when the group is created
+
+    """
+    # start
+    NumTime = len( Index )
+    if GroupName not in H5File:
+        cGrp = H5File.create_group( GroupName )
+        cGrp.create_dataset( REAL_KEY, shape=(0,), maxshape=(None,),
+                             dtype=np.int64, chunks=(1024,) )
+        cGrp.create_dataset( INDEX_KEY, data=Index.values.astype( 
+                                "datetime64[ns]" ).astype( np.int64 ) )
+        CompArgs = compressionArgs()
+        for cName, cArray in ColDict.items():
+            cShape = ( 0, NumTime ) + tuple( cArray.shape[1:] )
+            cChunks = ( 1, min( NumTime, CHUNK_DAYS ) ) + tuple( cArray.shape[1:] )
+            cGrp.create_dataset( cName, shape=cShape,
+                                 maxshape=( None, ) + cShape[1:],
+                                 dtype=np.float32, chunks=cChunks, **CompArgs )
+        # end for
+        cGrp.attrs[COLUMNS_ATTR] = list( ColDict.keys() )
+        for aKey, aVal in Attrs.items():
+            cGrp.attrs[aKey] = aVal
+        # end for
+    # end if
+    cGrp = H5File[GroupName]
+    NewRow = cGrp[REAL_KEY].shape[0]
+    for cName, cArray in ColDict.items():
+        cDS = cGrp[cName]
+        cDS.resize( NewRow + 1, axis=0 )
+        cDS[NewRow] = np.asarray( cArray, dtype=np.float32 )
+    # end for
+    # the realization number is written last so that an interrupted append
+    # is not in the catalog
+    cGrp[REAL_KEY].resize( ( NewRow + 1, ) )
+    cGrp[REAL_KEY][NewRow] = int( RealNum )
+    # end
+    return
+
+def appendRealization( RealNum, DT_INDEX, H0Real, H1Real, PreStart ):
+    """Append the H0 and H1 realization results, the equivalent of the
+    H0 and H1 pickles, to the shard for this process.
+
+    Args:
+        RealNum (int): realization number
+        DT_INDEX (pd.DateTimeIndex): index for all outputs
+        H0Real (np.array): H0 realization results, (day, column)
+        H1Real (np.array): H1 realization results, (day, column)
+        PreStart (int): first grid precipitation column in the results
+
+    """
+    # imports
+    import h5py
+    # start
+    FilePath = shardPath()
+    os.makedirs( os.path.dirname( FilePath ), exist_ok=True )
+    Attrs = { GRIDS_ATTR : np.array( WGI.LOCA_KEYS, dtype=np.int64 ) }
+    with h5py.File( FilePath, 'a' ) as H5File:
+        for GroupName, cReal in [ ( "H0", H0Real ), ( "H1", H1Real ) ]:
+            ColDict = { "Tmax_C" : cReal[:, 0],
+                        "Tmin_C" : cReal[:, 1],
+                        GRID_KEY : cReal[:, PreStart:], }
+            _appendRows( H5File, GroupName, RealNum, DT_INDEX, ColDict, Attrs )
+        # end for
+    # end with
+    return
+
+def appendFrames( RealNum, FrameDict ):
+    """Append realization DataFrames to the shard for this process. Each
+    DataFrame column becomes a dataset.
+
+    Args:
+        RealNum (int): realization number
+        FrameDict (dict): output kind, for example "WS_H0", to DataFrame
+
+    """
+    # imports
+    import h5py
+    # start
+    FilePath = shardPath()
+    os.makedirs( os.path.dirname( FilePath ), exist_ok=True )
+    with h5py.File( FilePath, 'a' ) as H5File:
+        for GroupName, cDF in FrameDict.items():
+            ColDict = { x : cDF[x].to_numpy() for x in cDF.columns }
+            _appendRows( H5File, GroupName, RealNum,
+                         pd.DatetimeIndex( cDF.index ), ColDict, dict() )
+        # end for
+    # end with
+    return
+
+
+def npyBasePath( FilePath ):
+    """Path without extension for the npy format files of an output. The
+    .npy and .json files take the place of the .pickle file.
+
+    Args:
+        FilePath (str): pickle file path, or path without extension
+
+    Returns:
+        str: path without extension
+    """
+    BasePath, Ext = os.path.splitext( FilePath )
+    if Ext in [ PICKLE_EXT, NPY_EXT, HEADER_EXT ]:
+        return BasePath
+    return FilePath
+
+def _tmpPath( FilePath ):
+    """Temporary file path next to FilePath for this process. Host name
+    and process id keep the writers separate."""
+    return "%s.%s_%d.tmp" % ( FilePath, socket.gethostname(), os.getpid() )
+
+def writeFrame( DF, FilePath ):
+    """Write one realization DataFrame in the WG_Inputs.OUT_FORMAT file
+    format; a zip compressed pickle or npy with a JSON header.
+
+    Args:
+        DF (pd.DataFrame): realization output
+        FilePath (str): pickle file path
+
+    """
+    if WGI.OUT_FORMAT == OUT_FORMAT_NPY:
+        writeNpyFrame( DF, FilePath )
+    else:
+        TmpPath = _tmpPath( FilePath )
+        # the archive member keeps the name of the final file
+        DF.to_pickle( TmpPath, compression={ "method" : "zip", 
+                      "archive_name" : os.path.basename( FilePath ) } )
+        os.replace( TmpPath, FilePath )
+    # end
+    return
+
+def writeNpyFrame( DF, FilePath ):
+    """Write a DataFrame as a raw, Fortran ordered .npy array of 
+    (time, column) and a JSON header with the columns and the index. 
+    Fortran order keeps each column contiguous, so a memory mapped read of
+    one column only touches the pages of that column.
+
+    Args:
+        DF (pd.DataFrame): realization output
+        FilePath (str): pickle file path, or path without extension
+
+    """
+    # start
+    BasePath = npyBasePath( FilePath )
+    Values = np.asfortranarray( DF.to_numpy() )
+    cIndex = pd.DatetimeIndex( DF.index )
+    Header = { "version" : NPY_VERSION,
+               "columns" : [ str( x ) for x in DF.columns ],
+               "col_dtypes" : [ DF[x].dtype.str for x in DF.columns ],
+               "start" : cIndex[0].isoformat(),
+               "periods" : len( cIndex ), }
+    cFreq = cIndex.freqstr
+    if ( cFreq is None ) and ( len( cIndex ) > 2 ):
+        cFreq = pd.infer_freq( cIndex )
+    if cFreq is None:
+        Header["dates"] = [ x.isoformat() for x in cIndex ]
+    else:
+        Header["freq"] = cFreq
+    # end if
+    # the header goes first; the .npy marks a complete output, see 
+    # npyExists
+    TmpPath = _tmpPath( BasePath + HEADER_EXT )
+    with open( TmpPath, 'w' ) as OF:
+        json.dump( Header, OF )
+    # end with
+    os.replace( TmpPath, BasePath + HEADER_EXT )
+    TmpPath = _tmpPath( BasePath + NPY_EXT )
+    with open( TmpPath, 'wb' ) as OF:
+        np.save( OF, Values, allow_pickle=False )
+    # end with
+    os.replace( TmpPath, BasePath + NPY_EXT )
+    return
+
+def npyExists( FilePath ):
+    """Check for both files of an npy format output
+
+    Args:
+        FilePath (str): pickle file path, or path without extension
+
+    Returns:
+        bool: True if the .npy and .json files exist
+    """
+    BasePath = npyBasePath( FilePath )
+    return os.path.isfile( BasePath + HEADER_EXT ) and \
+           os.path.isfile( BasePath + NPY_EXT )
+
+def _storeFrame( FilePath ):
+    """Find the realization output for a pickle file path in the store. 
+    The output kind, label, and realization are parsed from the file name
+    and the store is the label store directory next to the file.
+
+    Args:
+        FilePath (str): pickle file path
+
+    Returns:
+        tuple: ( OutputStore, group name, realization number ) or None
+               when the output is not in a store
+    """
+    # start
+    Match = FRAME_NAME_RE.match( os.path.basename( npyBasePath( FilePath ) ) )
+    if Match is None:
+        return None
+    Head = Match.group( 1 )
+    RealNum = int( Match.group( 2 ) )
+    # the longest name first, so "WS_H0" is not taken for "H0"
+    GroupList = [ x for x in sorted( GROUP_NAMES, key=len, reverse=True )
+                  if Head.startswith( x + "_" ) ]
+    if len( GroupList ) == 0:
+        return None
+    GroupName = GroupList[0]
+    StoreDir = os.path.normpath( os.path.join( os.path.dirname( FilePath ),
+                    "%s%s" % ( Head[len( GroupName ) + 1:], STORE_SUFFIX ) ) )
+    if not os.path.isdir( StoreDir ):
+        return None
+    cStore = STORE_CACHE.get( StoreDir, None )
+    if ( cStore is None ) or \
+            ( RealNum not in cStore.Catalog.get( GroupName, dict() ) ):
+        # new or grown since the last read
+        cStore = OutputStore( StoreDir )
+        STORE_CACHE[StoreDir] = cStore
+    if RealNum not in cStore.Catalog.get( GroupName, dict() ):
+        return None
+    return ( cStore, GroupName, RealNum )
+
+def frameExists( FilePath ):
+    """Check for a realization output in any output format
+
+    Args:
+        FilePath (str): pickle file path
+
+    Returns:
+        bool: True if the pickle or both npy files exist, or the output
+              is in the store
+    """
+    if npyExists( FilePath ):
+        return True
+    if os.path.isfile( FilePath ):
+        return True
+    return _storeFrame( FilePath ) is not None
+
+def readFrame( FilePath, Columns=None ):
+    """Read a realization output written by writeFrame or to the store. 
+    The npy format is used when it exists, then the pickle, and then the
+    store.
+
+    Args:
+        FilePath (str): pickle file path
+
+    KWargs:
+        Columns (list): columns to read; defaults to all
+
+    Returns:
+        pd.DataFrame: realization output
+    """
+    if npyExists( FilePath ):
+        return readNpyFrame( FilePath, Columns=Columns )
+    if os.path.isfile( FilePath ):
+        DF = pd.read_pickle( FilePath, compression='zip' )
+    else:
+        StoreKey = _storeFrame( FilePath )
+        if StoreKey is None:
+            ErrorMsg = "Output %s is not in any output format!!!" % FilePath
+            raise FileNotFoundError( ErrorMsg )
+        cStore, GroupName, RealNum = StoreKey
+        DF = cStore.readFrame( GroupName, RealNum )
+    # end if
+    if Columns is not None:
+        DF = DF[Columns].copy()
+    return DF
+
+def readNpyFrame( FilePath, Columns=None ):
+    """Read a DataFrame written by writeNpyFrame. The array is memory 
+    mapped and only the requested columns are read.
+
+    Args:
+        FilePath (str): pickle file path, or path without extension
+
+    KWargs:
+        Columns (list): columns to read; defaults to all
+
+    Returns:
+        pd.DataFrame: realization output
+    """
+    # start
+    BasePath = npyBasePath( FilePath )
+    with open( BasePath + HEADER_EXT, 'r' ) as IF:
+        Header = json.load( IF )
+    # end with
+    if "dates" in Header:
+        cIndex = pd.DatetimeIndex( Header["dates"] )
+    else:
+        cIndex = pd.date_range( start=Header["start"], 
+                                periods=Header["periods"], 
+                                freq=Header["freq"] )
+    AllCols = Header["columns"]
+    if Columns is None:
+        Columns = AllCols
+    Values = np.load( BasePath + NPY_EXT, mmap_mode='r', allow_pickle=False )
+    DDict = dict()
+    for cCol in Columns:
+        iI = AllCols.index( cCol )
+        DDict[cCol] = np.array( Values[:, iI], 
+                                dtype=Header["col_dtypes"][iI] )
+    # end for
+    return pd.DataFrame( index=cIndex, data=DDict )
+
+
+class OutputStore(object):
+    """Read access to all shards in a store directory. Reads only
+    decompress the chunks in the requested selection.
+    """
+
+    def __init__( self, StoreDir=None ):
+        """Initialization method. Builds the catalog of realizations in
+        each shard.
+
+        KWargs:
+            StoreDir (str): store directory; defaults to storeDir()
+
+        """
+        # imports
+        import h5py
+        try:
+            # registers the blosc and zstd filters for reading
+            import hdf5plugin
+        except ImportError:
+            pass
+        # start
+        if StoreDir is None:
+            StoreDir = storeDir()
+        self.StoreDir = StoreDir
+        self.Shards = sorted( glob.glob( os.path.join( StoreDir,
+                                                       "*%s" % SHARD_EXT ) ) )
+        # catalog is group name to { RealNum : ( shard index, row ) }
+        self.Catalog = dict()
+        self.Meta = dict()
+        for iI, cShard in enumerate( self.Shards ):
+            with h5py.File( cShard, 'r' ) as H5File:
+                for GroupName in H5File.keys():
+                    cGrp = H5File[GroupName]
+                    cCat = self.Catalog.setdefault( GroupName, dict() )
+                    for jJ, RealNum in enumerate( cGrp[REAL_KEY][:] ):
+                        # a repeated realization uses the last append
+                        cCat[int( RealNum )] = ( iI, jJ )
+                    # end for
+                    if GroupName not in self.Meta:
+                        self.Meta[GroupName] = {
+                            "index" : pd.DatetimeIndex( cGrp[INDEX_KEY][:].astype( 
+                                                    "datetime64[ns]" ) ),
+                            "columns" : [ str( x ) for x in
+                                          cGrp.attrs[COLUMNS_ATTR] ],
+                            "grids" : list( cGrp.attrs.get( GRIDS_ATTR, [] ) ), }
+                # end for
+            # end with
+        # end for
+
+    def realizations( self, GroupName="H0" ):
+        """Realization numbers in the store for an output kind
+
+        KWargs:
+            GroupName (str): output kind
+
+        Returns:
+            list: sorted realization numbers
+        """
+        return sorted( self.Catalog.get( GroupName, dict() ).keys() )
+
+    def index( self, GroupName ):
+        """Time index for an output kind"""
+        return self.Meta[GroupName]["index"]
+
+    def read( self, GroupName, Column, RealNums=None, Start=None, End=None,
+              Grids=None ):
+        """Read a selection of one column.
+
+        Args:
+            GroupName (str): output kind
+            Column (str): column or dataset name
+
+        KWargs:
+            RealNums (list): realization numbers; defaults to all
+            Start (datetime): first date, inclusive; defaults to the start
+            End (datetime): last date, inclusive; defaults to the end
+            Grids (list): LOCA grid ids for grid precipitation; defaults
+                          to all. The grid axis of the result is in this
+                          order.
+
+        Returns:
+            np.array: float32 with shape (realization, time) or
+            (realization, time, grid)
+        """
+        # imports
+        import h5py
+        # start
+        if RealNums is None:
+            RealNums = self.realizations( GroupName )
+        cIndex = self.index( GroupName )
+        StartI = 0 if Start is None else int( cIndex.searchsorted(
+                                            pd.Timestamp( Start ), side='left' ) )
+        EndI = len( cIndex ) if End is None else int( cIndex.searchsorted(
+                                            pd.Timestamp( End ), side='right' ) )
+        GridSel = slice( None )
+        GridOrder = None
+        if Grids is not None:
+            AllGrids = self.Meta[GroupName]["grids"]
+            # h5py reads increasing, unique indexes; reorder after the read
+            GridSel, GridOrder = np.unique( [ AllGrids.index( x ) for x in 
+                                              Grids ], return_inverse=True )
+            GridSel = GridSel.tolist()
+        # group the requested rows by shard
+        cCat = self.Catalog[GroupName]
+        OutList = [ None ] * len( RealNums )
+        ByShard = dict()
+        for iI, RealNum in enumerate( RealNums ):
+            ShardI, Row = cCat[int( RealNum )]
+            ByShard.setdefault( ShardI, list() ).append( ( iI, Row ) )
+        # end for
+        for ShardI, RowList in ByShard.items():
+            with h5py.File( self.Shards[ShardI], 'r' ) as H5File:
+                cDS = H5File[GroupName][Column]
+                for iI, Row in RowList:
+                    if ( cDS.ndim == 3 ) and ( GridOrder is not None ):
+                        OutList[iI] = cDS[Row, StartI:EndI, GridSel][:, GridOrder]
+                    elif cDS.ndim == 3:
+                        OutList[iI] = cDS[Row, StartI:EndI, GridSel]
+                    else:
+                        OutList[iI] = cDS[Row, StartI:EndI]
+                # end for
+            # end with
+        # end for
+        return np.stack( OutList )
+
+    def readFrame( self, GroupName, RealNum ):
+        """One realization as a DataFrame with the same columns as the
+        pickle output
+
+        Args:
+            GroupName (str): output kind
+            RealNum (int): realization number
+
+        Returns:
+            pd.DataFrame: realization outputs
+        """
+        # start
+        DDict = dict()
+        for cName in self.Meta[GroupName]["columns"]:
+            cVals = self.read( GroupName, cName, RealNums=[ RealNum ] )[0]
+            if cVals.ndim == 2:
+                for jJ, cGID in enumerate( self.Meta[GroupName]["grids"] ):
+                    DDict[GRID_HDR % cGID] = cVals[:, jJ]
+                # end for
+            else:
+                DDict[cName] = cVals
+        # end for
+        return pd.DataFrame( index=self.index( GroupName ), data=DDict )
+
+
+#EOF
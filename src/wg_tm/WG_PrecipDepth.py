@@ -53,6 +53,15 @@ WD_THRESH = 0.2
 """Wet dry threshold as used in this study in millimeters. It provides the
 minimum possible precipitation and so bounds our PDFs and CDFs"""
 
+NUM_CDF_KNOTS = 101
+"""Number of probability knots used to represent the depth CDF"""
+CDF_PROBS = np.array( [round(0.01 * x, 2) for x in range(NUM_CDF_KNOTS)],
+                      dtype=np.float64 )
+"""Probability knots for the depth CDF, 0.00 to 1.00 by 0.01"""
+QUANTILE_TOL = 1.0e-9
+"""Convergence tolerance in mm for mixedExpQuantile"""
+QUANTILE_MAX_ITER = 60
+"""Maximum Newton or bisection iterations for mixedExpQuantile"""
 
 
 class CreateDistError(Exception):
@@ -62,6 +71,227 @@ class CreateDistError(Exception):
         self.args = arg
 
 
+def checkMixedExpParams( alpha, mu1, mu2 ):
+    """Check the mixed exponential parameters and raise a CreateDistError
+    if any are invalid.
+
+    Args:
+        alpha (float): mixing or proportionality coefficient
+        mu1 (float): mean for exponential one
+        mu2 (float): mean for exponential two
+
+    """
+    if not isinstance( alpha, (int, float)):
+        ErrorMsg = "Alpha must be an int or a float!!!"
+        raise CreateDistError( ErrorMsg )
+    if (alpha <= 0.0) or (alpha >= 1.0):
+        ErrorMsg = "Alpha weight must be between 0.0 and 1.0 for a mixed " \
+                   "distribution"
+        raise CreateDistError( ErrorMsg )
+    if not isinstance( mu1, (int, float)):
+        ErrorMsg = "Mean part 1 must be an int or a float!!!"
+        raise CreateDistError( ErrorMsg )
+    if ( mu1 <= 0.0 ) or (mu1 >= 500.0 ):
+        ErrorMsg = "Mean part 1 must be between 0.0 and 500.0 for a " \
+                   "mixed exponential distribution"
+        raise CreateDistError( ErrorMsg )
+    if not isinstance( mu2, (int, float)):
+        ErrorMsg = "Mean part 2 must be an int or a float!!!"
+        raise CreateDistError( ErrorMsg )
+    if ( mu2 <= 0.0 ) or (mu2 >= 500.0 ):
+        ErrorMsg = "Mean part 2 must be between 0.0 and 500.0 for a " \
+                   "mixed exponential distribution"
+        raise CreateDistError( ErrorMsg )
+
+def getMaxDepth( gridId, mon, SelOpt, cPeriod=1 ):
+    """Get the maximum truncation depth for a distribution. The maximum is
+    determined separately for data period distributions as compared to 
+    projection period distributions.
+
+    Args:
+        gridId (int): grid index for this distribution
+        mon (int): month index from 1-12
+        SelOpt (int): Option for selecting the trunctation 1 = PRISM, 2 = LOCA
+        cPeriod (int): projection period for distribution
+
+    Returns:
+        float: maximum truncation depth in mm
+
+    """
+    if ( SelOpt <= 1 ):
+        cRegionID = LOCA_GRID_MAP[gridId][mon]
+        cMaxDepth = MON_MAX_BY_REGION[mon][cRegionID-1]
+    elif ( SelOpt == 2 ):
+        cMaxDepth = MON_MAX_BY_PP[cPeriod][(mon - 1)]
+    elif ( SelOpt == 3 ):
+        cMaxDepth = MON_MAX_BY_PP_PRISM[cPeriod][(mon - 1)]
+    elif ( SelOpt == 4 ):
+        cMaxDepth = H0_MAX_BY_PP[cPeriod][(mon - 1)]
+    else:
+        cMaxDepth = H1_MAX_BY_PP[cPeriod][(mon - 1)]
+    # end if
+    return cMaxDepth
+
+def mixedExpPDF( x, alpha, mu1, mu2 ):
+    """Probability density for a mixed exponential distribution. X could 
+    also be a numpy array.
+
+    Args:
+        x (float or np.float): value to calculate the pdf for
+        alpha (float): mixing or proportionality coefficient
+        mu1 (float): mean for exponential one
+        mu2 (float): mean for exponential two
+
+    Returns:
+        fpd_x (float or np.float): probability density for x
+    """
+    fpd_x = ( ( ( alpha / mu1 ) * 
+                np.exp( ( ( -1.0 * x ) / mu1 ), dtype=np.float64 ) )
+                + ( ( ( 1.0 - alpha ) / mu2 ) * 
+                     np.exp( ( ( -1.0 * x ) / mu2 ), dtype=np.float64 ) ) )
+    # now return 
+    return fpd_x
+
+def calcCDFKnots( alpha, mu1, mu2, MaxDepth=ATLAS14_150YR_24HR_PRECIP ):
+    """Calculate the depths at the CDF_PROBS probability knots for a mixed 
+    exponential distribution truncated at MaxDepth.
+
+    Args:
+        alpha (float): mixing or proportionality coefficient
+        mu1 (float): mean for exponential one
+        mu2 (float): mean for exponential two
+
+    KWargs:
+        MaxDepth (float): maximum truncation depth for distribution
+
+    Returns:
+        np.array: NUM_CDF_KNOTS depths
+    """
+    AllXs = [ 1.0 * x for x in range(1, int(MaxDepth), 1) ]
+    AllXs.insert( 0, WD_THRESH )
+    AllXs.append( MaxDepth )
+    NumX = len( AllXs )
+    npAllXs = np.array( AllXs, dtype=np.float64 )
+    ExtendedPMF = np.zeros( NumX, dtype=np.float64 )
+    ExtendedPMF[1:] = mixedExpPDF( npAllXs[1:], alpha, mu1, mu2 )
+    cumPMFpre = np.cumsum( ExtendedPMF, dtype=np.float64 )
+    MaxPMF = cumPMFpre.max()
+    CutOffInd = np.argmax( cumPMFpre == MaxPMF )
+    truncPMF = cumPMFpre[:(CutOffInd + 1)]
+    scalePMF = truncPMF / MaxPMF
+    ValuePs = np.interp( CDF_PROBS, scalePMF, npAllXs[:(CutOffInd + 1)] )
+    return ValuePs
+
+def mixedExpSurvival( x, alpha, mu1, mu2 ):
+    """Survival function, 1 - CDF, of an untruncated mixed exponential.
+    All arguments may be broadcastable numpy arrays.
+
+    Args:
+        x (float or np.array): depth
+        alpha (float or np.array): mixing or proportionality coefficient
+        mu1 (float or np.array): mean for exponential one
+        mu2 (float or np.array): mean for exponential two
+
+    Returns:
+        float or np.array: probability of a depth greater than x
+    """
+    return ( ( alpha * np.exp( -x / mu1 ) ) + 
+             ( ( 1.0 - alpha ) * np.exp( -x / mu2 ) ) )
+
+def truncMixedExpCDF( x, alpha, mu1, mu2, Lower=WD_THRESH, 
+                      Upper=ATLAS14_150YR_24HR_PRECIP ):
+    """Analytic CDF of a mixed exponential truncated to [Lower, Upper]. 
+    All arguments may be broadcastable numpy arrays.
+
+    Args:
+        x (float or np.array): depth
+        alpha (float or np.array): mixing or proportionality coefficient
+        mu1 (float or np.array): mean for exponential one
+        mu2 (float or np.array): mean for exponential two
+
+    KWargs:
+        Lower (float or np.array): lower truncation depth
+        Upper (float or np.array): upper truncation depth
+
+    Returns:
+        float or np.array: probability of a depth less than or equal to x
+    """
+    SLower = mixedExpSurvival( Lower, alpha, mu1, mu2 )
+    SUpper = mixedExpSurvival( Upper, alpha, mu1, mu2 )
+    cX = np.clip( x, Lower, Upper )
+    return ( SLower - mixedExpSurvival( cX, alpha, mu1, mu2 ) ) / \
+           ( SLower - SUpper )
+
+def mixedExpQuantile( Unif, alpha, mu1, mu2, Lower=WD_THRESH, 
+                      Upper=ATLAS14_150YR_24HR_PRECIP ):
+    """Inverse of truncMixedExpCDF for arrays of probabilities. Uses 
+    Newton steps on the survival function, with a bisection step wherever
+    the Newton step leaves the bracket, for all values at once. All 
+    arguments may be broadcastable numpy arrays, for example one set of
+    parameters for each value.
+
+    Args:
+        Unif (np.array): probabilities between 0.0 and 1.0
+        alpha (float or np.array): mixing or proportionality coefficient
+        mu1 (float or np.array): mean for exponential one
+        mu2 (float or np.array): mean for exponential two
+
+    KWargs:
+        Lower (float or np.array): lower truncation depth
+        Upper (float or np.array): upper truncation depth
+
+    Returns:
+        np.array: float64 depths with the broadcast shape
+    """
+    # start
+    Unif, alpha, mu1, mu2, Lower, Upper = np.broadcast_arrays( 
+                    np.asarray( Unif, dtype=np.float64 ), alpha, mu1, mu2, 
+                    Lower, Upper )
+    OutShape = Unif.shape
+    Unif = np.clip( Unif.ravel(), 0.0, 1.0 )
+    alpha = np.asarray( alpha, dtype=np.float64 ).ravel()
+    mu1 = np.asarray( mu1, dtype=np.float64 ).ravel()
+    mu2 = np.asarray( mu2, dtype=np.float64 ).ravel()
+    Lower = np.asarray( Lower, dtype=np.float64 ).ravel()
+    Upper = np.asarray( Upper, dtype=np.float64 ).ravel()
+    SLower = mixedExpSurvival( Lower, alpha, mu1, mu2 )
+    SUpper = mixedExpSurvival( Upper, alpha, mu1, mu2 )
+    # the depth with survival STarget is the quantile. Newton steps on the
+    # log of the survival, which is close to linear in depth.
+    LogTarget = np.log( SLower - ( Unif * ( SLower - SUpper ) ) )
+    BLow = Lower.copy()
+    BHigh = Upper.copy()
+    # start from the quantile of one exponential with the mixture mean
+    MeanD = ( alpha * mu1 ) + ( ( 1.0 - alpha ) * mu2 )
+    XVal = np.clip( Lower - MeanD * ( LogTarget - np.log( SLower ) ), 
+                    BLow, BHigh )
+    # only iterate on values that have not converged
+    Active = np.flatnonzero( ( Unif > 0.0 ) & ( Unif < 1.0 ) )
+    for _ in range( QUANTILE_MAX_ITER ):
+        if len( Active ) == 0:
+            break
+        cX = XVal[Active]
+        cA = alpha[Active]
+        cM1 = mu1[Active]
+        cM2 = mu2[Active]
+        cSurv = mixedExpSurvival( cX, cA, cM1, cM2 )
+        Resid = np.log( cSurv ) - LogTarget[Active]
+        # survival decreases with depth, so a positive residual is too shallow
+        cLow = np.where( Resid > 0.0, cX, BLow[Active] )
+        cHigh = np.where( Resid > 0.0, BHigh[Active], cX )
+        BLow[Active] = cLow
+        BHigh[Active] = cHigh
+        XNew = cX + ( Resid * cSurv / mixedExpPDF( cX, cA, cM1, cM2 ) )
+        OutMask = ~( ( XNew >= cLow ) & ( XNew <= cHigh ) )
+        XNew[OutMask] = 0.5 * ( cLow[OutMask] + cHigh[OutMask] )
+        XVal[Active] = XNew
+        Active = Active[ np.abs( XNew - cX ) > QUANTILE_TOL ]
+    # end for
+    XVal[Unif <= 0.0] = Lower[Unif <= 0.0]
+    XVal[Unif >= 1.0] = Upper[Unif >= 1.0]
+    return XVal.reshape( OutShape )
+
+
 class MixedExp(object):
     """Mixed exponential distribution object for use in the Weather 
     Generator"""
@@ -85,29 +315,9 @@ class MixedExp(object):
         """
         super().__init__()
         # do some checks and assign our properties
-        if not isinstance( alpha, (int, float)):
-            ErrorMsg = "Alpha must be an int or a float!!!"
-            raise CreateDistError( ErrorMsg )
-        if (alpha <= 0.0) or (alpha >= 1.0):
-            ErrorMsg = "Alpha weight must be between 0.0 and 1.0 for a mixed " \
-                       "distribution"
-            raise CreateDistError( ErrorMsg )
+        checkMixedExpParams( alpha, mu1, mu2 )
         self.alpha = float( alpha )
-        if not isinstance( mu1, (int, float)):
-            ErrorMsg = "Mean part 1 must be an int or a float!!!"
-            raise CreateDistError( ErrorMsg )
-        if ( mu1 <= 0.0 ) or (mu1 >= 500.0 ):
-            ErrorMsg = "Mean part 1 must be between 0.0 and 500.0 for a " \
-                       "mixed exponential distribution"
-            raise CreateDistError( ErrorMsg )
         self.mu1 = float( mu1 )
-        if not isinstance( mu2, (int, float)):
-            ErrorMsg = "Mean part 2 must be an int or a float!!!"
-            raise CreateDistError( ErrorMsg )
-        if ( mu2 <= 0.0 ) or (mu2 >= 500.0 ):
-            ErrorMsg = "Mean part 2 must be between 0.0 and 500.0 for a " \
-                       "mixed exponential distribution"
-            raise CreateDistError( ErrorMsg )
         self.mu2 = float( mu2 )
         # now assign the name
         self.name = str( name )
@@ -115,18 +325,7 @@ class MixedExp(object):
         self._stats()
         # now create the CDF to use in calculations. We need to find our 
         # max for truncation purposes
-        if ( SelOpt <= 1 ):
-            cRegionID = LOCA_GRID_MAP[gridId][mon]
-            cMaxDepth = MON_MAX_BY_REGION[mon][cRegionID-1]
-        elif ( SelOpt == 2 ):
-            cMaxDepth = MON_MAX_BY_PP[cPeriod][(mon - 1)]
-        elif ( SelOpt == 3 ):
-            cMaxDepth = MON_MAX_BY_PP_PRISM[cPeriod][(mon - 1)]
-        elif ( SelOpt == 4 ):
-            cMaxDepth = H0_MAX_BY_PP[cPeriod][(mon - 1)]
-        else:
-            cMaxDepth = H1_MAX_BY_PP[cPeriod][(mon - 1)]
-        # end if
+        cMaxDepth = getMaxDepth( gridId, mon, SelOpt, cPeriod )
         self.calcCDF( MaxDepth=cMaxDepth )
     
     def _stats(self, ):
@@ -152,10 +351,7 @@ class MixedExp(object):
         Returns:
             fpd_x (float or np.float): probability density for x
         """
-        fpd_x = ( ( ( self.alpha / self.mu1 ) * 
-                    np.exp( ( ( -1.0 * x ) / self.mu1 ), dtype=np.float64 ) )
-                    + ( ( ( 1.0 - self.alpha ) / self.mu2 ) * 
-                         np.exp( ( ( -1.0 * x ) / self.mu2 ), dtype=np.float64 ) ) )
+        fpd_x = mixedExpPDF( x, self.alpha, self.mu1, self.mu2 )
         # now return 
         return fpd_x
     
@@ -166,25 +362,11 @@ class MixedExp(object):
         KWargs:
             MaxDepth (float): maximum truncation depth for distribution
         """
-        AllXs = [ 1.0 * x for x in range(1, int(MaxDepth), 1) ]
-        AllXs.insert( 0, WD_THRESH )
-        AllXs.append( MaxDepth )
-        NumX = len( AllXs )
-        npAllXs = np.array( AllXs, dtype=np.float64 )
-        ExtendedPMF = np.zeros( NumX, dtype=np.float64 )
-        ExtendedPMF[1:] = self._pdf( npAllXs[1:] )
-        InterPs = np.array( [round(0.01 * x, 2) for x in range(101)],
-                            dtype=np.float64 )
-        cumPMFpre = np.cumsum( ExtendedPMF, dtype=np.float64 )
-        MaxPMF = cumPMFpre.max()
-        CutOffInd = np.argmax( cumPMFpre == MaxPMF )
-        truncPMF = cumPMFpre[:(CutOffInd + 1)]
-        scalePMF = truncPMF / MaxPMF
-        TotInds = len( InterPs )
-        ValuePs = np.interp( InterPs, scalePMF, npAllXs[:(CutOffInd + 1)] )
-        self.cdf = np.zeros( (2, TotInds), dtype=np.float64 )
+        self.maxDepth = float( MaxDepth )
+        ValuePs = calcCDFKnots( self.alpha, self.mu1, self.mu2, MaxDepth )
+        self.cdf = np.zeros( (2, NUM_CDF_KNOTS), dtype=np.float64 )
         self.cdf[0,:] = ValuePs
-        self.cdf[1,:] = InterPs
+        self.cdf[1,:] = CDF_PROBS
     
     def ranval1( self, val ):
         """With the specified val between 0.0 and 1.0, which is essentially
@@ -214,6 +396,22 @@ class MixedExp(object):
         pdep = np.interp( arr, self.cdf[1,:], self.cdf[0,:] )
         return pdep
 
+    def quantileArray( self, arr ):
+        """With the specified array of values between 0.0 and 1.0, return 
+        the corresponding depths from the analytic truncated CDF rather 
+        than the interpolated knots, see mixedExpQuantile.
+        
+        Args:
+            arr (np.array): floats between [0.0 and 1.0]
+            
+        Returns:
+            pdep (np.array): the corresponding depth from the distribution
+            
+        """
+        pdep = mixedExpQuantile( arr, self.alpha, self.mu1, self.mu2,
+                                 Upper=self.maxDepth )
+        return pdep
+
 
 class PrecipSampler(object):
     """A precipitation depth probability sampler. 
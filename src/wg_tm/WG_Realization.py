@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_Realization
+   :platform: Windows, Linux
+   :synopsis: Reentrant, context based simulation of one realization
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+All state for one realization is held in a RealizationContext object that
+is passed explicitly to each function. Nothing in this module reads or
+changes module level state in WG_Dists_Samples, WG_OtherWeather, or
+WG_HighRealResults, so one process can run several realizations at the
+same time, in threads or interleaved, without setAllBegin and cleanAllEnd
+resets. The read-only calendar, samples, and temperature arrays are in 
+the shared run set-up, see WG_BlockEngine.getRunSetup.
+
+Results are identical to the module global version of the day-by-day loop.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+import numpy as np
+# project imports
+import WG_Inputs as WGI
+import WG_Dists_Samples as WGDS
+import WG_OtherWeather as WGOW
+import WG_HighRealResults as WGHRR
+import WG_Seeds as WGSD
+import WG_SpellLength as WGSL
+
+
+class RealizationContext(object):
+    """Everything that changes during one realization. Read-only inputs
+    are referenced, not copied.
+    """
+    __slots__ = ( "RealNum", "NumDays", "PUnif", "H0WetSpell",
+                  "H0DrySpell", "H1WetSpell", "H1DrySpell", "H0Init",
+                  "H1Init", "H0PDepth", "H1PDepth", "H0Wet", "H1Wet", "Eps",
+                  "Chi0", "Chi1", "H0Real", "H1Real" )
+
+    def __init__( self, RealNum, NumDays ):
+        """Initialization method
+
+        Args:
+            RealNum (int): realization number
+            NumDays (int): number of simulation days
+
+        """
+        self.RealNum = RealNum
+        self.NumDays = NumDays
+        # bulk samples, set by drawSamples
+        self.PUnif = None
+        self.H0WetSpell = None
+        self.H0DrySpell = None
+        self.H1WetSpell = None
+        self.H1DrySpell = None
+        self.H0Init = None
+        self.H1Init = None
+        self.H0PDepth = None
+        self.H1PDepth = None
+        self.Eps = None
+        # daily wet states and Chi series, set by simulateRealization
+        self.H0Wet = None
+        self.H1Wet = None
+        self.Chi0 = None
+        self.Chi1 = None
+        # results
+        TotNum = WGHRR.PRE_START_IND + WGI.NUM_LOCA_GRID
+        self.H0Real = np.zeros( (NumDays, TotNum), dtype=np.float32 )
+        self.H1Real = np.zeros( (NumDays, TotNum), dtype=np.float32 )
+
+
+def drawSamples( Ctx, Samples, Streams ):
+    """Draw all spell, precipitation depth, and error samples for the
+    realization in bulk. These are read by day index in
+    simulateRealization.
+
+    Args:
+        Ctx (RealizationContext): realization context
+        Samples (WG_Dists_Samples.BulkSampleSetup): run level set-up
+        Streams (list): realization stream sources from
+                        WG_Seeds.realStreams
+
+    """
+    # start
+    Ctx.PUnif = WGDS.drawDepthUniforms( Streams[WGSD.PDEPTH_STREAM], 
+                                        Ctx.NumDays )
+    WetVals, WetInit = WGDS.drawSpellDays( Streams[WGSD.WET_SPELL_STREAM],
+                                    Samples.WetStreams,
+                                    [ Samples.H0WetIds, Samples.H1WetIds ],
+                                    [ Samples.H0WetInit, Samples.H1WetInit ] )
+    DryVals, DryInit = WGDS.drawSpellDays( Streams[WGSD.DRY_SPELL_STREAM],
+                                    Samples.DryStreams,
+                                    [ Samples.H0DryIds, Samples.H1DryIds ],
+                                    [ Samples.H0DryInit, Samples.H1DryInit ] )
+    Ctx.H0WetSpell, Ctx.H1WetSpell = WetVals
+    Ctx.H0DrySpell, Ctx.H1DrySpell = DryVals
+    Ctx.H0Init = ( WetInit[0], DryInit[0] )
+    Ctx.H1Init = ( WetInit[1], DryInit[1] )
+    Ctx.H0PDepth = WGDS.sampleDepthDays( Samples.Tables, Samples.H0DepRowA,
+                                         Samples.MonthA, Ctx.PUnif[1:] )
+    Ctx.H1PDepth = WGDS.sampleDepthDays( Samples.Tables, Samples.H1DepRowA,
+                                         Samples.MonthA, Ctx.PUnif[1:] )
+    Ctx.Eps = WGOW.drawEpsilons( Streams[WGSD.STD_NORM_STREAM], Ctx.NumDays )
+    # end
+    return
+
+def simulateRealization( Ctx, Setup ):
+    """Simulation of one realization without a day loop. drawSamples must 
+    be called first. The wet and dry states come from the spell sequences,
+    see WG_SpellLength.spellStates, the Chi series from 
+    WG_OtherWeather.calcChiSeries, and the temperatures for all days from
+    WG_OtherWeather.calcTempSeries. Results are in Ctx.H0Real and 
+    Ctx.H1Real.
+
+    Args:
+        Ctx (RealizationContext): realization context
+        Setup (WG_BlockEngine.BlockSetup): run level calendar, samples, and
+                                           temperature arrays
+
+    """
+    # start
+    PreInd = WGHRR.PRE_START_IND
+    # now get the starting state and the daily states
+    InitWet = Ctx.PUnif[0] > 0.5
+    if InitWet:
+        h0remdur = Ctx.H0Init[0]
+        h1remdur = Ctx.H1Init[0]
+    else:
+        h0remdur = Ctx.H0Init[1]
+        h1remdur = Ctx.H1Init[1]
+    Ctx.H0Wet = WGSL.spellStates( InitWet, h0remdur, Ctx.H0WetSpell, 
+                                  Ctx.H0DrySpell )
+    Ctx.H1Wet = WGSL.spellStates( InitWet, h1remdur, Ctx.H1WetSpell, 
+                                  Ctx.H1DrySpell )
+    # dry days keep the zero depth
+    Ctx.H0Real[Ctx.H0Wet, PreInd:] = Ctx.H0PDepth[Ctx.H0Wet]
+    Ctx.H1Real[Ctx.H1Wet, PreInd:] = Ctx.H1PDepth[Ctx.H1Wet]
+    # the Chi series for the realization, period matrices by day index
+    Ctx.Chi0, Ctx.Chi1 = WGOW.calcChiSeries( Setup.AStack, Setup.BStack, 
+                                Setup.H0MatA, Setup.H1MatA, Ctx.Eps[1:] )
+    # temperatures for all days
+    for tReal, tChi, tWet, tPre in [ ( Ctx.H0Real, Ctx.Chi0, Ctx.H0Wet, "H0" ),
+                                     ( Ctx.H1Real, Ctx.Chi1, Ctx.H1Wet, "H1" ) ]:
+        tReal[:, WGHRR.TMAX_IND] = WGOW.calcTempSeries( tChi[:, 0], tWet,
+                                        getattr( Setup, tPre + "TmaxAve" ), 
+                                        getattr( Setup, tPre + "TmaxStd" ),
+                                        Setup.TmaxFallback )
+        tReal[:, WGHRR.TMIN_IND] = WGOW.calcTempSeries( tChi[:, 1], tWet,
+                                        getattr( Setup, tPre + "TminAve" ), 
+                                        getattr( Setup, tPre + "TminStd" ),
+                                        Setup.TminFallback )
+    # end of pathway for
+    return
+
+
+#EOF
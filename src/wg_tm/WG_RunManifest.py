@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_RunManifest
+   :platform: Windows, Linux
+   :synopsis: Run manifest for checkpoint, resume, and retry of realizations
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+The manifest is a JSON lines file in the output directory. The first line
+describes the run: base seeds, seeding mode, output format, and a hash of
+the inputs. Each following line records one realization, its stream seeds,
+and whether its outputs were written ("done") or failed ("failed").
+
+Worker processes append a line after the outputs of a realization are
+written, including from the WG_AsyncWriter thread, so a realization is
+only "done" once all of its files are complete. Appends are made while 
+holding an operating system lock on the manifest lock file, see
+WG_WorkQueue.FileLock, because append mode is not atomic across the nodes
+of a multi-node run on NFS or SMB.
+
+With resume, a realization is complete when its last line is "done" and
+its outputs are present. The run is only resumed when the input hash and
+seeds match the manifest header.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+import os
+import json
+import time
+import hashlib
+# project imports
+import WG_Inputs as WGI
+import WG_DistTables as WGDT
+import WG_OtherWeather as WGOW
+import WG_OutputStore as WGOS
+import WG_Seeds as WGSD
+import WG_WorkQueue as WGWQ
+
+# parameters
+MANIFEST_SUFFIX = "_manifest.jsonl"
+"""Manifest file name suffix; the file name is OUT_LABEL + MANIFEST_SUFFIX"""
+CATALOG_SUFFIX = "_catalog.json"
+"""Output catalog file name suffix; the file name is OUT_LABEL + CATALOG_SUFFIX"""
+LOCK_EXT = ".lock"
+"""Lock file extension; the lock file is the manifest path + LOCK_EXT"""
+MANIFEST_VERSION = 1
+"""Version of the manifest layout"""
+STATUS_DONE = "done"
+"""Realization status when all outputs were written"""
+STATUS_FAILED = "failed"
+"""Realization status when the simulation or the output failed"""
+OUTPUT_PREFIXES = WGOS.GROUP_NAMES
+"""File name prefixes, and store group names, for the outputs of one
+realization"""
+# globals
+MANIFEST_PATH = None
+"""Manifest file for this process; None when not recording"""
+RUN_INFO = None
+"""Run description from runInfo for this process"""
+
+
+def manifestPath( OutDir=None ):
+    """Manifest file for the current WG_Inputs output settings
+
+    KWargs:
+        OutDir (str): output directory; defaults to WG_Inputs.OUT_DIR and
+                      WG_Inputs.OUT_SUB_DIR
+
+    Returns:
+        str: manifest file path
+    """
+    if OutDir is None:
+        OutDir = os.path.join( WGI.OUT_DIR, WGI.OUT_SUB_DIR )
+    return os.path.normpath( os.path.join( OutDir, "%s%s" %
+                                           ( WGI.OUT_LABEL, MANIFEST_SUFFIX ) ) )
+
+def inputHash():
+    """Content hash of the run inputs: the distribution table parameters,
+    the simulation dates and periods, the depth sampler, and the 
+    temperature input arrays.
+
+    Returns:
+        str: hexadecimal SHA-256 digest
+    """
+    # start
+    cHash = hashlib.sha256()
+    cHash.update( WGDT.tablesHash().encode( "utf-8" ) )
+    DateDict = { "start" : WGI.START_DATE, "end" : WGI.END_DATE,
+                 "data_periods" : WGI.DATA_PERIODS,
+                 "proj_periods" : WGI.PROJ_PERIODS, 
+                 "depth_sampler" : WGI.DEPTH_SAMPLER, }
+    cHash.update( json.dumps( DateDict, sort_keys=True,
+                              default=repr ).encode( "utf-8" ) )
+    Inputs = WGOW.getInputArrays()
+    for tName in WGOW.INPUT_ARRAY_NAMES:
+        cHash.update( tName.encode( "utf-8" ) )
+        cHash.update( Inputs[tName].tobytes() )
+    # end for
+    return cHash.hexdigest()
+
+def runInfo( SNSeed, PDSeed, WSLSeed, DSLSeed, SeedMode ):
+    """Run description for the manifest header
+
+    Args:
+        SNSeed (int): base seed for the standard normal sampler
+        PDSeed (int): the precipitation depth sampler seed
+        WSLSeed (int): wet state spell length sampling seed
+        DSLSeed (int): dry state spell length sampling seed
+        SeedMode (str): seeding mode, see WG_Seeds
+
+    Returns:
+        dict: run description
+    """
+    return { "type" : "run",
+             "version" : MANIFEST_VERSION,
+             "seeds" : [ int( SNSeed ), int( PDSeed ), int( WSLSeed ),
+                         int( DSLSeed ) ],
+             "seed_mode" : SeedMode,
+             "out_format" : WGI.OUT_FORMAT,
+             "input_hash" : inputHash(), }
+
+def openManifest( FilePath, RunDict ):
+    """Record realizations in FilePath from this process
+
+    Args:
+        FilePath (str): manifest file path
+        RunDict (dict): run description from runInfo
+
+    """
+    # globals
+    global MANIFEST_PATH, RUN_INFO
+    # start
+    MANIFEST_PATH = FilePath
+    RUN_INFO = RunDict
+    # end
+    return
+
+def newManifest( FilePath, RunDict ):
+    """Start a new manifest with the run header, replacing an existing one,
+    and record realizations from this process.
+
+    Args:
+        FilePath (str): manifest file path
+        RunDict (dict): run description from runInfo
+
+    """
+    os.makedirs( os.path.dirname( FilePath ), exist_ok=True )
+    with WGWQ.FileLock( FilePath + LOCK_EXT ):
+        with open( FilePath, 'w' ) as OF:
+            OF.write( json.dumps( RunDict ) + "\n" )
+        # end with
+    # end with
+    openManifest( FilePath, RunDict )
+
+def _appendLine( LineDict ):
+    """Append one line to the manifest under the manifest lock. The file
+    is closed, and so flushed to the server, before the lock is released."""
+    with WGWQ.FileLock( MANIFEST_PATH + LOCK_EXT ):
+        with open( MANIFEST_PATH, 'a' ) as OF:
+            OF.write( json.dumps( LineDict ) + "\n" )
+        # end with
+    # end with
+
+def recordRealization( RealNum, Status ):
+    """Record the status of one realization. Does nothing when no manifest
+    is open in this process.
+
+    Args:
+        RealNum (int): realization number
+        Status (str): STATUS_DONE or STATUS_FAILED
+
+    """
+    # start
+    if MANIFEST_PATH is None:
+        return
+    Streams = WGSD.realStreams( RealNum, *RUN_INFO["seeds"],
+                                SeedMode=RUN_INFO["seed_mode"] )
+    StreamSeeds = list()
+    for cStream in Streams:
+        if cStream.Mode == WGSD.SEED_MODE_LEGACY:
+            StreamSeeds.append( int( cStream.Seed ) )
+        else:
+            StreamSeeds.append( list( cStream.Seed.spawn_key ) )
+    # end for
+    _appendLine( { "real" : int( RealNum ), "status" : Status,
+                   "stream_seeds" : StreamSeeds, "pid" : os.getpid(),
+                   "time" : time.time() } )
+    # end
+    return
+
+def readManifest( FilePath ):
+    """Read a manifest
+
+    Args:
+        FilePath (str): manifest file path
+
+    Returns:
+        tuple: ( run description dict, dict of last status by realization )
+    """
+    # start
+    RunDict = None
+    StatusDict = dict()
+    with WGWQ.FileLock( FilePath + LOCK_EXT ):
+        with open( FilePath, 'r' ) as IF:
+            AllLines = IF.readlines()
+        # end with
+    # end with
+    for cLine in AllLines:
+        cLine = cLine.strip()
+        if len( cLine ) == 0:
+            continue
+        try:
+            LineDict = json.loads( cLine )
+        except ValueError:
+            # a line cut off by a crash
+            continue
+        if LineDict.get( "type" ) == "run":
+            RunDict = LineDict
+        else:
+            StatusDict[int( LineDict["real"] )] = LineDict["status"]
+    # end for
+    return RunDict, StatusDict
+
+def outputsPresent( RealNums ):
+    """Check that all outputs of each realization are present in the
+    current output format. Store outputs are checked with the store
+    catalog; files must exist and not be empty.
+
+    Args:
+        RealNums (list): realization numbers
+
+    Returns:
+        set: realization numbers with all outputs present
+    """
+    # start
+    GoodSet = set()
+    if WGI.OUT_FORMAT == WGOS.OUT_FORMAT_STORE:
+        if not os.path.isdir( WGOS.storeDir() ):
+            return GoodSet
+        cStore = WGOS.OutputStore()
+        for RealNum in RealNums:
+            if all( [ RealNum in cStore.Catalog.get( x, dict() )
+                      for x in OUTPUT_PREFIXES ] ):
+                GoodSet.add( RealNum )
+        # end for
+        return GoodSet
+    # end if
+    if WGI.OUT_FORMAT == WGOS.OUT_FORMAT_NPY:
+        ExtList = [ WGOS.NPY_EXT, WGOS.HEADER_EXT ]
+    else:
+        ExtList = [ WGOS.PICKLE_EXT ]
+    for RealNum in RealNums:
+        AllGood = True
+        for tPre in OUTPUT_PREFIXES:
+            BasePath = os.path.normpath( os.path.join( WGI.OUT_DIR,
+                            WGI.OUT_SUB_DIR, "%s_%s_R%d_DF" %
+                            ( tPre, WGI.OUT_LABEL, RealNum ) ) )
+            for tExt in ExtList:
+                cPath = BasePath + tExt
+                if ( not os.path.isfile( cPath ) ) or \
+                        ( os.path.getsize( cPath ) == 0 ):
+                    AllGood = False
+            # end for
+        # end for
+        if AllGood:
+            GoodSet.add( RealNum )
+    # end for
+    return GoodSet
+
+def catalogPath( OutDir=None ):
+    """Output catalog file for the current WG_Inputs output settings
+
+    KWargs:
+        OutDir (str): output directory; defaults to WG_Inputs.OUT_DIR and
+                      WG_Inputs.OUT_SUB_DIR
+
+    Returns:
+        str: output catalog file path
+    """
+    if OutDir is None:
+        OutDir = os.path.join( WGI.OUT_DIR, WGI.OUT_SUB_DIR )
+    return os.path.normpath( os.path.join( OutDir, "%s%s" %
+                                           ( WGI.OUT_LABEL, CATALOG_SUFFIX ) ) )
+
+def writeCatalog( FilePath, RealNums ):
+    """Write one catalog of the outputs of the realizations that are 
+    present, whichever process or node wrote them. Store outputs are 
+    listed as [ shard file, row ] and file outputs by file name, relative 
+    to the output directory.
+
+    Args:
+        FilePath (str): output catalog file path
+        RealNums (list): realization numbers
+
+    Returns:
+        dict: the catalog
+    """
+    # start
+    RealDict = dict()
+    if WGI.OUT_FORMAT == WGOS.OUT_FORMAT_STORE:
+        cStore = WGOS.OutputStore()
+        ShardNames = [ os.path.basename( x ) for x in cStore.Shards ]
+        for RealNum in sorted( outputsPresent( RealNums ) ):
+            RealDict[str( RealNum )] = { x : [ ShardNames[cStore.Catalog[x][RealNum][0]],
+                                               cStore.Catalog[x][RealNum][1] ] 
+                                         for x in OUTPUT_PREFIXES }
+        # end for
+        Location = os.path.basename( WGOS.storeDir() )
+    else:
+        if WGI.OUT_FORMAT == WGOS.OUT_FORMAT_NPY:
+            cExt = WGOS.NPY_EXT
+        else:
+            cExt = WGOS.PICKLE_EXT
+        for RealNum in sorted( outputsPresent( RealNums ) ):
+            RealDict[str( RealNum )] = { x : "%s_%s_R%d_DF%s" % ( x, 
+                                         WGI.OUT_LABEL, RealNum, cExt ) 
+                                         for x in OUTPUT_PREFIXES }
+        # end for
+        Location = "."
+    # end if
+    CatDict = { "out_label" : WGI.OUT_LABEL, "out_format" : WGI.OUT_FORMAT,
+                "location" : Location, "num_real" : len( RealDict ),
+                "missing" : sorted( set( RealNums ) - 
+                                    set( [ int( x ) for x in RealDict ] ) ),
+                "realizations" : RealDict, }
+    with open( FilePath, 'w' ) as OF:
+        json.dump( CatDict, OF, indent=1 )
+    # end with
+    return CatDict
+
+def completedRealizations( FilePath, RealNums ):
+    """Realizations from RealNums that are done in the manifest and have
+    all outputs present
+
+    Args:
+        FilePath (str): manifest file path
+        RealNums (list): realization numbers of interest
+
+    Returns:
+        set: completed realization numbers
+    """
+    RunDict, StatusDict = readManifest( FilePath )
+    DoneList = [ x for x in RealNums if StatusDict.get( x ) == STATUS_DONE ]
+    return outputsPresent( DoneList )
+
+def resumeManifest( FilePath, RunDict ):
+    """Check that an existing manifest is for the same run and record
+    realizations from this process.
+
+    Args:
+        FilePath (str): manifest file path
+        RunDict (dict): run description from runInfo for this run
+
+    """
+    # start
+    if not os.path.isfile( FilePath ):
+        newManifest( FilePath, RunDict )
+        return
+    OldRun, StatusDict = readManifest( FilePath )
+    if OldRun is None:
+        ErrorMsg = "Manifest %s has no run header!!!" % FilePath
+        raise ValueError( ErrorMsg )
+    for tKey in [ "seeds", "seed_mode", "out_format", "input_hash" ]:
+        if OldRun.get( tKey ) != RunDict[tKey]:
+            ErrorMsg = "Cannot resume. The %s of this run does not match " \
+                       "manifest %s!!!" % ( tKey, FilePath )
+            raise ValueError( ErrorMsg )
+    # end for
+    openManifest( FilePath, RunDict )
+    # end
+    return
+
+
+#EOF
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_Scheduler
+   :platform: Windows, Linux
+   :synopsis: Dynamic task chunking, progress reporting, and run statistics
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+Realizations are handed to the pool as tasks from guidedChunks. Tasks
+start at up to MaxChunk realizations and get smaller as the remaining
+work shrinks, down to one realization, so that the last tasks are short
+and no worker is left with a long chunk while the others sit idle. Tasks
+are collected with imap_unordered so that a slow task does not hold up
+the results of the others.
+
+Each task returns one timing record per realization. RunProgress prints
+realizations per second and the ETA as records arrive, and
+writeRunStats writes the timings, by worker process, to a JSON file in
+the output directory.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+# imports
+import os
+import json
+import math
+import time
+import numpy as np
+# project imports
+import WG_Inputs as WGI
+
+# parameters
+SCHED_FACTOR = 2
+"""Task size is the remaining realizations divided by SCHED_FACTOR times
+the number of workers"""
+PROGRESS_INTERVAL = 10.0
+"""Seconds between progress reports"""
+STATS_SUFFIX = "_runstats.json"
+"""Run statistics file name suffix; the file name is OUT_LABEL + STATS_SUFFIX"""
+HIST_BINS = 20
+"""Number of bins for the realization time histograms"""
+
+
+def guidedChunks( RealNums, NumProc, MaxChunk ):
+    """Split realizations into tasks of decreasing size
+
+    Args:
+        RealNums (list): realization numbers
+        NumProc (int): number of worker processes
+        MaxChunk (int): maximum realizations in a task
+
+    Returns:
+        list: list of realization number lists, one per task
+    """
+    # start
+    Tasks = list()
+    NumReal = len( RealNums )
+    cStart = 0
+    while cStart < NumReal:
+        Remain = NumReal - cStart
+        cSize = int( math.ceil( Remain / float( SCHED_FACTOR * max( 1, NumProc ) ) ) )
+        cSize = max( 1, min( MaxChunk, cSize ) )
+        Tasks.append( list( RealNums[cStart:cStart + cSize] ) )
+        cStart += cSize
+    # end while
+    return Tasks
+
+def timeRecord( RealNum, RetCode, Seconds ):
+    """Timing record for one realization
+
+    Args:
+        RealNum (int): realization number
+        RetCode (int): realization return code
+        Seconds (float): wall clock seconds for the realization
+
+    Returns:
+        tuple: ( RealNum, RetCode, Seconds, process id )
+    """
+    return ( int( RealNum ), int( RetCode ), float( Seconds ), os.getpid() )
+
+def formatSeconds( Seconds ):
+    """Seconds as H:MM:SS"""
+    Seconds = int( round( Seconds ) )
+    return "%d:%02d:%02d" % ( Seconds // 3600, ( Seconds % 3600 ) // 60,
+                              Seconds % 60 )
+
+
+class RunProgress(object):
+    """Live progress for a set of realizations"""
+
+    def __init__( self, Total, Interval=PROGRESS_INTERVAL ):
+        """Initialization method
+
+        Args:
+            Total (int): number of realizations to simulate
+
+        KWargs:
+            Interval (float): seconds between progress reports
+
+        """
+        self.Total = Total
+        self.Interval = Interval
+        self.Done = 0
+        self.Failed = 0
+        self.StartTime = time.time()
+        self.LastReport = self.StartTime
+
+    def rate( self ):
+        """Realizations per second so far"""
+        Elapsed = time.time() - self.StartTime
+        if Elapsed <= 0.0:
+            return 0.0
+        return self.Done / Elapsed
+
+    def update( self, Records ):
+        """Add the timing records from a completed task and report when
+        the interval has passed or all realizations are done.
+
+        Args:
+            Records (list): timing records from timeRecord
+
+        """
+        self.Done += len( Records )
+        self.Failed += sum( [ x[1] != 0 for x in Records ] )
+        cTime = time.time()
+        if ( ( cTime - self.LastReport ) >= self.Interval ) or \
+                ( self.Done >= self.Total ):
+            self.LastReport = cTime
+            self.report()
+        # end if
+        return
+
+    def report( self ):
+        """Print realizations per second and the ETA"""
+        cRate = self.rate()
+        if cRate > 0.0:
+            ETA = formatSeconds( ( self.Total - self.Done ) / cRate )
+        else:
+            ETA = "unknown"
+        print( "Completed %d of %d realizations (%d failed), %.3f "
+               "realizations/sec, ETA %s" % ( self.Done, self.Total,
+               self.Failed, cRate, ETA ), flush=True )
+
+
+def statsPath( OutDir=None, Tag=None ):
+    """Run statistics file for the current WG_Inputs output settings
+
+    KWargs:
+        OutDir (str): output directory; defaults to WG_Inputs.OUT_DIR and
+                      WG_Inputs.OUT_SUB_DIR
+        Tag (str): added to the file name, for example the worker id of a
+                   multi-node run
+
+    Returns:
+        str: run statistics file path
+    """
+    if OutDir is None:
+        OutDir = os.path.join( WGI.OUT_DIR, WGI.OUT_SUB_DIR )
+    if Tag is None:
+        FileName = "%s%s" % ( WGI.OUT_LABEL, STATS_SUFFIX )
+    else:
+        FileName = "%s_%s%s" % ( WGI.OUT_LABEL, Tag, STATS_SUFFIX )
+    return os.path.normpath( os.path.join( OutDir, FileName ) )
+
+def _timeSummary( Times, BinEdges ):
+    """Summary and histogram of realization times"""
+    Counts, _ = np.histogram( Times, bins=BinEdges )
+    return { "count" : int( len( Times ) ),
+             "total_sec" : float( np.sum( Times ) ),
+             "mean_sec" : float( np.mean( Times ) ),
+             "min_sec" : float( np.min( Times ) ),
+             "max_sec" : float( np.max( Times ) ),
+             "p50_sec" : float( np.percentile( Times, 50 ) ),
+             "p95_sec" : float( np.percentile( Times, 95 ) ),
+             "hist_counts" : Counts.tolist(), }
+
+def writeRunStats( FilePath, Records, WallSeconds, NumProc, RunDict=None ):
+    """Write the run statistics. Histograms for all workers use the same
+    bin edges so that they can be compared.
+
+    Args:
+        FilePath (str): run statistics file path
+        Records (list): timing records from timeRecord for the run
+        WallSeconds (float): wall clock seconds for the run
+        NumProc (int): number of worker processes
+
+    KWargs:
+        RunDict (dict): extra run description to include
+
+    Returns:
+        dict: the run statistics
+    """
+    # start
+    StatsDict = { "num_proc" : int( NumProc ),
+                  "wall_sec" : float( WallSeconds ),
+                  "num_records" : len( Records ),
+                  "num_failed" : int( sum( [ x[1] != 0 for x in Records ] ) ), }
+    if RunDict is not None:
+        StatsDict["run"] = RunDict
+    if len( Records ) == 0:
+        StatsDict["workers"] = dict()
+    else:
+        StatsDict["real_per_sec"] = len( Records ) / max( WallSeconds, 1.0e-9 )
+        AllTimes = np.array( [ x[2] for x in Records ], dtype=np.float64 )
+        BinEdges = np.histogram_bin_edges( AllTimes, bins=HIST_BINS )
+        StatsDict["hist_edges_sec"] = BinEdges.tolist()
+        StatsDict["all"] = _timeSummary( AllTimes, BinEdges )
+        WorkerDict = dict()
+        for cPid in sorted( set( [ x[3] for x in Records ] ) ):
+            cTimes = np.array( [ x[2] for x in Records if x[3] == cPid ],
+                               dtype=np.float64 )
+            WorkerDict[str( cPid )] = _timeSummary( cTimes, BinEdges )
+        # end for
+        StatsDict["workers"] = WorkerDict
+    # end if
+    os.makedirs( os.path.dirname( FilePath ), exist_ok=True )
+    with open( FilePath, 'w' ) as OF:
+        json.dump( StatsDict, OF, indent=1 )
+    # end with
+    return StatsDict
+
+
+#EOF
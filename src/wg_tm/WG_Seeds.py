@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_Seeds
+   :platform: Windows, Linux
+   :synopsis: Random stream set-up for each realization and random variable
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+Each realization uses four random variables: the standard normal error
+term, the precipitation depth probability, the wet spell length, and the
+dry spell length. A StreamSource provides the random generator for one
+(realization, variable) pair. Two seeding modes are available.
+
+SEED_MODE_LEGACY
+    The seed is the base seed for the variable plus 2 * RealNum, as in the
+    original code, and the generator is np.random.RandomState. Results are
+    identical to earlier versions. Streams of nearby realizations overlap
+    because the seeds of realization R for one variable and realization
+    R + 1 for another can be the same.
+
+SEED_MODE_SPAWN
+    The four base seeds are the entropy of a np.random.SeedSequence. The
+    realization sequence is the RealNum child of that root,
+    SeedSequence( entropy, spawn_key=( RealNum, ) ), which is what
+    root.spawn would give without having to spawn the earlier children.
+    The realization sequence is spawned into one child per variable and
+    the generator is np.random.Generator( np.random.PCG64 ). Streams are
+    statistically independent and any realization can be regenerated on
+    its own on any node.
+
+In both modes StreamSource.generator returns a new generator at the start
+of the stream every time it is called. Spell distributions with different
+parameters therefore use the same underlying random stream, as the legacy
+samplers did.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+import numpy as np
+
+# parameters
+SEED_MODE_LEGACY = "legacy"
+"""Seeding mode that reproduces the original RandomState results"""
+SEED_MODE_SPAWN = "spawn"
+"""Seeding mode with independent SeedSequence spawned PCG64 streams"""
+SEED_MODES = [ SEED_MODE_LEGACY, SEED_MODE_SPAWN ]
+"""Available seeding modes"""
+STD_NORM_STREAM = 0
+"""Stream index for the standard normal error term"""
+PDEPTH_STREAM = 1
+"""Stream index for the precipitation depth probability"""
+WET_SPELL_STREAM = 2
+"""Stream index for the wet spell length"""
+DRY_SPELL_STREAM = 3
+"""Stream index for the dry spell length"""
+NUM_STREAMS = 4
+"""Number of random variables, and so streams, per realization"""
+
+
+class StreamSource(object):
+    """Source of the random generator for one realization and variable"""
+    __slots__ = ( "Mode", "Seed" )
+
+    def __init__( self, Mode, Seed ):
+        """Initialization method
+
+        Args:
+            Mode (str): seeding mode, one of SEED_MODES
+            Seed (int or np.random.SeedSequence): int seed for
+                    SEED_MODE_LEGACY and a SeedSequence for SEED_MODE_SPAWN
+
+        """
+        self.Mode = Mode
+        self.Seed = Seed
+
+    def generator( self ):
+        """New generator positioned at the start of the stream
+
+        Returns:
+            np.random.RandomState or np.random.Generator
+
+        """
+        if self.Mode == SEED_MODE_LEGACY:
+            return np.random.RandomState( seed=self.Seed )
+        return np.random.Generator( np.random.PCG64( self.Seed ) )
+
+
+def checkSeedMode( SeedMode ):
+    """Raise a ValueError for an unknown seeding mode"""
+    if SeedMode not in SEED_MODES:
+        ErrorMsg = "Unknown seed mode %s!!!" % SeedMode
+        raise ValueError( ErrorMsg )
+
+def legacySeeds( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
+    """Legacy seeds for one realization from the base seeds.
+
+    Args:
+        RealNum (int): realization number
+        SNSeed (int): base seed for the standard normal sampler
+        PDSeed (int): the precipitation depth sampler seed
+        WSLSeed (int): wet state spell length sampling seed
+        DSLSeed (int): dry state spell length sampling seed
+
+    Returns:
+        tuple: seeds in stream index order
+
+    """
+    return ( int( SNSeed + int( 2 * RealNum ) ),
+             int( PDSeed + int( 2 * RealNum ) ),
+             int( WSLSeed + int( 2 * RealNum ) ),
+             int( DSLSeed + int( 2 * RealNum ) ) )
+
+def realStreams( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed,
+                 SeedMode=SEED_MODE_LEGACY ):
+    """Stream sources for one realization.
+
+    Args:
+        RealNum (int): realization number
+        SNSeed (int): base seed for the standard normal sampler
+        PDSeed (int): the precipitation depth sampler seed
+        WSLSeed (int): wet state spell length sampling seed
+        DSLSeed (int): dry state spell length sampling seed
+
+    KWargs:
+        SeedMode (str): seeding mode, one of SEED_MODES
+
+    Returns:
+        list: NUM_STREAMS StreamSource in stream index order
+
+    """
+    # start
+    checkSeedMode( SeedMode )
+    if SeedMode == SEED_MODE_LEGACY:
+        SeedList = legacySeeds( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed )
+    else:
+        RealSeq = np.random.SeedSequence(
+                        entropy=[ int( SNSeed ), int( PDSeed ),
+                                  int( WSLSeed ), int( DSLSeed ) ],
+                        spawn_key=( int( RealNum ), ) )
+        SeedList = RealSeq.spawn( NUM_STREAMS )
+    # end if
+    return [ StreamSource( SeedMode, x ) for x in SeedList ]
+
+
+#EOF
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_SharedInputs
+   :platform: Windows, Linux
+   :synopsis: Publish read-only generator inputs in shared memory for a process pool
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+The main process loads the read-only inputs once, packs them into a single
+multiprocessing.shared_memory block, and passes a small, picklable
+description of the block to the pool initializer. Each worker attaches to
+the block and uses zero-copy, read-only numpy views so that memory use
+does not grow with the number of workers.
+
+Published inputs are the arrays that workers use during simulation:
+
+* the smoothed temperature inputs and A, B, M0, and M1 matrices from
+  WG_OtherWeather.INPUT_ARRAYS
+* the spell and precipitation depth distribution tables from
+  WG_DistTables, which are derived from the WG_Inputs parameter
+  dictionaries (DATA_PDEPTH, PROJ_PDEPTH, LOCA_GRID_MAP, ...)
+* the per-day calendar and period indexes from WG_Calendar
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# imports
+from multiprocessing import shared_memory
+import numpy as np
+# project imports
+import WG_OtherWeather as WGOW
+import WG_DistTables as WGDT
+import WG_Calendar as WGCal
+import WG_BlockEngine as WGBE
+
+# parameters
+ARRAY_ALIGN = 64
+"""Byte alignment for each array in the shared block"""
+OW_PREFIX = "WGOW."
+"""Name prefix for WG_OtherWeather input arrays in the layout"""
+DT_PREFIX = "WGDT."
+"""Name prefix for WG_DistTables arrays in the layout"""
+CAL_PREFIX = "WGCal."
+"""Name prefix for WG_Calendar arrays in the layout"""
+# globals
+SHARED_BLOCK = None
+"""The shared memory block for this process. Kept so that the views stay
+valid; the main process also uses it to unlink at the end."""
+
+
+def collectInputs():
+    """Load the read-only inputs in this process and collect them by
+    layout name.
+
+    Returns:
+        dict: numpy arrays by layout name
+
+    """
+    # start
+    if WGOW.INPUT_ARRAYS is None:
+        WGOW.loadInputArrays()
+    Tables = WGDT.getRunTables()
+    InDict = dict()
+    for tName in WGOW.INPUT_ARRAY_NAMES:
+        InDict[OW_PREFIX + tName] = WGOW.INPUT_ARRAYS[tName]
+    for tName in WGDT.TABLE_ARRAY_NAMES:
+        InDict[DT_PREFIX + tName] = getattr( Tables, tName )
+    for tName, tArray in WGCal.getRunCalendar().arrays().items():
+        InDict[CAL_PREFIX + tName] = tArray
+    # end for
+    return InDict
+
+def publishInputs():
+    """Pack the read-only inputs into one shared memory block. Call in the
+    main process before creating the pool and pass the returned
+    specification to attachInputs in each worker. The main process also
+    switches to the shared views.
+
+    Returns:
+        tuple: ( block name, layout ) where layout is a list of
+        ( name, offset, shape, dtype str ) tuples
+
+    """
+    # globals
+    global SHARED_BLOCK
+    # start
+    InDict = collectInputs()
+    Layout = list()
+    cOffset = 0
+    for tName, tArray in InDict.items():
+        cOffset = int( np.ceil( cOffset / ARRAY_ALIGN ) * ARRAY_ALIGN )
+        Layout.append( ( tName, cOffset, tuple( tArray.shape ),
+                         tArray.dtype.str ) )
+        cOffset += tArray.nbytes
+    # end for
+    SHARED_BLOCK = shared_memory.SharedMemory( create=True,
+                                               size=max( cOffset, 1 ) )
+    for tName, tOff, tShape, tDType in Layout:
+        cView = np.ndarray( tShape, dtype=tDType, buffer=SHARED_BLOCK.buf,
+                            offset=tOff )
+        cView[...] = InDict[tName]
+    # end for
+    Spec = ( SHARED_BLOCK.name, Layout )
+    _setViews( Spec )
+    return Spec
+
+def attachInputs( Spec ):
+    """Attach to a shared block created by publishInputs and use read-only
+    views of it as the inputs for this process. Use from a pool worker
+    initializer.
+
+    Args:
+        Spec (tuple): specification returned by publishInputs
+
+    """
+    # globals
+    global SHARED_BLOCK
+    # start
+    SHARED_BLOCK = shared_memory.SharedMemory( name=Spec[0] )
+    _setViews( Spec )
+    # end
+    return
+
+def _setViews( Spec ):
+    """Create read-only views of SHARED_BLOCK and set them as the
+    WG_OtherWeather input arrays, the WG_DistTables run tables, and the
+    WG_Calendar run calendar"""
+    # start
+    OWDict = dict()
+    DTDict = dict()
+    CalDict = dict()
+    for tName, tOff, tShape, tDType in Spec[1]:
+        cView = np.ndarray( tShape, dtype=tDType, buffer=SHARED_BLOCK.buf,
+                            offset=tOff )
+        cView.flags.writeable = False
+        if tName.startswith( OW_PREFIX ):
+            OWDict[tName[len( OW_PREFIX ):]] = cView
+        elif tName.startswith( CAL_PREFIX ):
+            CalDict[tName[len( CAL_PREFIX ):]] = cView
+        else:
+            DTDict[tName[len( DT_PREFIX ):]] = cView
+    # end for
+    WGOW.INPUT_ARRAYS = OWDict
+    WGDT.RUN_TABLES = WGDT.DistTables( Arrays=DTDict )
+    WGCal.setRunCalendar( WGCal.RunCalendar( Arrays=CalDict ) )
+    # end
+    return
+
+def releaseInputs( Unlink=False ):
+    """Drop the views and close the shared block for this process.
+
+    KWargs:
+        Unlink (bool): also free the block; only the main process that
+                       called publishInputs should do this, after the pool
+                       has finished
+
+    """
+    # globals
+    global SHARED_BLOCK
+    # start
+    if SHARED_BLOCK is None:
+        return
+    WGBE.cleanRunSetup()
+    WGOW.cleanInputArrays()
+    WGDT.cleanRunTables()
+    WGCal.cleanRunCalendar()
+    try:
+        SHARED_BLOCK.close()
+    except BufferError:
+        # views are still referenced somewhere; the mapping is then 
+        # released when the process exits
+        pass
+    if Unlink:
+        SHARED_BLOCK.unlink()
+    SHARED_BLOCK = None
+    # end
+    return
+
+
+#EOF
@@ -7,6 +7,10 @@
 .. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
 
 Spell lengths are handled with negative binomial distributions
+
+spellStates generates the daily wet state for a realization spell by spell
+rather than with a day-by-day state machine. The alternating wet and dry
+spell sequence is built first and then expanded to days with np.repeat.
 """
 # Copyright and License
 """
@@ -36,6 +40,30 @@ import numpy as np
 from scipy import stats as scstats
 
 
+def checkNegBinomParams( N, P ):
+    """Check the negative binomial parameters and raise a CreateDistError
+    if either is invalid.
+
+    Args:
+        N (float): number of successes
+        P (float): probability of success
+
+    """
+    if not isinstance( N, float ):
+        ErrorMsg = "N must be a float!!!"
+        raise CreateDistError( ErrorMsg )
+    if not isinstance( P, float ):
+        ErrorMsg = "P must be a float!!!"
+        raise CreateDistError( ErrorMsg )
+    # check the ranges
+    if ( N <= 0.0 ) or ( N > 1000.0 ):
+        ErrorMsg = "N greater than 1000.0 or less than 0.0!!!"
+        raise CreateDistError( ErrorMsg )
+    if ( P <= 0.0 ) or ( P >= 10 ):
+        ErrorMsg = "P greater >= 1.0 or <= 0.0!!!"
+        raise CreateDistError( ErrorMsg )
+
+
 class NegBinomial(object):
     """Negative binomial distribution object for use in the Weather 
     Generator. Negative binomial distributions are used for spell lengths"""
@@ -44,19 +72,7 @@ class NegBinomial(object):
         """Override of default initialization method"""
         super().__init__()
         # do some checks and assign our properties
-        if not isinstance( N, float ):
-            ErrorMsg = "N must be a float!!!"
-            raise CreateDistError( ErrorMsg )
-        if not isinstance( P, float ):
-            ErrorMsg = "P must be a float!!!"
-            raise CreateDistError( ErrorMsg )
-        # check the ranges
-        if ( N <= 0.0 ) or ( N > 1000.0 ):
-            ErrorMsg = "N greater than 1000.0 or less than 0.0!!!"
-            raise CreateDistError( ErrorMsg )
-        if ( P <= 0.0 ) or ( P >= 10 ):
-            ErrorMsg = "P greater >= 1.0 or <= 0.0!!!"
-            raise CreateDistError( ErrorMsg )
+        checkNegBinomParams( N, P )
         self.name = name
         self.nbinom = scstats.nbinom( N, P )
     
@@ -134,4 +150,81 @@ class DryStateSampler(object):
         Will return a numpy array"""
         return self.ranstate.uniform(low=0.0, high=1.0, size=N)
 
+
+def spellSequence( InitWet, InitDur, WetDur, DryDur ):
+    """Generate the alternating wet and dry spell sequence for one 
+    realization.
+
+    WetDur and DryDur hold the spell length drawn on each day with the
+    month and period parameters of that day, so each spell uses the 
+    parameters of its start date. A spell that starts on day s with drawn
+    length L ends before day s + max(L, 1), which reproduces the state
+    toggling of the day-by-day loop. The starting spell ends before day 
+    InitDur.
+
+    Args:
+        InitWet (bool): starting state is wet
+        InitDur (int): starting spell length
+        WetDur (np.array): wet spell length by day
+        DryDur (np.array): dry spell length by day
+
+    Returns:
+        tuple: ( SpellWet, SpellLen ) bool wet flag and int length of each
+        spell. Lengths sum to the number of days; the starting spell can
+        have zero length.
+
+    """
+    # start
+    NumDays = len( WetDur )
+    DayInds = np.arange( NumDays, dtype=np.int64 )
+    NextWet = ( DayInds + np.maximum( WetDur, 1 ) ).tolist()
+    NextDry = ( DayInds + np.maximum( DryDur, 1 ) ).tolist()
+    cWet = bool( InitWet )
+    SpellWet = [ cWet ]
+    SpellStart = [ 0 ]
+    cDay = max( int( InitDur ), 0 )
+    while cDay < NumDays:
+        cWet = not cWet
+        SpellWet.append( cWet )
+        SpellStart.append( cDay )
+        if cWet:
+            cDay = NextWet[cDay]
+        else:
+            cDay = NextDry[cDay]
+    # end while
+    SpellStart.append( NumDays )
+    SpellLen = np.diff( np.array( SpellStart, dtype=np.int64 ) )
+    return ( np.array( SpellWet, dtype=bool ), SpellLen )
+
+def spellStates( InitWet, InitDur, WetDur, DryDur ):
+    """Daily wet state from the spell sequence, see spellSequence, for one
+    realization or for a block of realizations one row at a time.
+
+    Args:
+        InitWet (bool or np.array): starting state is wet, shape (R,) for
+                                    a block
+        InitDur (int or np.array): starting spell length, shape (R,) for
+                                   a block
+        WetDur (np.array): wet spell length by day, shape (days,) or 
+                           (R, days)
+        DryDur (np.array): dry spell length by day, shape (days,) or 
+                           (R, days)
+
+    Returns:
+        np.array: bool wet state by day, same shape as WetDur
+
+    """
+    if WetDur.ndim == 1:
+        SpellWet, SpellLen = spellSequence( InitWet, InitDur, WetDur, DryDur )
+        return np.repeat( SpellWet, SpellLen )
+    # block of realizations
+    WetState = np.zeros( WetDur.shape, dtype=bool )
+    for iI in range( WetDur.shape[0] ):
+        SpellWet, SpellLen = spellSequence( InitWet[iI], InitDur[iI], 
+                                            WetDur[iI], DryDur[iI] )
+        WetState[iI, :] = np.repeat( SpellWet, SpellLen )
+    # end for
+    return WetState
+
+
 #EOF
\ No newline at end of file
@@ -0,0 +1,564 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: WG_WorkQueue
+   :platform: Windows, Linux
+   :synopsis: File lock work queue to spread realization ranges over nodes
+
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
+
+A coordinator splits the realizations into ranges and writes the queue
+state to QUEUE_FILE in a queue directory on a file system shared by all
+nodes. Workers on any node claim one range at a time, simulate it, and
+mark it done. All changes to the state are made while holding an 
+operating system lock on LOCK_FILE, fcntl.lockf or msvcrt.locking, and 
+the state is replaced in one rename so a reader never sees a partial file.
+The lock is released by the operating system when its process ends, so a 
+lost process never leaves the queue locked.
+
+A claimed range is leased to the worker. LeaseKeeper renews the lease
+from a thread while the range runs. When a worker is lost, its lease
+expires after LEASE_SEC and the range goes back to pending for another
+worker. A range is marked failed after MAX_ATTEMPTS claims. A worker that
+was only slow finds out at its next renewal that the lease is gone, and
+LeaseKeeper sets the lost event that runWorker passes to the range so
+that it stops rather than write the same outputs as the new owner.
+
+The queue only needs a shared directory, so coordinator and workers can
+all run on one machine for testing. Only standard library modules are
+used so that mHSP2 can share the queue.
+
+"""
+# Copyright and License
+"""
+Copyright 2020 Nick Martin
+
+This file is part of a collection of scripts and modules in the GitHub
+repository https://github.com/nmartin198/wres_risk_analysis, hereafter
+`wres_risk_analysis`.
+
+wres_risk_analysis is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+# imports
+import os
+import json
+import time
+import socket
+import threading
+import traceback
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# parameters
+QUEUE_FILE = "queue_state.json"
+"""Queue state file name in the queue directory"""
+LOCK_FILE = "queue.lock"
+"""Lock file name in the queue directory"""
+LEASE_SEC = 600.0
+"""Seconds without a lease renewal before a claimed range is reassigned"""
+LOCK_TIMEOUT_SEC = 120.0
+"""Seconds to wait for the queue lock"""
+POLL_SEC = 5.0
+"""Seconds between checks of the queue when no range can be claimed"""
+MAX_ATTEMPTS = 3
+"""Number of claims of a range before it is marked failed"""
+RANGE_PENDING = "pending"
+"""Range status when it is waiting for a worker"""
+RANGE_LEASED = "leased"
+"""Range status when it is claimed by a worker"""
+RANGE_DONE = "done"
+"""Range status when all realizations in it succeeded"""
+RANGE_FAILED = "failed"
+"""Range status when it failed MAX_ATTEMPTS times"""
+# globals
+THREAD_LOCK = threading.Lock()
+"""Serializes FileLock within a process. fcntl locks belong to the 
+process, so threads of one process do not exclude each other with them"""
+
+
+def workerId():
+    """Worker identifier from the host name and process id
+
+    Returns:
+        str: worker identifier
+    """
+    return "%s_%d" % ( socket.gethostname(), os.getpid() )
+
+
+def _tryLock( FH ):
+    """Try to lock an open file without waiting. Raises OSError when it is
+    locked by another process."""
+    if fcntl is not None:
+        fcntl.lockf( FH.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB )
+    else:
+        FH.seek( 0 )
+        msvcrt.locking( FH.fileno(), msvcrt.LK_NBLCK, 1 )
+
+def _unlock( FH ):
+    """Unlock a file locked with _tryLock"""
+    if fcntl is not None:
+        fcntl.lockf( FH.fileno(), fcntl.LOCK_UN )
+    else:
+        FH.seek( 0 )
+        msvcrt.locking( FH.fileno(), msvcrt.LK_UNLCK, 1 )
+
+
+class FileLock(object):
+    """Lock context manager for a file on a shared file system. The lock 
+    file stays in place; only the lock on it is taken and released."""
+
+    def __init__( self, FilePath ):
+        """Initialization method
+
+        Args:
+            FilePath (str): lock file path
+
+        """
+        self.FilePath = FilePath
+        self.FH = None
+
+    def __enter__( self ):
+        StartTime = time.time()
+        if not THREAD_LOCK.acquire( timeout=LOCK_TIMEOUT_SEC ):
+            ErrorMsg = "Timed out waiting for lock %s!!!" % self.FilePath
+            raise RuntimeError( ErrorMsg )
+        try:
+            self.FH = open( self.FilePath, "a+b" )
+            while True:
+                try:
+                    _tryLock( self.FH )
+                    return self
+                except OSError:
+                    pass
+                if ( time.time() - StartTime ) > LOCK_TIMEOUT_SEC:
+                    ErrorMsg = "Timed out waiting for lock %s!!!" % \
+                               self.FilePath
+                    raise RuntimeError( ErrorMsg )
+                time.sleep( 0.05 )
+            # end while
+        except BaseException:
+            if self.FH is not None:
+                self.FH.close()
+                self.FH = None
+            THREAD_LOCK.release()
+            raise
+        # end try
+
+    def __exit__( self, ExcType, ExcValue, ExcTB ):
+        try:
+            _unlock( self.FH )
+        finally:
+            self.FH.close()
+            self.FH = None
+            THREAD_LOCK.release()
+        return False
+
+
+class QueueLock(FileLock):
+    """Lock context manager for the queue state"""
+
+    def __init__( self, QueueDir ):
+        """Initialization method
+
+        Args:
+            QueueDir (str): queue directory
+
+        """
+        super().__init__( os.path.join( QueueDir, LOCK_FILE ) )
+
+
+def _readState( QueueDir ):
+    """Read the queue state"""
+    with open( os.path.join( QueueDir, QUEUE_FILE ), 'r' ) as IF:
+        State = json.load( IF )
+    # end with
+    return State
+
+def _writeState( QueueDir, State ):
+    """Replace the queue state in one rename"""
+    FilePath = os.path.join( QueueDir, QUEUE_FILE )
+    TmpPath = "%s.%s.tmp" % ( FilePath, workerId() )
+    with open( TmpPath, 'w' ) as OF:
+        json.dump( State, OF, indent=1 )
+    # end with
+    os.replace( TmpPath, FilePath )
+
+def _expireLeases( State, Now ):
+    """Return ranges with expired leases to pending, or mark them failed
+    after MAX_ATTEMPTS. Returns the number of ranges changed."""
+    NumExpired = 0
+    for cRange in State["ranges"]:
+        if cRange["status"] != RANGE_LEASED:
+            continue
+        if ( Now - cRange["renewed"] ) <= State["lease_sec"]:
+            continue
+        print( "Lease on range %d from worker %s expired" % ( cRange["id"],
+               cRange["worker"] ), flush=True )
+        if cRange["attempts"] >= State["max_attempts"]:
+            cRange["status"] = RANGE_FAILED
+        else:
+            cRange["status"] = RANGE_PENDING
+        cRange["worker"] = None
+        NumExpired += 1
+    # end for
+    return NumExpired
+
+def queueExists( QueueDir ):
+    """Check for a queue in QueueDir"""
+    return os.path.isfile( os.path.join( QueueDir, QUEUE_FILE ) )
+
+def createQueue( QueueDir, RealNums, RangeSize, RunDict=None, 
+                 LeaseSec=LEASE_SEC ):
+    """Create a new queue of realization ranges, replacing an existing one
+
+    Args:
+        QueueDir (str): queue directory on a shared file system
+        RealNums (list): realization numbers
+        RangeSize (int): realizations per range
+
+    KWargs:
+        RunDict (dict): run description for workers to check
+        LeaseSec (float): seconds without renewal before a lease expires
+
+    Returns:
+        dict: queue state
+    """
+    # start
+    os.makedirs( QueueDir, exist_ok=True )
+    RangeSize = max( 1, int( RangeSize ) )
+    RangeList = list()
+    for iI, cStart in enumerate( range( 0, len( RealNums ), RangeSize ) ):
+        RangeList.append( { "id" : iI, 
+                            "reals" : [ int( x ) for x in 
+                                        RealNums[cStart:cStart + RangeSize] ],
+                            "status" : RANGE_PENDING, "worker" : None,
+                            "renewed" : 0.0, "attempts" : 0, 
+                            "failed_reals" : list(), } )
+    # end for
+    State = { "run" : RunDict, "created" : time.time(), 
+              "lease_sec" : float( LeaseSec ), "max_attempts" : MAX_ATTEMPTS,
+              "ranges" : RangeList, }
+    with QueueLock( QueueDir ):
+        _writeState( QueueDir, State )
+    # end with
+    return State
+
+def readQueue( QueueDir ):
+    """Read the queue state under the lock
+
+    Args:
+        QueueDir (str): queue directory
+
+    Returns:
+        dict: queue state
+    """
+    with QueueLock( QueueDir ):
+        State = _readState( QueueDir )
+    # end with
+    return State
+
+def claimRange( QueueDir, WorkerId ):
+    """Claim the next pending range. Expired leases are reassigned first.
+
+    Args:
+        QueueDir (str): queue directory
+        WorkerId (str): worker identifier
+
+    Returns:
+        tuple: ( range id, list of realization numbers ) or None when no
+               range is pending
+    """
+    # start
+    with QueueLock( QueueDir ):
+        State = _readState( QueueDir )
+        Now = time.time()
+        _expireLeases( State, Now )
+        Claimed = None
+        for cRange in State["ranges"]:
+            if cRange["status"] == RANGE_PENDING:
+                cRange["status"] = RANGE_LEASED
+                cRange["worker"] = WorkerId
+                cRange["renewed"] = Now
+                cRange["attempts"] += 1
+                Claimed = ( cRange["id"], list( cRange["reals"] ) )
+                break
+        # end for
+        _writeState( QueueDir, State )
+    # end with
+    return Claimed
+
+def renewLease( QueueDir, WorkerId, RangeId ):
+    """Renew the lease on a claimed range
+
+    Args:
+        QueueDir (str): queue directory
+        WorkerId (str): worker identifier
+        RangeId (int): range id
+
+    Returns:
+        bool: False when the range is no longer leased to this worker
+    """
+    with QueueLock( QueueDir ):
+        State = _readState( QueueDir )
+        cRange = State["ranges"][RangeId]
+        if ( cRange["status"] != RANGE_LEASED ) or \
+                ( cRange["worker"] != WorkerId ):
+            return False
+        cRange["renewed"] = time.time()
+        _writeState( QueueDir, State )
+    # end with
+    return True
+
+def finishRange( QueueDir, WorkerId, RangeId, FailedReals=None ):
+    """Mark a claimed range done. Failed realizations go back in the queue
+    as the range, until it has been claimed MAX_ATTEMPTS times. The result
+    is dropped when the lease expired and the range is now leased to 
+    another worker, or has already been completed.
+
+    Args:
+        QueueDir (str): queue directory
+        WorkerId (str): worker identifier
+        RangeId (int): range id
+
+    KWargs:
+        FailedReals (list): realizations in the range that failed
+
+    Returns:
+        bool: False when the result was dropped
+    """
+    # start
+    if FailedReals is None:
+        FailedReals = list()
+    with QueueLock( QueueDir ):
+        State = _readState( QueueDir )
+        cRange = State["ranges"][RangeId]
+        if ( cRange["status"] == RANGE_DONE ):
+            # completed by another worker after a reassignment
+            return False
+        if ( cRange["status"] == RANGE_LEASED ) and \
+                ( cRange["worker"] != WorkerId ):
+            # reassigned after the lease expired; the new worker finishes it
+            print( "Dropped late result for range %d from worker %s" % (
+                   RangeId, WorkerId ), flush=True )
+            return False
+        cRange["worker"] = WorkerId
+        cRange["renewed"] = time.time()
+        if len( FailedReals ) == 0:
+            cRange["status"] = RANGE_DONE
+            cRange["failed_reals"] = list()
+        elif cRange["attempts"] >= State["max_attempts"]:
+            cRange["status"] = RANGE_FAILED
+            cRange["failed_reals"] = [ int( x ) for x in FailedReals ]
+        else:
+            cRange["status"] = RANGE_PENDING
+            cRange["reals"] = [ int( x ) for x in FailedReals ]
+            cRange["worker"] = None
+        # end if
+        _writeState( QueueDir, State )
+    # end with
+    return True
+
+def queueSummary( QueueDir ):
+    """Number of ranges by status. Expired leases are reassigned first.
+
+    Args:
+        QueueDir (str): queue directory
+
+    Returns:
+        dict: number of ranges for each status
+    """
+    with QueueLock( QueueDir ):
+        State = _readState( QueueDir )
+        if _expireLeases( State, time.time() ) > 0:
+            _writeState( QueueDir, State )
+    # end with
+    Summary = { RANGE_PENDING : 0, RANGE_LEASED : 0, RANGE_DONE : 0,
+                RANGE_FAILED : 0 }
+    for cRange in State["ranges"]:
+        Summary[cRange["status"]] += 1
+    # end for
+    return Summary
+
+def queueFinished( Summary ):
+    """Check a queueSummary for no pending or leased ranges"""
+    return ( Summary[RANGE_PENDING] + Summary[RANGE_LEASED] ) == 0
+
+def failedRealizations( QueueDir ):
+    """Realizations in failed ranges
+
+    Args:
+        QueueDir (str): queue directory
+
+    Returns:
+        list: realization numbers
+    """
+    State = readQueue( QueueDir )
+    FailList = list()
+    for cRange in State["ranges"]:
+        if cRange["status"] == RANGE_FAILED:
+            if len( cRange["failed_reals"] ) > 0:
+                FailList.extend( cRange["failed_reals"] )
+            else:
+                FailList.extend( cRange["reals"] )
+    # end for
+    return sorted( FailList )
+
+
+class LeaseKeeper(object):
+    """Renews the lease on a range from a thread while it runs. LostEvent
+    is set when the range is no longer leased to this worker."""
+
+    def __init__( self, QueueDir, WorkerId, RangeId, LeaseSec ):
+        """Initialization method
+
+        Args:
+            QueueDir (str): queue directory
+            WorkerId (str): worker identifier
+            RangeId (int): range id
+            LeaseSec (float): lease time from the queue state
+
+        """
+        self.QueueDir = QueueDir
+        self.WorkerId = WorkerId
+        self.RangeId = RangeId
+        self.Interval = LeaseSec / 4.0
+        self.StopEvent = threading.Event()
+        self.LostEvent = threading.Event()
+        self.Thread = threading.Thread( target=self._run, daemon=True,
+                                        name="WG_LeaseKeeper" )
+
+    def _run( self ):
+        while not self.StopEvent.wait( self.Interval ):
+            try:
+                if not renewLease( self.QueueDir, self.WorkerId, 
+                                   self.RangeId ):
+                    print( "Lost the lease on range %d, stopping it" % 
+                           self.RangeId, flush=True )
+                    self.LostEvent.set()
+                    break
+            except Exception:
+                print( "Lease renewal failed !!!\n%s" % 
+                       traceback.format_exc(), flush=True )
+        # end while
+
+    def start( self ):
+        self.Thread.start()
+        return self
+
+    def stop( self ):
+        self.StopEvent.set()
+        self.Thread.join()
+
+
+def waitForQueue( QueueDir, Timeout=None, PollSec=POLL_SEC ):
+    """Wait for a coordinator to create the queue
+
+    Args:
+        QueueDir (str): queue directory
+
+    KWargs:
+        Timeout (float): seconds to wait; None waits without limit
+        PollSec (float): seconds between checks
+
+    Returns:
+        bool: True when the queue exists
+    """
+    StartTime = time.time()
+    while not queueExists( QueueDir ):
+        if ( Timeout is not None ) and ( ( time.time() - StartTime ) > Timeout ):
+            return False
+        time.sleep( PollSec )
+    # end while
+    return True
+
+def runWorker( QueueDir, RunFunc, WorkerId=None, PollSec=POLL_SEC ):
+    """Claim and run ranges until the queue is finished
+
+    Args:
+        QueueDir (str): queue directory
+        RunFunc (function): called with the list of realization numbers in
+                            a range and the LeaseKeeper.LostEvent of the
+                            range; stops early once the event is set and 
+                            returns the list of realizations that failed
+
+    KWargs:
+        WorkerId (str): worker identifier; defaults to workerId()
+        PollSec (float): seconds between checks when no range is pending
+
+    Returns:
+        list: ids of the ranges run by this worker
+    """
+    # start
+    if WorkerId is None:
+        WorkerId = workerId()
+    LeaseSec = readQueue( QueueDir )["lease_sec"]
+    RangeIds = list()
+    while True:
+        Claimed = claimRange( QueueDir, WorkerId )
+        if Claimed is None:
+            if queueFinished( queueSummary( QueueDir ) ):
+                break
+            # other workers hold the rest; wait in case a lease expires
+            time.sleep( PollSec )
+            continue
+        RangeId, RealList = Claimed
+        print( "Worker %s running range %d, realizations %d through %d" %
+               ( WorkerId, RangeId, RealList[0], RealList[-1] ), flush=True )
+        Keeper = LeaseKeeper( QueueDir, WorkerId, RangeId, LeaseSec ).start()
+        try:
+            FailedReals = RunFunc( RealList, Keeper.LostEvent )
+        except Exception:
+            print( "Range %d failed !!!\n%s" % ( RangeId, 
+                   traceback.format_exc() ), flush=True )
+            FailedReals = RealList
+        finally:
+            Keeper.stop()
+        finishRange( QueueDir, WorkerId, RangeId, FailedReals=FailedReals )
+        RangeIds.append( RangeId )
+    # end while
+    return RangeIds
+
+def monitorQueue( QueueDir, PollSec=POLL_SEC ):
+    """Coordinator loop. Reports progress and reassigns expired leases
+    until all ranges are done or failed.
+
+    Args:
+        QueueDir (str): queue directory
+
+    KWargs:
+        PollSec (float): seconds between checks
+
+    Returns:
+        dict: final queueSummary
+    """
+    LastSummary = None
+    while True:
+        Summary = queueSummary( QueueDir )
+        if Summary != LastSummary:
+            print( "Ranges pending %d, running %d, done %d, failed %d" % 
+                   ( Summary[RANGE_PENDING], Summary[RANGE_LEASED],
+                     Summary[RANGE_DONE], Summary[RANGE_FAILED] ), flush=True )
+            LastSummary = Summary
+        if queueFinished( Summary ):
+            break
+        time.sleep( PollSec )
+    # end while
+    return Summary
+
+
+#EOF
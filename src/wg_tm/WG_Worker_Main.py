@@ -2,34 +2,48 @@
 """
 .. module:: WG_Worker_Main
    :platform: Windows, Linux
-   :synopsis: The main entry point for the worker code that is excecuted by each worker.
+   :synopsis: Single worker entry point with selectable engines and execution backends
 
-.. moduleauthor:: Nick Martin <nick.martin@stanfordalumi.org>
+.. moduleauthor:: Nick Martin <nick.martin@stanfordalumni.org>
 
-This module is not used in the multiprocessing-capable version. All of this 
-code is superseded by WGmp.py.
+Everything a worker does, for WGmp and for any other driver. Work is 
+described by two independent choices.
 
-This module holds the original "main" program functionality and entry point for 
-an individual weather generator (WG) realization or simulation.
+Engines simulate and output realizations in the current process:
 
-Program flow chart functionality
+* reference: the original day-by-day loop on the module globals of
+  WG_Dists_Samples, WG_OtherWeather, and WG_HighRealResults with per-day
+  samplers. Slow, legacy seeds only; kept as the baseline that faster
+  engines are checked and benchmarked against.
+* loop: one realization at a time with WG_Realization and the bulk 
+  samples. Same results as reference for legacy seeds.
+* block: blocks of realizations at once with the vectorized 
+  WG_BlockEngine. Same results as loop.
 
-I. Initialization and prep of all variables and structures
-    - WG_Inputs provides for parameter definitions and domain specification
-    - Functions in this module for startup and shutdown
+Other engines plug in with registerEngine. An engine is a function that
+takes ( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed, SeedMode ) and returns
+a return code or, for a batched engine, takes a list of realization 
+numbers in place of RealNum and returns a list of return codes. Engines
+output their realizations with WG_AsyncWriter.submitRealization. Register
+at import time of a module that the worker processes also import.
 
-II. Loop through all realizations: for each realization make a time series of
-weather parameters.
-    1. Loop through all days in the simulation period and determine a daily
-        weather parameter
-        - precipitation
-        - maximum air temperature
-        - minimum air temperature
-        a) within day logic provided by the flow chart that is Figure 2b of
-            Wilks and Wilby (1999)
+Backends run the engine tasks:
+
+* serial: in this process, one task after another
+* pool: in a multiprocessing pool with WG_Scheduler task sizes
+
+A backend has imap( TaskFunc, AllArgs, StopEvent=None ), which yields the
+result of each task as it completes and drops the remaining tasks once 
+the optional threading.Event is set, and close().
+
+Batched and distributed execution are deliberately not backends. Batching
+is a property of the engine, so the block engine runs on either backend.
+The distributed, multi-node mode is a layer above the backends rather 
+than one of them: its unit of work is a range of realizations claimed 
+from a WG_WorkQueue, with leases, a coordinator, and a shared manifest, 
+not a task handed to imap. WGmp workers claim ranges and run each range 
+through their own serial or pool backend with simulateRealizations.
 
-III. Probabilistic processing of full collection of time series includes 
-statistical processing for comparison with the inputs.
 """
 # Copyright and License
 """
@@ -53,7 +67,46 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+# imports
+from multiprocessing import Pool
+
+# parameters
+PDEPTH_DEF_SEED = int( 21342 )
+"""Precipitation depth sampler, default seed"""
+STD_NORM_DEF_SEED = int( 31344 )
+"""Standard normal variate sampler, default seed"""
+WET_STA_DEF_SEED = int( 41446 )
+"""The wet state default seed"""
+DRY_STA_DEF_SEED = int( 51548 )
+"""The dry state default seed"""
+DEF_SEED_MODE = "legacy"
+"""Default seeding mode, see WG_Seeds. legacy reproduces earlier results."""
+CHUNK_SIZE = 5
+"""Maximum number of realizations sent to a worker process at one time by
+per-realization engines. Tasks get smaller towards the end of the run, see 
+WG_Scheduler.guidedChunks."""
+ENGINE_REFERENCE = "reference"
+"""Original day-by-day engine on module globals"""
+ENGINE_LOOP = "loop"
+"""One realization at a time with WG_Realization"""
+ENGINE_BLOCK = "block"
+"""Blocks of realizations with WG_BlockEngine"""
+DEF_ENGINE = ENGINE_LOOP
+"""Default engine"""
+BACKEND_SERIAL = "serial"
+"""Run tasks in this process"""
+BACKEND_POOL = "pool"
+"""Run tasks in a multiprocessing pool"""
+# globals
+ENGINES = dict()
+"""Registered engines by name, ( engine function, batched flag ), see
+registerEngine"""
+BACKENDS = dict()
+"""Backend classes by name"""
+
 
+#--------------------------------------------------------------------------
+# periods for the reference engine
 def detH0Period(curDate):
     """Determine the null pathway current data period index.
     The null pathway is always based on data so only need to return the 
@@ -129,20 +182,14 @@ def detH1Period(curDate):
     return (WGI.PROJ_KEYW, -1)
 
 
-def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
-    """ Main functionality to run a single realization
-
-    Args:
-        RealNum (int): the current realization number
-        SNSeed (int): base seed for the standard normal sampler
-        PDSeed (int): the precipitation depth sampler seed
-        WSLSeed (int): wet state spell length sampling seed
-        DSLSeed (int): dry state spell length sampling seed
+#--------------------------------------------------------------------------
+# engines
+def _referenceRealization( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
+    """The original day-by-day realization on module globals.
 
     Returns:
-        int. The return code::
-            0 -- Success!
-            1 -- Failure, generic
+        tuple: ( DT_INDEX, TOTAL_DAYS ); results are in 
+        WG_HighRealResults.H0_REAL and H1_REAL
 
     """
     # imports
@@ -152,12 +199,14 @@ def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
     import WG_PrecipDepth as WGPD
     import WG_OtherWeather as WGOW
     import WG_HighRealResults as WGHRR
+    import WG_Seeds as WGSD
     # 
     # set our local seeds
-    pdSampSeed = PDSeed + RealNum
-    sndSampSeed = SNSeed + RealNum
-    wetSSampSeed = WSLSeed + RealNum
-    drySSampSeed = DSLSeed + RealNum
+    sndSampSeed, pdSampSeed, wetSSampSeed, drySSampSeed = WGSD.legacySeeds(
+                                RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed )
+    # setup our module globals at beginning
+    WGOW.setAllBegin()
+    WGDS.setAllBegin()
     # get our start and end
     start_date = WGI.START_DATE
     end_date = WGI.END_DATE
@@ -175,7 +224,7 @@ def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
     WGOW.setupDistsSamples(seed_std_norm=sndSampSeed)
     WGOW.updateTracker()
     # get our starting state sampler
-    StarterSamp = WGPD.PrecipSampler(pd_sample_seed=(pdSampSeed - 1))
+    StarterSamp = WGPD.PrecipSampler(pd_sample_seed=pdSampSeed)
     # get our time index in a list for an iterator
     TimesList = DT_INDEX.to_pydatetime().tolist()
     # no loop at the realization level
@@ -216,6 +265,7 @@ def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
         # determine our period for sampling
         h0pindex = detH0Period( cTime )
         h1ptype, h1pindex = detH1Period( cTime )
+        # use h1pindex for when not in data period for H0 pathway
         # now that everything is sampled check our state and if wet
         # then we get a precip depth
         if h0State == WGI.WET_STATE:
@@ -228,7 +278,7 @@ def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
                 # then need to assign the sampled precipitation depth
                 # for each grid 
                 #pVals = WGHRR.createDepArrayData( curMonth, h0pindex, 
-                #                                    WGDS.ST_DATA_PDEPTH )
+                #                                   WGDS.ST_DATA_PDEPTH )
                 pVals = WGHRR.createDepArrayCProj( curMonth, h1ptype, 
                                                     h1pindex, 
                                                     WGDS.ST_DATA_PDEPTH, 
@@ -241,7 +291,7 @@ def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
                 h0State = WGI.WET_STATE
                 h0remdur = WGDS.ST_DATA_WETSPELL[h0pindex][curMonth]
                 #pVals = WGHRR.createDepArrayData( curMonth, h0pindex, 
-                #                                    WGDS.ST_DATA_PDEPTH )
+                #                                   WGDS.ST_DATA_PDEPTH )
                 pVals = WGHRR.createDepArrayCProj( curMonth, h1ptype, 
                                                     h1pindex, 
                                                     WGDS.ST_DATA_PDEPTH, 
@@ -296,11 +346,484 @@ def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
         # copy our array
         WGOW.rollOverChis()
     # end of time for loop
-    # now output the realization
-    WGHRR.outputRealResults( RealNum, DT_INDEX)
-    WGHRR.outputWSResults( RealNum, DT_INDEX, TOTAL_DAYS )
-    # end of realizations loop
+    # end
+    return ( DT_INDEX, TOTAL_DAYS )
+
+def WG_Reference_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed,
+                       SeedMode=DEF_SEED_MODE ):
+    """ Run and output a single realization with the reference engine
+
+    Args:
+        RealNum (int): the current realization number
+        SNSeed (int): base seed for the standard normal sampler
+        PDSeed (int): the precipitation depth sampler seed
+        WSLSeed (int): wet state spell length sampling seed
+        DSLSeed (int): dry state spell length sampling seed
+
+    KWargs:
+        SeedMode (str): seeding mode; only WG_Seeds.SEED_MODE_LEGACY
+
+    Returns:
+        int. The return code::
+            0 -- Success!
+            1 -- Failure, generic
+
+    """
+    # imports
+    import traceback
+    import WG_Dists_Samples as WGDS
+    import WG_OtherWeather as WGOW
+    import WG_HighRealResults as WGHRR
+    import WG_AsyncWriter as WGAW
+    import WG_RunManifest as WGRM
+    import WG_Seeds as WGSD
+    # start
+    try:
+        if SeedMode != WGSD.SEED_MODE_LEGACY:
+            ErrorMsg = "The reference engine only supports %s seeds!!!" % \
+                       WGSD.SEED_MODE_LEGACY
+            raise ValueError( ErrorMsg )
+        DT_INDEX, TOTAL_DAYS = _referenceRealization( RealNum, SNSeed, PDSeed,
+                                                      WSLSeed, DSLSeed )
+        # the next realization creates new arrays, so these can be queued
+        WGAW.submitRealization( RealNum, DT_INDEX, TOTAL_DAYS, WGHRR.H0_REAL,
+                                WGHRR.H1_REAL )
+    except Exception:
+        print( "Realization %d failed !!!\n%s" % ( RealNum, 
+                                                  traceback.format_exc() ) )
+        WGRM.recordRealization( RealNum, WGRM.STATUS_FAILED )
+        return 1
+    finally:
+        # clean up at end
+        WGDS.cleanAllEnd()
+        WGOW.cleanAllEnd()
+        WGHRR.cleanAllEnd()
+    # end
+    return 0
+
+def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed,
+                    SeedMode=DEF_SEED_MODE ):
+    """ Main functionality to run a single realization
+
+    Args:
+        RealNum (int): the current realization number
+        SNSeed (int): base seed for the standard normal sampler
+        PDSeed (int): the precipitation depth sampler seed
+        WSLSeed (int): wet state spell length sampling seed
+        DSLSeed (int): dry state spell length sampling seed
+
+    KWargs:
+        SeedMode (str): seeding mode, see WG_Seeds
+
+    Returns:
+        int. The return code::
+            0 -- Success!
+            1 -- Failure, generic
+
+    """
+    # imports
+    import traceback
+    import WG_AsyncWriter as WGAW
+    import WG_BlockEngine as WGBE
+    import WG_Realization as WGR
+    import WG_RunManifest as WGRM
+    import WG_Seeds as WGSD
+    # 
+    try:
+        # the calendar and the spell streams are the same for every 
+        # realization and are built once for the process
+        Setup = WGBE.getRunSetup()
+        # all state for this realization is in the context
+        Ctx = WGR.RealizationContext( RealNum, Setup.NumDays )
+        WGR.drawSamples( Ctx, Setup.Samples, WGSD.realStreams( RealNum, SNSeed, 
+                                    PDSeed, WSLSeed, DSLSeed, SeedMode=SeedMode ) )
+        WGR.simulateRealization( Ctx, Setup )
+        # now output the realization, in the background if the writer is started
+        WGAW.submitRealization( RealNum, Setup.DT_INDEX, Setup.NumDays, 
+                                Ctx.H0Real, Ctx.H1Real )
+    except Exception:
+        print( "Realization %d failed !!!\n%s" % ( RealNum, 
+                                                  traceback.format_exc() ) )
+        WGRM.recordRealization( RealNum, WGRM.STATUS_FAILED )
+        return 1
     # end
     return 0
 
-#EOF
\ No newline at end of file
+def WG_Block_Main( RealList, SNSeed, PDSeed, WSLSeed, DSLSeed,
+                   SeedMode=DEF_SEED_MODE ):
+    """ Main functionality to run a block of realizations with the vectorized
+    engine.
+
+    Args:
+        RealList (list): realization numbers in this block
+        SNSeed (int): base seed for the standard normal sampler
+        PDSeed (int): the precipitation depth sampler seed
+        WSLSeed (int): wet state spell length sampling seed
+        DSLSeed (int): dry state spell length sampling seed
+
+    KWargs:
+        SeedMode (str): seeding mode, see WG_Seeds
+
+    Returns:
+        list: return code for each realization::
+            0 -- Success!
+            1 -- Failure, generic
+
+    """
+    # imports
+    import traceback
+    import WG_BlockEngine as WGBE
+    import WG_AsyncWriter as WGAW
+    import WG_RunManifest as WGRM
+    # start
+    try:
+        Setup = WGBE.getRunSetup()
+        H0Block, H1Block = WGBE.simulateBlock( Setup, RealList, SNSeed, PDSeed,
+                                        WSLSeed, DSLSeed, SeedMode=SeedMode )
+    except Exception:
+        print( "Block of realizations %s failed !!!\n%s" % ( RealList, 
+                                                traceback.format_exc() ) )
+        for RealNum in RealList:
+            WGRM.recordRealization( RealNum, WGRM.STATUS_FAILED )
+        return [ 1 for x in RealList ]
+    # now output each realization
+    RetCodes = list()
+    for iI, RealNum in enumerate( RealList ):
+        try:
+            WGAW.submitRealization( RealNum, Setup.DT_INDEX, Setup.NumDays,
+                                    H0Block[iI], H1Block[iI] )
+            RetCodes.append( 0 )
+        except Exception:
+            print( "Realization %d failed !!!\n%s" % ( RealNum, 
+                                                  traceback.format_exc() ) )
+            WGRM.recordRealization( RealNum, WGRM.STATUS_FAILED )
+            RetCodes.append( 1 )
+    # end for
+    # end
+    return RetCodes
+
+def registerEngine( Name, EngineFunc, Batched=False ):
+    """Make an engine available by name to WG_Task_Main and the --engine
+    option of WGmp.
+
+    Args:
+        Name (str): engine name
+        EngineFunc (function): engine function, see the module description
+
+    KWargs:
+        Batched (bool): EngineFunc takes a list of realization numbers
+
+    """
+    ENGINES[Name] = ( EngineFunc, bool( Batched ) )
+    # end
+    return
+
+def checkEngine( Engine ):
+    """Raise a ValueError for an unknown engine"""
+    if Engine not in ENGINES:
+        ErrorMsg = "Unknown engine %s!!! Choose from %s" % ( Engine, 
+                                                         sorted( ENGINES ) )
+        raise ValueError( ErrorMsg )
+
+def isBatched( Engine ):
+    """True if the engine simulates a list of realizations in one call"""
+    checkEngine( Engine )
+    return ENGINES[Engine][1]
+
+def WG_Task_Main( TaskArgs ):
+    """Task for a list of realizations, run with the selected engine, with
+    timing.
+
+    Args:
+        TaskArgs (tuple): ( RealList, SNSeed, PDSeed, WSLSeed, DSLSeed,
+                          SeedMode, Engine )
+
+    Returns:
+        list: timing record for each realization, see 
+              WG_Scheduler.timeRecord
+    """
+    # imports
+    import time
+    import WG_Scheduler as WGSC
+    # start
+    RealList, SNSeed, PDSeed, WSLSeed, DSLSeed, SeedMode, Engine = TaskArgs
+    checkEngine( Engine )
+    EngineFunc, Batched = ENGINES[Engine]
+    Records = list()
+    if Batched:
+        StartTime = time.perf_counter()
+        RetCodes = EngineFunc( list( RealList ), SNSeed, PDSeed, WSLSeed, 
+                               DSLSeed, SeedMode=SeedMode )
+        # realizations in a block share the block time
+        RealSecs = ( time.perf_counter() - StartTime ) / len( RealList )
+        for RealNum, RetCode in zip( RealList, RetCodes ):
+            Records.append( WGSC.timeRecord( RealNum, RetCode, RealSecs ) )
+        # end for
+    else:
+        for RealNum in RealList:
+            StartTime = time.perf_counter()
+            RetCode = EngineFunc( int( RealNum ), SNSeed, PDSeed, WSLSeed,
+                                  DSLSeed, SeedMode=SeedMode )
+            Records.append( WGSC.timeRecord( RealNum, RetCode, 
+                                time.perf_counter() - StartTime ) )
+        # end for
+    # end if
+    return Records
+
+def initWorker( PreloadInputs=True, SharedSpec=None, AsyncOutput=False,
+                ManifestSpec=None ):
+    """Pool worker initializer. Loads the distribution tables once per 
+    process from the cache file written by the main process and builds 
+    the run calendar and the run set-up, see WG_BlockEngine.getRunSetup.
+
+    KWargs:
+        PreloadInputs (bool): also read the smoothed temperature inputs and
+                              M0 and M1 once for the process rather than
+                              for every realization
+        SharedSpec (tuple): shared memory specification from 
+                            WG_SharedInputs.publishInputs. When provided,
+                            all read-only inputs are attached from shared
+                            memory instead of loaded.
+        AsyncOutput (bool): start the WG_AsyncWriter writer thread so that
+                            output overlaps with the next simulation. The
+                            queue is written out when the pool is closed
+                            and joined.
+        ManifestSpec (tuple): ( manifest path, run description ) to record
+                              completed realizations, see WG_RunManifest
+
+    """
+    from multiprocessing import util
+    import WG_DistTables as WGDT
+    import WG_Calendar as WGCal
+    import WG_OtherWeather as WGOW
+    import WG_SharedInputs as WGSI
+    import WG_AsyncWriter as WGAW
+    import WG_RunManifest as WGRM
+    import WG_BlockEngine as WGBE
+    if ManifestSpec is not None:
+        WGRM.openManifest( *ManifestSpec )
+    if AsyncOutput:
+        WGAW.startWriter()
+        util.Finalize( None, WGAW.stopWriter, exitpriority=10 )
+    if SharedSpec is not None:
+        WGSI.attachInputs( SharedSpec )
+    else:
+        WGDT.setRunTables()
+        WGCal.getRunCalendar()
+        if PreloadInputs:
+            WGOW.loadInputArrays()
+    # end if
+    # the calendar lookups and sampling set-up for every realization
+    WGBE.getRunSetup()
+
+#--------------------------------------------------------------------------
+# backends
+class SerialBackend(object):
+    """Runs tasks one after another in this process. Outputs are written
+    before the next realization starts."""
+
+    def __init__( self, NumProc, InitArgs ):
+        """Initialization method
+
+        Args:
+            NumProc (int): not used
+            InitArgs (tuple): ( PreloadInputs, SharedSpec, AsyncOutput,
+                              ManifestSpec ), see initWorker
+
+        """
+        super().__init__()
+        self.InitArgs = InitArgs
+        self.Started = False
+
+    def _start( self ):
+        """Set up this process once. Shared inputs, when used, were 
+        published by this process so only the manifest is opened."""
+        import WG_RunManifest as WGRM
+        PreloadInputs, SharedSpec, AsyncOutput, ManifestSpec = self.InitArgs
+        if SharedSpec is None:
+            initWorker( PreloadInputs, ManifestSpec=ManifestSpec )
+        elif ManifestSpec is not None:
+            WGRM.openManifest( *ManifestSpec )
+        self.Started = True
+
+    def imap( self, TaskFunc, AllArgs, StopEvent=None ):
+        """Yield the result of each task as it completes. No further tasks
+        are started once StopEvent is set."""
+        if not self.Started:
+            self._start()
+        for tArgs in AllArgs:
+            if ( StopEvent is not None ) and StopEvent.is_set():
+                break
+            yield TaskFunc( tArgs )
+        # end for
+
+    def close( self ):
+        """Nothing to release"""
+        return
+
+
+class PoolBackend(object):
+    """Runs tasks in a multiprocessing pool, in the order they complete"""
+
+    def __init__( self, NumProc, InitArgs ):
+        """Initialization method
+
+        Args:
+            NumProc (int): number of worker processes
+            InitArgs (tuple): initWorker arguments for each worker
+
+        """
+        super().__init__()
+        self.NumProc = NumProc
+        self.InitArgs = InitArgs
+
+    def imap( self, TaskFunc, AllArgs, StopEvent=None ):
+        """Yield the result of each task as it completes. A new pool is 
+        used for each call. Once StopEvent is set, the pool is terminated
+        at the next result and the remaining tasks are dropped."""
+        pool = Pool( processes=self.NumProc, initializer=initWorker,
+                     initargs=self.InitArgs )
+        Stopped = False
+        try:
+            for tResult in pool.imap_unordered( TaskFunc, AllArgs ):
+                if ( StopEvent is not None ) and StopEvent.is_set():
+                    Stopped = True
+                    break
+                yield tResult
+            # end for
+        finally:
+            if Stopped:
+                # the work now belongs to someone else; outputs are 
+                # replaced in one rename so a stopped write leaves no 
+                # partial file
+                pool.terminate()
+            else:
+                # close and join, never terminate, so that the workers 
+                # write their queued outputs even when the caller stops 
+                # on an error
+                pool.close()
+            pool.join()
+        # end
+
+    def close( self ):
+        """Nothing to release; each imap call closes its pool"""
+        return
+
+
+def makeBackend( Name, NumProc, InitArgs ):
+    """Create a backend by name, see BACKENDS
+
+    Args:
+        Name (str): backend name
+        NumProc (int): number of worker processes
+        InitArgs (tuple): ( PreloadInputs, SharedSpec, AsyncOutput,
+                          ManifestSpec ), see initWorker
+
+    Returns:
+        backend object
+    """
+    if Name not in BACKENDS:
+        ErrorMsg = "Unknown backend %s!!! Choose from %s" % ( Name, 
+                                                        sorted( BACKENDS ) )
+        raise ValueError( ErrorMsg )
+    return BACKENDS[Name]( NumProc, InitArgs )
+
+
+#--------------------------------------------------------------------------
+# running realizations
+def runRealizations( RealNums, Backend, NumProc, Engine, BlockSize, SeedMode,
+                     StopEvent=None ):
+    """Simulate and output a list of realizations. Tasks from 
+    WG_Scheduler.guidedChunks are run by the backend and progress is 
+    reported as they complete.
+
+    Args:
+        RealNums (list): realization numbers
+        Backend (object): backend, see makeBackend
+        NumProc (int): number of worker processes, for the task sizes
+        Engine (str): engine name, see ENGINES
+        BlockSize (int): maximum realizations per task for a batched 
+                         engine
+        SeedMode (str): seeding mode, see WG_Seeds
+
+    KWargs:
+        StopEvent (threading.Event): drop the remaining tasks once set, 
+                                     see WG_WorkQueue.LeaseKeeper
+
+    Returns:
+        list: timing record for each realization, see 
+              WG_Scheduler.timeRecord
+    """
+    # imports
+    import WG_Scheduler as WGSC
+    # start
+    if isBatched( Engine ):
+        MaxChunk = max( 1, BlockSize )
+    else:
+        MaxChunk = CHUNK_SIZE
+    AllArgs = [ ( x, STD_NORM_DEF_SEED, PDEPTH_DEF_SEED, WET_STA_DEF_SEED, 
+                  DRY_STA_DEF_SEED, SeedMode, Engine ) 
+                for x in WGSC.guidedChunks( RealNums, NumProc, MaxChunk ) ]
+    Progress = WGSC.RunProgress( len( RealNums ) )
+    Records = list()
+    for tRecords in Backend.imap( WG_Task_Main, AllArgs, StopEvent=StopEvent ):
+        Records.extend( tRecords )
+        Progress.update( tRecords )
+    # end for
+    return Records
+
+def simulateRealizations( RealNums, Backend, NumProc, Engine, BlockSize, 
+                          SeedMode, ManifestPath, MaxRetries, StopEvent=None ):
+    """Run realizations with runRealizations and retry the ones that are not
+    complete in the run manifest.
+
+    Args:
+        RealNums (list): realization numbers
+        Backend (object): backend, see makeBackend
+        NumProc (int): number of worker processes
+        Engine (str): engine name, see ENGINES
+        BlockSize (int): see runRealizations
+        SeedMode (str): seeding mode, see WG_Seeds
+        ManifestPath (str): run manifest that the workers record to
+        MaxRetries (int): number of retries for failed realizations
+
+    KWargs:
+        StopEvent (threading.Event): stop without retries once set, see
+                                     runRealizations
+
+    Returns:
+        tuple: ( list of timing records, list of realizations that failed )
+    """
+    # imports
+    import WG_RunManifest as WGRM
+    # start
+    TimeRecords = list()
+    Pending = list( RealNums )
+    for attempt in range( MaxRetries + 1 ):
+        if ( len( Pending ) == 0 ) or \
+                ( ( StopEvent is not None ) and StopEvent.is_set() ):
+            break
+        if attempt == 0:
+            cBlockSize = BlockSize
+        else:
+            print("Retry %d for %d failed realizations" % ( attempt, len( Pending ) ) )
+            # blocks of one so that a failure does not take others with it
+            cBlockSize = 1
+        TimeRecords.extend( runRealizations( Pending, Backend, NumProc, Engine,
+                                             cBlockSize, SeedMode, 
+                                             StopEvent=StopEvent ) )
+        DoneSet = WGRM.completedRealizations( ManifestPath, RealNums )
+        Pending = [ x for x in RealNums if x not in DoneSet ]
+    # end of retry for
+    return TimeRecords, Pending
+
+
+# registered engines and backends
+registerEngine( ENGINE_REFERENCE, WG_Reference_Main )
+registerEngine( ENGINE_LOOP, WG_Worker_Main )
+registerEngine( ENGINE_BLOCK, WG_Block_Main, Batched=True )
+BACKENDS[BACKEND_SERIAL] = SerialBackend
+BACKENDS[BACKEND_POOL] = PoolBackend
+
+
+#EOF
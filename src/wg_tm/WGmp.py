@@ -7,7 +7,58 @@
 
 python WGmp.py 10 --num_real 1000
 
-10 workers and 1000 realizations. Chunk size sets the number that go to a worker at a time
+10 workers and 1000 realizations. Realizations go to the workers in tasks of up to
+CHUNK_SIZE, which get smaller towards the end of the run, see WG_Scheduler. Progress
+in realizations per second with the ETA is printed as tasks complete, and the
+realization times by worker are written to OUT_LABEL + "_runstats.json".
+
+python WGmp.py 10 --num_real 1000 --block_size 25
+
+Same as above using the vectorized engine in WG_BlockEngine. Each worker simulates
+blocks of 25 realizations at once. Output is identical to the loop engine.
+
+python WGmp.py 10 --num_real 1000 --engine reference
+python WGmp.py 1 --num_real 1 --engine loop --backend serial
+
+Select the engine and the backend that runs it, see WG_Worker_Main. The reference
+engine is the original day-by-day simulation and is kept to check the others
+against. The serial backend runs in this process without a pool, which is the
+default for a single realization with the loop or reference engine.
+
+The distribution tables from WG_DistTables are built once, cached to a file in
+WG_Inputs.TABLE_CACHE_DIR, and loaded once by each worker process.
+
+python WGmp.py 64 --num_real 10000 --block_size 25 --shared_inputs 1
+
+Same as above with one copy of the read-only inputs in shared memory for all
+64 workers, see WG_SharedInputs.
+
+python WGmp.py 10 --num_real 1000 --async_output 0
+
+Write the outputs of each realization before starting the next one. By default
+each worker writes outputs from a background thread, see WG_AsyncWriter, and
+output failures are reported by the writer rather than in the return codes.
+
+python WGmp.py 10 --num_real 10000 --resume 1
+
+Continue an interrupted run. Completed realizations are recorded in a run manifest
+in the output directory, see WG_RunManifest, and are skipped when their outputs
+are present. Failed realizations are retried up to --max_retries times.
+
+python WGmp.py 0 --num_real 10000 --queue_dir /shared/wg_queue --role coordinator
+python WGmp.py 32 --queue_dir /shared/wg_queue --block_size 25
+
+Multi-node run. The coordinator queues ranges of --range_size realizations in a
+directory on a shared file system and waits; the second command is started on
+each node and claims ranges until none are left, see WG_WorkQueue. The ranges of
+a lost node are reassigned when its lease expires. Nodes write to the same output
+directory and the coordinator writes one output catalog for all realizations.
+
+python WGmp.py 10 --num_real 1000 --seed_mode spawn
+
+Independent random streams for each realization and random variable from
+np.random.SeedSequence, see WG_Seeds. The default, legacy, reproduces earlier
+results.
 
 Main will simulate from START_REAL to START_REAL + num_real of realizations. The random seed
 is set using the realization number so that can break the simulation into chunks of realizations
@@ -36,7 +87,7 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 import argparse
-from multiprocessing import Pool
+import WG_Worker_Main as WGWM
 
 START_REAL = 1
 #START_REAL = 7001
@@ -44,274 +95,39 @@ START_REAL = 1
 DEF_NUM_REALIZATIONS = 100
 """Default number of realizations"""
 # definition of our 'default seed values'
-PDEPTH_DEF_SEED = int( 21342 )
+PDEPTH_DEF_SEED = WGWM.PDEPTH_DEF_SEED
 """Precipitation depth sampler, default seed"""
-STD_NORM_DEF_SEED = int( 31344 )
+STD_NORM_DEF_SEED = WGWM.STD_NORM_DEF_SEED
 """Standard normal variate sampler, default seed"""
-WET_STA_DEF_SEED = int( 41446 )
+WET_STA_DEF_SEED = WGWM.WET_STA_DEF_SEED
 """The wet state default seed"""
-DRY_STA_DEF_SEED = int( 51548 )
+DRY_STA_DEF_SEED = WGWM.DRY_STA_DEF_SEED
 """The dry state default seed"""
-CHUNK_SIZE = 5
-"""Chunk size to use with the mp module
-This is effectively the number of realization sent to a worker process at one time."""
-
-
-def detH0Period(curDate):
-    """Determine the null pathway current data period index.
-    The null pathway is always based on data so only need to return the 
-    data index.
-    
-    Args:
-        curDate (dt.datetime): current date
-
-    """
-    import WG_Inputs as WGI
-    # start
-    NumDataPeriods = len( WGI.DATA_PERIODS )
-    if NumDataPeriods <= 0:
-        # should never be triggered
-        return -1
-    if NumDataPeriods == 1:
-        return 0
-    # now check which one are in
-    if curDate < WGI.DATA_PERIODS[0][0]:
-        return 0
-    if curDate > WGI.DATA_PERIODS[NumDataPeriods-1][1]:
-        return NumDataPeriods-1
-    # now find which period it is in
-    cPeriod = 0
-    for tPer in WGI.DATA_PERIODS:
-        if (curDate >= tPer[0]) and (curDate <= tPer[1]):
-            return cPeriod
-        cPeriod += 1
-    # end of for
-    return -1
-
-def detH1Period(curDate):
-    """
-    Determine the climate pathway current period index.
-    This could be either a data period or a climate projection period depending on 
-    the various intervals. Consequently return a tuple with a keyword at index 
-    0 and the period index at index 1.
-    
-    Args:
-        curDate (dt.datetime): current simulation date
-
-    """
-    import WG_Inputs as WGI
-    # start
-    NumDataPeriods = len( WGI.DATA_PERIODS )
-    if NumDataPeriods <= 0:
-        return (WGI.DATA_KEYW, -1)
-    # now go through and see if are in a data period
-    cPeriod = 0
-    for tPer in WGI.DATA_PERIODS:
-        if (curDate >= tPer[0]) and (curDate <= tPer[1]):
-            return (WGI.DATA_KEYW, cPeriod)
-        cPeriod += 1
-    # end of for
-    # next look through the PROJ_PERIODS
-    NumProjPeriods = len( WGI.PROJ_PERIODS )
-    if NumProjPeriods <= 0:
-        # should never be triggered
-        return (WGI.PROJ_KEYW, -1)
-    if NumProjPeriods == 1:
-        return (WGI.PROJ_KEYW, 0)
-    if curDate < WGI.PROJ_PERIODS[0][0]:
-        return (WGI.PROJ_KEYW, 0)
-    if curDate > WGI.PROJ_PERIODS[NumProjPeriods-1][1]:
-        return (WGI.PROJ_KEYW, NumProjPeriods-1)
-    # now find which period it is in
-    cPeriod = 0
-    for tPer in WGI.PROJ_PERIODS:
-        if (curDate >= tPer[0]) and (curDate <= tPer[1]):
-            return (WGI.PROJ_KEYW, cPeriod)
-        cPeriod += 1
-    # end of for
-    return (WGI.PROJ_KEYW, -1)
-
+DEF_ENGINE = ""
+"""Default engine, see WG_Worker_Main. Empty uses block when --block_size
+is above zero and loop otherwise."""
+DEF_BACKEND = "auto"
+"""Default backend, see WG_Worker_Main. auto runs a single realization 
+with a per-realization engine in this process and uses a pool otherwise."""
+DEF_PRELOAD_INPUTS = 1
+"""Default for reading the smoothed temperature inputs once per worker
+process, 1, or for every realization, 0."""
+DEF_SHARED_INPUTS = 0
+"""Default for publishing the read-only inputs in shared memory for the 
+workers, 1, or loading them in each worker, 0."""
+DEF_BLOCK_SIZE = 0
+"""Default number of realizations simulated together by the block engine,
+WG_BlockEngine. Zero uses the loop engine."""
+DEF_RANGE_SIZE = 50
+"""Default number of realizations in a range of the multi-node work queue"""
+DEF_MAX_RETRIES = 2
+"""Default number of retries for failed realizations"""
+DEF_ASYNC_OUTPUT = 1
+"""Default for writing realization outputs from a background thread in each
+worker, 1, or before starting the next realization, 0. See WG_AsyncWriter."""
+DEF_SEED_MODE = WGWM.DEF_SEED_MODE
+"""Default seeding mode, see WG_Seeds. legacy reproduces earlier results."""
 
-def WG_Worker_Main( RealNum, SNSeed, PDSeed, WSLSeed, DSLSeed ):
-    """ Main functionality to run a single realization
-
-    Args:
-        RealNum (int): the current realization number
-        SNSeed (int): base seed for the standard normal sampler
-        PDSeed (int): the precipitation depth sampler seed
-        WSLSeed (int): wet state spell length sampling seed
-        DSLSeed (int): dry state spell length sampling seed
-
-    Returns:
-        int. The return code::
-            0 -- Success!
-            1 -- Failure, generic
-
-    """
-    # imports
-    import pandas as pd
-    import WG_Inputs as WGI
-    import WG_Dists_Samples as WGDS
-    import WG_PrecipDepth as WGPD
-    import WG_OtherWeather as WGOW
-    import WG_HighRealResults as WGHRR
-    # 
-    # set our local seeds
-    pdSampSeed = int( PDSeed + int( 2 * RealNum ) )
-    sndSampSeed = int( SNSeed + int( 2 * RealNum ) )
-    wetSSampSeed = int( WSLSeed + int( 2 * RealNum ) )
-    drySSampSeed = int( DSLSeed + int( 2 * RealNum ) )
-    # setup our module globals at beginning
-    WGOW.setAllBegin()
-    WGDS.setAllBegin()
-    # get our start and end
-    start_date = WGI.START_DATE
-    end_date = WGI.END_DATE
-    # calculate our total days and set up our time index for output
-    timeD = end_date - start_date
-    TOTAL_DAYS = int( timeD.days + 1 )
-    DT_INDEX = pd.date_range( start=start_date, end=end_date, freq='D' )
-    # with the time index set, then we have everything that we need to
-    # set-up our structures
-    WGOW.constructDataPeriodArrays()
-    WGOW.constructCProjPeriodArrays()
-    # set-up the sampling and other things
-    WGDS.setDistributions( pdSampSeed, wetSSampSeed, drySSampSeed )
-    WGDS.setTrackers()
-    WGOW.setupDistsSamples(seed_std_norm=sndSampSeed)
-    WGOW.updateTracker()
-    # get our starting state sampler
-    StarterSamp = WGPD.PrecipSampler(pd_sample_seed=pdSampSeed)
-    # get our time index in a list for an iterator
-    TimesList = DT_INDEX.to_pydatetime().tolist()
-    # no loop at the realization level
-    # determine what kind of period and which one is for starting time
-    h0pindex = detH0Period( start_date )
-    h1ptype, h1pindex = detH1Period( end_date )
-    curMonth = start_date.month
-    # now get the starting state
-    TestVal = StarterSamp.getSingleVal()
-    if TestVal > 0.5:
-        h0State = WGI.WET_STATE
-        h1State = WGI.WET_STATE
-        h0remdur = WGDS.ST_DATA_WETSPELL[h0pindex][curMonth]
-        if h1ptype == WGI.DATA_KEYW:
-            h1remdur = WGDS.ST_DATA_WETSPELL[h1pindex][curMonth]
-        else:
-            h1remdur = WGDS.ST_PROJ_WETSPELL[h1pindex][curMonth]
-    else:
-        h0State = WGI.DRY_STATE
-        h1State = WGI.DRY_STATE
-        h0remdur = WGDS.ST_DATA_DRYSPELL[h0pindex][curMonth]
-        if h1ptype == WGI.DATA_KEYW:
-            h1remdur = WGDS.ST_DATA_DRYSPELL[h1pindex][curMonth]
-        else:
-            h1remdur = WGDS.ST_PROJ_DRYSPELL[h1pindex][curMonth]
-    # now create/set our realization tracking array
-    WGHRR.createSimStructures(TOTAL_DAYS)
-    # inner loop over times
-    for jJ in range(TOTAL_DAYS):
-        cTime = TimesList[jJ]
-        # sample all every time step
-        WGDS.sampleAll()
-        WGOW.updateTracker()
-        # get the current month
-        curMonth = cTime.month
-        # get the current day of the year
-        curDayoYr = cTime.timetuple().tm_yday
-        # determine our period for sampling
-        h0pindex = detH0Period( cTime )
-        h1ptype, h1pindex = detH1Period( cTime )
-        # use h1pindex for when not in data period for H0 pathway
-        # now that everything is sampled check our state and if wet
-        # then we get a precip depth
-        if h0State == WGI.WET_STATE:
-            if h0remdur <= 0:
-                # then need to change state to dry
-                h0State = WGI.DRY_STATE
-                h0remdur = WGDS.ST_DATA_DRYSPELL[h0pindex][curMonth]
-                WGHRR.assignDryDepData( jJ )
-            else:
-                # then need to assign the sampled precipitation depth
-                # for each grid 
-                #pVals = WGHRR.createDepArrayData( curMonth, h0pindex, 
-                #                                   WGDS.ST_DATA_PDEPTH )
-                pVals = WGHRR.createDepArrayCProj( curMonth, h1ptype, 
-                                                    h1pindex, 
-                                                    WGDS.ST_DATA_PDEPTH, 
-                                                    WGDS.ST_H0_PDEPTH )
-                WGHRR.assignWetDepData( jJ, pVals )
-        else:
-            # then the H0 branch is currently dry
-            # check if time to toggle states
-            if h0remdur <= 0:
-                h0State = WGI.WET_STATE
-                h0remdur = WGDS.ST_DATA_WETSPELL[h0pindex][curMonth]
-                #pVals = WGHRR.createDepArrayData( curMonth, h0pindex, 
-                #                                   WGDS.ST_DATA_PDEPTH )
-                pVals = WGHRR.createDepArrayCProj( curMonth, h1ptype, 
-                                                    h1pindex, 
-                                                    WGDS.ST_DATA_PDEPTH, 
-                                                    WGDS.ST_H0_PDEPTH )
-                WGHRR.assignWetDepData( jJ, pVals )
-            else:
-                WGHRR.assignDryDepData( jJ )
-        # next look at the H1 or climate change projection branch
-        if h1State == WGI.WET_STATE:
-            if h1remdur <= 0:
-                # then need to change state to dry
-                h1State = WGI.DRY_STATE
-                if h1ptype == WGI.DATA_KEYW:
-                    h1remdur = WGDS.ST_DATA_DRYSPELL[h1pindex][curMonth]
-                else:
-                    h1remdur = WGDS.ST_PROJ_DRYSPELL[h1pindex][curMonth]
-                # now assign the dry depth
-                WGHRR.assignDryDepCProj( jJ )
-            else:
-                # assign the sampled precipitation depth for each grid
-                pVals = WGHRR.createDepArrayCProj( curMonth, h1ptype, 
-                                                    h1pindex, 
-                                                    WGDS.ST_DATA_PDEPTH, 
-                                                    WGDS.ST_PROJ_PDEPTH )
-                WGHRR.assignWetDepCProj( jJ, pVals )
-        else:
-            # then the H1 branch is currently dry
-            # check if time to toggle states
-            if h1remdur <= 0:
-                h1State = WGI.WET_STATE
-                if h1ptype == WGI.DATA_KEYW:
-                    h1remdur = WGDS.ST_DATA_WETSPELL[h1pindex][curMonth]
-                else:
-                    h1remdur = WGDS.ST_PROJ_WETSPELL[h1pindex][curMonth]
-                # now assign sampled precipitation
-                pVals = WGHRR.createDepArrayCProj( curMonth, h1ptype, 
-                                                    h1pindex, 
-                                                    WGDS.ST_DATA_PDEPTH, 
-                                                    WGDS.ST_PROJ_PDEPTH )
-                WGHRR.assignWetDepCProj( jJ, pVals )
-            else:
-                # assign dry depth
-                WGHRR.assignDryDepCProj( jJ )
-        # do the other parameters
-        WGOW.calcCHI0( h0pindex, h1ptype, h1pindex )
-        # now update our temp values
-        WGOW.calculateUpdate( jJ, curDayoYr, h0State, h0pindex, 
-                                h1State, h1ptype, h1pindex )
-        # decrement counters before moving on
-        h0remdur -= 1
-        h1remdur -= 1
-        # copy our array
-        WGOW.rollOverChis()
-    # end of time for loop
-    # now output the realization
-    WGHRR.outputRealResults( RealNum, DT_INDEX )
-    WGHRR.outputWSResults( RealNum, DT_INDEX, TOTAL_DAYS )
-    # clean up at end
-    WGDS.cleanAllEnd()
-    WGOW.cleanAllEnd()
-    WGHRR.cleanAllEnd()
-    # end
-    return 0
 
 if __name__ == "__main__":
     # use the command line processor so that can tell how many processes or cores to use
@@ -323,33 +139,201 @@ if __name__ == "__main__":
         type=int,
         default=DEF_NUM_REALIZATIONS,
         help='Number of realizations for simulation')
+    parser.add_argument(
+        '--block_size',
+        type=int,
+        default=DEF_BLOCK_SIZE,
+        help='Realizations per vectorized block, 0 for the loop engine')
+    parser.add_argument(
+        '--engine',
+        type=str,
+        default=DEF_ENGINE,
+        choices=[ "" ] + sorted( WGWM.ENGINES ),
+        help='Simulation engine, see WG_Worker_Main')
+    parser.add_argument(
+        '--backend',
+        type=str,
+        default=DEF_BACKEND,
+        choices=[ "auto" ] + sorted( WGWM.BACKENDS ),
+        help='Execution backend, see WG_Worker_Main')
+    parser.add_argument(
+        '--preload_inputs',
+        type=int,
+        default=DEF_PRELOAD_INPUTS,
+        help='1 to read temperature inputs once per worker, 0 for every realization')
+    parser.add_argument(
+        '--shared_inputs',
+        type=int,
+        default=DEF_SHARED_INPUTS,
+        help='1 to share read-only inputs with the workers through shared memory')
+    parser.add_argument(
+        '--async_output',
+        type=int,
+        default=DEF_ASYNC_OUTPUT,
+        help='1 to write outputs from a background thread in each worker')
+    parser.add_argument(
+        '--resume',
+        type=int,
+        default=0,
+        help='1 to skip realizations that are complete in the run manifest')
+    parser.add_argument(
+        '--max_retries',
+        type=int,
+        default=DEF_MAX_RETRIES,
+        help='Number of times to retry failed realizations')
+    parser.add_argument(
+        '--start_real',
+        type=int,
+        default=START_REAL,
+        help='First realization number')
+    parser.add_argument(
+        '--queue_dir',
+        type=str,
+        default="",
+        help='Shared directory for the work queue of a multi-node run')
+    parser.add_argument(
+        '--role',
+        type=str,
+        default="worker",
+        choices=[ "coordinator", "worker" ],
+        help='With --queue_dir, coordinator creates the queue and worker runs ranges from it')
+    parser.add_argument(
+        '--range_size',
+        type=int,
+        default=DEF_RANGE_SIZE,
+        help='Realizations per work queue range')
+    parser.add_argument(
+        '--seed_mode',
+        type=str,
+        default=DEF_SEED_MODE,
+        choices=[ "legacy", "spawn" ],
+        help='legacy for the original seeds or spawn for SeedSequence streams')
     # parse the command line arguments received
     args = parser.parse_args()
     # extract our arguments
     num_proc = args.nbr_workers
     num_real = args.num_real
+    block_size = args.block_size
+    engine = args.engine
+    if len( engine ) == 0:
+        engine = WGWM.ENGINE_BLOCK if block_size > 0 else WGWM.DEF_ENGINE
+    if WGWM.isBatched( engine ):
+        block_size = max( 1, block_size )
+    backend_name = args.backend
+    preload_inputs = bool( args.preload_inputs )
+    shared_inputs = bool( args.shared_inputs )
+    seed_mode = args.seed_mode
+    if ( engine == WGWM.ENGINE_REFERENCE ) and ( seed_mode != "legacy" ):
+        parser.error( "the reference engine only supports legacy seeds" )
+    async_output = bool( args.async_output )
+    resume = bool( args.resume )
+    max_retries = max( 0, args.max_retries )
+    start_real = args.start_real
+    queue_dir = args.queue_dir
+    role = args.role
+    range_size = max( 1, args.range_size )
     # output
-    print("Using %d processes for %d realizations" % ( num_proc, num_real))
-    print("Simulate realizations %d through %d" % (START_REAL, ( START_REAL + num_real ) - 1) )
-    # now check what our number of realizations are ...
-    if num_real < 2:
-        # this is the run onece case
-        tRes = WG_Worker_Main( 1, STD_NORM_DEF_SEED, PDEPTH_DEF_SEED, WET_STA_DEF_SEED, DRY_STA_DEF_SEED )
-        results = [ tRes ]
+    if len( queue_dir ) > 0 and ( role == "worker" ):
+        print("Using %d processes for realizations from the queue" % num_proc )
     else:
-        # create our list of tuples to use for the mapping
-        AllArgs = [ ( int(x), STD_NORM_DEF_SEED, PDEPTH_DEF_SEED, WET_STA_DEF_SEED, DRY_STA_DEF_SEED)
-                    for x in range(START_REAL, START_REAL + num_real, 1) ]
-        with Pool(processes=num_proc) as pool:
-            results = pool.starmap( WG_Worker_Main, AllArgs, chunksize=CHUNK_SIZE )
-        # end of with block
-    # now check about the outputs
-    if num_real < 5:
-        print(results)
+        print("Using %d processes for %d realizations" % ( num_proc, num_real))
+        print("Simulate realizations %d through %d" % (start_real, ( start_real + num_real ) - 1) )
+    # build, or load, the cached distribution tables and the calendar once
+    # before starting the workers
+    import WG_DistTables as WGDT
+    import WG_Calendar as WGCal
+    import WG_SharedInputs as WGSI
+    WGDT.setRunTables()
+    WGCal.getRunCalendar()
+    if shared_inputs:
+        # one copy of the read-only inputs for all workers on this node
+        shared_spec = WGSI.publishInputs()
+    else:
+        shared_spec = None
+    # the run manifest records completed realizations for resume
+    import time
+    import WG_RunManifest as WGRM
+    import WG_Scheduler as WGSC
+    import WG_WorkQueue as WGWQ
+    manifest_path = WGRM.manifestPath()
+    run_dict = WGRM.runInfo( STD_NORM_DEF_SEED, PDEPTH_DEF_SEED, WET_STA_DEF_SEED,
+                             DRY_STA_DEF_SEED, seed_mode )
+    manifest_spec = ( manifest_path, run_dict )
+    AllReals = list( range(start_real, start_real + num_real, 1) )
+    if backend_name == "auto":
+        if ( not WGWM.isBatched( engine ) ) and ( num_real < 2 ) and \
+                ( len( queue_dir ) == 0 ):
+            # this is the run once case
+            backend_name = WGWM.BACKEND_SERIAL
+        else:
+            backend_name = WGWM.BACKEND_POOL
+    # end if
+    backend = WGWM.makeBackend( backend_name, num_proc, ( preload_inputs, 
+                                shared_spec, async_output, manifest_spec ) )
+    StartTime = time.time()
+    if len( queue_dir ) > 0 and ( role == "worker" ):
+        # claim ranges from the coordinator queue until none are left
+        print("Waiting for queue in %s" % queue_dir )
+        WGWQ.waitForQueue( queue_dir )
+        # refuses to run when the inputs do not match the coordinator
+        WGRM.resumeManifest( manifest_path, run_dict )
+        worker_id = WGWQ.workerId()
+        TimeRecords = list()
+        def runRange( RealList, LostEvent ):
+            tRecords, tPending = WGWM.simulateRealizations( RealList, backend, 
+                                    num_proc, engine, block_size, seed_mode, 
+                                    manifest_path, max_retries, 
+                                    StopEvent=LostEvent )
+            TimeRecords.extend( tRecords )
+            return tPending
+        # end of runRange
+        RangeIds = WGWQ.runWorker( queue_dir, runRange, WorkerId=worker_id )
+        print("Worker %s finished %d ranges" % ( worker_id, len( RangeIds ) ) )
+        stats_path = WGSC.statsPath( Tag=worker_id )
     else:
-        TotFails = sum( results )
-        NumSuccess = num_real - TotFails
-        print("Finished %d successful runs out of %d realizations" % (NumSuccess, num_real))
+        if resume:
+            WGRM.resumeManifest( manifest_path, run_dict )
+            DoneSet = WGRM.completedRealizations( manifest_path, AllReals )
+            print("Resume with %d of %d realizations complete" % ( len( DoneSet ), num_real ) )
+        else:
+            WGRM.newManifest( manifest_path, run_dict )
+            DoneSet = set()
+        Pending = [ x for x in AllReals if x not in DoneSet ]
+        if len( queue_dir ) > 0:
+            # coordinator; workers on any node do the simulation
+            WGWQ.createQueue( queue_dir, Pending, range_size, RunDict=run_dict )
+            print("Queued %d realizations in ranges of %d in %s" % ( len( Pending ),
+                                                        range_size, queue_dir ) )
+            WGWQ.monitorQueue( queue_dir )
+            TimeRecords = list()
+        else:
+            TimeRecords, Pending = WGWM.simulateRealizations( Pending, backend, 
+                                    num_proc, engine, block_size, seed_mode, 
+                                    manifest_path, max_retries )
+        # end if
+        stats_path = WGSC.statsPath()
+        DoneSet = WGRM.completedRealizations( manifest_path, AllReals )
+        Pending = [ x for x in AllReals if x not in DoneSet ]
+        # one catalog for the outputs from all workers
+        catalog_path = WGRM.catalogPath()
+        WGRM.writeCatalog( catalog_path, AllReals )
+        print("Output catalog in %s" % catalog_path )
+    # end if
+    if shared_inputs:
+        WGSI.releaseInputs( Unlink=True )
+    # timing by worker process
+    if len( TimeRecords ) > 0:
+        WGSC.writeRunStats( stats_path, TimeRecords, time.time() - StartTime, num_proc,
+                            RunDict={ "engine" : engine, "backend" : backend_name,
+                                      "block_size" : block_size, "seed_mode" : seed_mode,
+                                      "async_output" : async_output } )
+        print("Run statistics in %s" % stats_path )
+    # now check about the outputs
+    if ( len( queue_dir ) == 0 ) or ( role == "coordinator" ):
+        print("Finished %d successful runs out of %d realizations" % ( len( DoneSet ), num_real ) )
+        if len( Pending ) > 0:
+            print("Failed realizations %s. Rerun with --resume 1" % Pending )
+    backend.close()
     # end of main
 
 